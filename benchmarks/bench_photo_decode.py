@@ -0,0 +1,76 @@
+"""Benchmark for photo decoding in the ImageViewer.
+
+Compares the old full-resolution decode + LANCZOS resize against
+decode_image_for_display in iPod.py (JPEG draft decode, EXIF orientation,
+reducing_gap resize) on a generated 24-megapixel camera JPEG.
+
+Each variant runs in its own child process so peak RSS is measured cleanly
+(Unix only; the resource module is not available on Windows).
+
+Run from the repository root:  python benchmarks/bench_photo_decode.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+TARGET_SIZE = (200, 200) # ImageViewer area minus padding
+ROUNDS = 5
+
+def legacy_decode(filepath, max_size):
+    """The previous implementation, kept here for comparison."""
+    img = Image.open(filepath)
+    img = img.convert("RGBA")
+    img_w, img_h = img.size
+    ratio = min(max_size[0] / img_w, max_size[1] / img_h)
+    scaled_size = (int(img_w * ratio), int(img_h * ratio))
+    img = img.resize(scaled_size, Image.Resampling.LANCZOS)
+    return img.mode, img.size, img.tobytes()
+
+def make_camera_jpeg(path, size=(6000, 4000)):
+    """A noisy 24 MP JPEG tagged as rotated 90 degrees, like a portrait phone shot."""
+    img = Image.effect_noise(size, 64).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    img.save(path, quality=90, exif=exif)
+
+def run_variant(variant, path):
+    """Child process: decode ROUNDS times, print ms per decode and peak RSS in MB."""
+    import resource
+    if variant == "legacy":
+        decode = legacy_decode
+    else:
+        import iPod
+        decode = iPod.decode_image_for_display
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        mode, size, _data = decode(path, TARGET_SIZE)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KiB on Linux
+    print(f"{elapsed * 1000:.1f} {(peak - baseline) / scale:.1f} {size[0]}x{size[1]}")
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "camera.jpg")
+        make_camera_jpeg(path)
+        print(f"Decoding a 6000x4000 JPEG (EXIF rotated) to fit {TARGET_SIZE[0]}x{TARGET_SIZE[1]}, {ROUNDS} rounds")
+        for variant in ("legacy", "draft"):
+            out = subprocess.run([sys.executable, __file__, variant, path],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            ms, rss, size = out[-3:]
+            print(f"  {variant:<8} {float(ms):8.1f} ms/decode   peak RSS +{float(rss):6.1f} MB   result {size}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run_variant(sys.argv[1], sys.argv[2])
+    else:
+        main()
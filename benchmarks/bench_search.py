@@ -0,0 +1,71 @@
+"""Benchmark for the library search index.
+
+Indexes a synthetic library of 100k songs with SearchIndex from iPod.py and times
+typical queries as they would be typed on the search screen: single letters,
+partial words, several words and a typo.
+
+Run from the repository root:  python benchmarks/bench_search.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import iPod
+
+SONGS = 100_000
+COMMON_WORDS = ["love", "night", "the", "heart", "dance", "fire", "blue", "dream", "city", "rain", "time", "light",
+                "Beyoncé", "señorita", "über", "river", "gold", "summer", "wild", "star", "road", "home", "baby", "run",
+                "midnight", "electric", "paradise", "ocean", "thunder", "shadow", "angel", "forever", "crazy", "world"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vo", "shi", "dar", "el", "nu", "bri", "gan", "sol", "ix", "ter", "pho",
+             "que", "zel", "mor", "ath", "ly", "kin", "dro", "ves"]
+
+def make_vocabulary(rng, size=4000):
+    """Common words plus made-up ones, drawn with Zipf-like weights like real titles."""
+    words = list(COMMON_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+def make_library(count, seed=1):
+    rng = random.Random(seed)
+    words, weights = make_vocabulary(rng)
+    phrase = lambda n: " ".join(rng.choices(words, weights, k=n)).title()
+    artists = [phrase(rng.randint(1, 3)) for _ in range(5000)]
+    albums = [phrase(rng.randint(1, 4)) for _ in range(10000)]
+    songs = []
+    for i in range(count):
+        artist = artists[i % len(artists)]
+        album = albums[i % len(albums)]
+        title = phrase(rng.randint(1, 5))
+        path = f"/music/{artist}/{album}/{i % 20 + 1:02d} {title}.mp3"
+        songs.append((path, {"title": title, "artist": artist, "album": album}))
+    return songs
+
+def main():
+    songs = make_library(SONGS)
+    index = iPod.SearchIndex()
+    start = time.perf_counter()
+    for path, metadata in songs:
+        index.add(path, metadata)
+    print(f"Indexed {len(index)} songs in {time.perf_counter() - start:.2f} s")
+
+    # Each query is typed one character at a time, like on the search screen
+    queries = ["l", "lo", "lov", "love", "love n", "love nig", "midnight thunder", "beyonce", "paradyse",
+               "kalomi", "kalomy", "xq"]
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        timings.append(elapsed)
+        print(f"  {query!r:<20} {elapsed:6.2f} ms  {len(results):4d} results  {results[0][1] if results else ''}")
+    print(f"median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
+
+if __name__ == "__main__":
+    main()
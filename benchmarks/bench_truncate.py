@@ -0,0 +1,71 @@
+"""Benchmark for truncate_text with long Unicode filenames.
+
+Compares the old one-character-at-a-time truncation against the binary-search
+version in iPod.py, cold (empty memo) and warm (menu redrawn every frame).
+
+Run from the repository root:  python benchmarks/bench_truncate.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import iPod
+
+def legacy_truncate_text(text, font, max_width):
+    """The previous linear implementation, kept here for comparison."""
+    if not text: return ""
+    if font.size(text)[0] <= max_width:
+        return text
+    ellipsis = "..."
+    truncated = text
+    while len(truncated) > 0 and font.size(truncated + ellipsis)[0] > max_width:
+        truncated = truncated[:-1]
+    return truncated + ellipsis
+
+def make_filenames(count, length=200):
+    """Long filenames mixing accented Latin, Greek, Cyrillic and CJK characters."""
+    words = ["Café", "Björk", "Ωmega", "Москва", "東京", "Live", "Remaster", "Señorita", "Ünïcødé", "Track"]
+    names = []
+    for i in range(count):
+        name = ""
+        j = i
+        while len(name) < length:
+            name += words[j % len(words)] + " "
+            j += 7
+        names.append(f"{i:05d} {name[:length]}.flac")
+    return names
+
+def time_per_call(fn, names, font, max_width, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            fn(name, font, max_width)
+    return (time.perf_counter() - start) / (rounds * len(names))
+
+def main():
+    pygame.init()
+    font = pygame.font.SysFont(None, 24)
+    max_width = iPod.MAIN_AREA_WIDTH - 10 # Same width Menu.draw truncates to
+    names = make_filenames(200)
+
+    for name in names[:20]:
+        assert iPod.truncate_text(name, font, max_width) == legacy_truncate_text(name, font, max_width)
+
+    legacy = time_per_call(legacy_truncate_text, names, font, max_width, rounds=3)
+    iPod._truncate_memo.clear()
+    cold = time_per_call(iPod.truncate_text, names, font, max_width, rounds=1)
+    warm = time_per_call(iPod.truncate_text, names, font, max_width, rounds=20)
+
+    visible_rows = (iPod.SCREEN_HEIGHT - iPod.STATUS_BAR_HEIGHT) // 20
+    print(f"{len(names)} filenames of ~{len(names[0])} characters, max width {max_width}px")
+    print(f"  legacy linear   : {legacy * 1e6:9.1f} us/call ({legacy * visible_rows * 1e3:6.2f} ms per {visible_rows}-row menu frame)")
+    print(f"  binary search   : {cold * 1e6:9.1f} us/call ({cold * visible_rows * 1e3:6.2f} ms per {visible_rows}-row menu frame)")
+    print(f"  memoised (warm) : {warm * 1e6:9.1f} us/call ({warm * visible_rows * 1e3:6.2f} ms per {visible_rows}-row menu frame)")
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark for video seek latency.
+
+Generates a 60-second 720p H.264 test video with a keyframe every 5 seconds, then
+measures seek-to-first-frame for VideoStream from iPod.py in two ways. The first
+seeks to the exact time: ffmpeg decodes from the previous keyframe and throws
+those frames away. The second snaps to the nearest keyframe from the keyframe
+index, so ffmpeg starts decoding right there (-noaccurate_seek).
+
+Needs ffmpeg on PATH. ffprobe is used to build the keyframe index if it is on PATH;
+otherwise the index is derived from the known keyframe interval.
+
+Run from the repository root:  python benchmarks/bench_video_seek.py
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import iPod
+
+DURATION = 60
+FRAME_RATE = 24
+KEYFRAME_INTERVAL = 5 # Seconds
+TARGETS = [7.3, 13.9, 22.6, 31.2, 38.8, 47.5, 55.1]
+FRAME_SIZE = (200, 116) # About the size of VideoPlayer.video_rect
+
+def make_video(ffmpeg, path):
+    subprocess.run([ffmpeg, "-v", "error", "-y", "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate={FRAME_RATE}",
+                    "-t", str(DURATION), "-c:v", "libx264", "-preset", "veryfast", "-g", str(FRAME_RATE * KEYFRAME_INTERVAL),
+                    "-pix_fmt", "yuv420p", path], check=True)
+
+def first_frame_seconds(ffmpeg, path, start, channel, keyframe):
+    stream = iPod.VideoStream(ffmpeg, path, start, FRAME_SIZE, channel, audio=False, keyframe=keyframe)
+    while stream.first_frame_seconds is None and not stream.video_eof:
+        time.sleep(0.001)
+    stream.close()
+    return stream.first_frame_seconds
+
+def main():
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        sys.exit("ffmpeg not found on PATH")
+    pygame.mixer.init()
+    channel = pygame.mixer.Channel(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "seek.mp4")
+        make_video(ffmpeg, path)
+        ffprobe = shutil.which("ffprobe")
+        if ffprobe:
+            start = time.perf_counter()
+            keyframes = iPod.read_keyframe_times(ffprobe, path)
+            print(f"Keyframe index: {len(keyframes)} keyframes in {(time.perf_counter() - start) * 1000:.0f} ms (ffprobe)")
+        else:
+            keyframes = array('d', range(0, DURATION, KEYFRAME_INTERVAL))
+            print(f"Keyframe index: {len(keyframes)} keyframes (derived, ffprobe not on PATH)")
+        print(f"Seek to first frame, {DURATION}s 1280x720 video, keyframe every {KEYFRAME_INTERVAL}s")
+        for label, keyframe in (("exact time", False), ("keyframe", True)):
+            timings = []
+            for target in TARGETS:
+                start = iPod.nearest_keyframe(keyframes, target, target - 10) if keyframe else target
+                timings.append(first_frame_seconds(ffmpeg, path, start, channel, keyframe) * 1000)
+            print(f"  {label:<11} median {statistics.median(timings):6.1f} ms   max {max(timings):6.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark for the music progress bar waveform overview.
+
+Generates a 5-minute stereo MP3 and times read_waveform_peaks from iPod.py (ffmpeg
+decodes to 8 kHz mono PCM, NumPy reduces each 64 KB block to min/max per bucket).
+The same PCM is also reduced with a plain Python loop over the samples, which is
+what the reduction would cost without NumPy.
+
+Needs ffmpeg on PATH and NumPy.
+
+Run from the repository root:  python benchmarks/bench_waveform.py
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import iPod
+
+DURATION = 300
+
+def make_track(ffmpeg, path):
+    subprocess.run([ffmpeg, "-v", "error", "-y", "-f", "lavfi", "-i", f"anoisesrc=d={DURATION}:a=0.3",
+                    "-ac", "2", "-ar", "44100", "-b:a", "192k", path], check=True)
+
+def python_peaks(pcm, buckets=iPod.WAVEFORM_BUCKETS):
+    """Min/max per bucket with a loop over every sample, for comparison."""
+    samples = array('h', pcm)
+    per_bucket = max(1, len(samples) // buckets)
+    peaks = []
+    for start in range(0, len(samples), per_bucket):
+        low = high = samples[start]
+        for value in samples[start:start + per_bucket]:
+            if value < low: low = value
+            elif value > high: high = value
+        peaks += [low >> 8, high >> 8]
+    return peaks
+
+def main():
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        sys.exit("ffmpeg not found on PATH")
+    if iPod.numpy is None:
+        sys.exit("NumPy not installed")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "track.mp3")
+        make_track(ffmpeg, path)
+        print(f"Waveform of a {DURATION // 60}-minute 44.1 kHz stereo MP3, {iPod.WAVEFORM_BUCKETS} buckets")
+
+        start = time.perf_counter()
+        peaks = iPod.read_waveform_peaks(ffmpeg, path, DURATION)
+        print(f"  ffmpeg + NumPy blocks  {(time.perf_counter() - start) * 1000:7.1f} ms   {len(peaks)} bytes stored")
+
+        start = time.perf_counter()
+        pcm = subprocess.run([ffmpeg, "-v", "error", "-i", path, "-ac", "1", "-ar", str(iPod.WAVEFORM_SAMPLE_RATE),
+                              "-f", "s16le", "pipe:1"], capture_output=True, check=True).stdout
+        decoded = time.perf_counter()
+        python_peaks(pcm)
+        reduced = time.perf_counter()
+        print(f"  ffmpeg + Python loop   {(reduced - start) * 1000:7.1f} ms   (decode {(decoded - start) * 1000:.1f} ms, "
+              f"loop {(reduced - decoded) * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
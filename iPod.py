@@ -1,19 +1,38 @@
+import time
+STARTED_AT = time.perf_counter() # Start-up profile (--profile-startup) counts from here, imports included
 import pygame
+PYGAME_IMPORTED_AT = time.perf_counter()
 import os
 import sys
 import datetime
+import atexit
 import json
+import locale
 import random
-import time
-from tkinter import Tk, filedialog, messagebox
-from PIL import Image as PILImage
+# tkinter, Pillow and webbrowser are imported where they are first needed (load_pil, open_link)
 # from moviepy.editor import VideoFileClip # REMOVED
 import io
+import base64
 import subprocess # ADDED
 # import shutil # REMOVED
-import webbrowser
-import ctypes
 import threading
+import hashlib
+import sqlite3
+try:
+    import mutagen # Optional: in-process tag/duration reading, ffprobe is used otherwise
+except ImportError:
+    mutagen = None
+try:
+    import numpy # Optional: waveform overviews on the music progress bar
+except ImportError:
+    numpy = None
+import queue
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple, deque, OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # --- Constants ---
 SCREEN_WIDTH = 320
@@ -21,7 +40,15 @@ SCREEN_HEIGHT = 240
 STATUS_BAR_HEIGHT = 20
 SIDE_PANEL_WIDTH = 100 # Width of the album art/info panel area
 MAIN_AREA_WIDTH = SCREEN_WIDTH - SIDE_PANEL_WIDTH
-FPS = 30
+FPS = 60 # Full frame rate while scrolling or animating
+PLAYBACK_FPS = 4 # When only the playback time/progress bar moves
+IDLE_WAIT_MS = 1000 # Longest block in pygame.event.wait when nothing changes (clock still ticks)
+SCREEN_OFF_WAIT_MS = 500 # Wake-up interval with the screen off (auto-advance keeps working)
+ACTIVE_HOLD_SECONDS = 0.5 # Stay at full rate this long after the last input
+MUSIC_END_EVENT = pygame.USEREVENT + 1 # Posted by pygame.mixer.music when a track finishes
+PROCESS_EXIT_EVENT = pygame.USEREVENT + 2 # Posted by ProcessSupervisor when a child process exits
+TEXT_CACHE_SIZE = 512 # Rendered text surfaces kept by the shared LRU cache
+TRUNCATE_MEMO_SIZE = 4096 # Memoised truncate_text results
 
 # Colors
 WHITE = (255, 255, 255)
@@ -46,6 +73,48 @@ DEFAULT_THEME = "Silver"
 
 # Settings File - Save in user's home directory for write permissions
 SETTINGS_FILE = os.path.join(os.path.expanduser("~"), "ipod_settings.json")
+# Library Index - SQLite database of scanned media, kept next to the settings file
+LIBRARY_INDEX_FILE = os.path.join(os.path.expanduser("~"), "ipod_library.db")
+# Thumbnail Cache - small pre-scaled JPEGs for the photo grid
+THUMBNAIL_DIR = os.path.join(os.path.expanduser("~"), "ipod_thumbnails")
+# Album Art Cache - covers pre-scaled to the side panel width, one file per album
+ALBUM_ART_DIR = os.path.join(os.path.expanduser("~"), "ipod_album_art")
+# Seek-bar preview sprite sheets, one JPEG per video
+SCRUB_DIR = os.path.join(os.path.expanduser("~"), "ipod_scrub_previews")
+
+# Supported media extensions per library section
+MUSIC_EXTENSIONS = ('.mp3', '.ogg', '.wav', '.flac') # Add more as supported by mixer
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv') # Add more as supported by ffmpeg
+PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+SCAN_WORKERS = 8 # Parallel directory listings (helps a lot on network mounts)
+PROBE_WORKERS = 2 # Background metadata probes (mutagen/ffprobe)
+PROBE_NEIGHBOURS = 3 # Playlist entries on each side of the current track probed right after it
+PROBE_MEMO_SIZE = 1024 # Probe results kept in memory in front of the SQLite cache
+PHOTO_PREFETCH_DEPTH = 2 # Photos decoded ahead on each side of the current one
+PHOTO_CACHE_MB = 32 # Memory budget for decoded photo surfaces
+THUMB_SIZE = 56 # Photo grid thumbnail edge in pixels
+THUMB_CACHE_MB = 8 # Memory budget for thumbnail surfaces (the disk cache holds the rest)
+ALBUM_ART_CACHE_SIZE = 64 # Album covers kept in memory
+SEARCH_MAX_RESULTS = 200 # Ranked results returned per search query
+LEADING_ARTICLES = ("the ", "a ", "an ") # Ignored when sorting artists, albums and titles
+TAG_BATCH_SIZE = 200 # Files tagged per index transaction during a scan
+VIDEO_FPS = 30 # Frame rate ffmpeg delivers in-window video at
+VIDEO_RING_FRAMES = 8 # Preallocated frame buffers between the decoder thread and the screen
+VIDEO_AUDIO_CHUNK_SECONDS = 0.25 # Video audio is queued on the mixer channel in chunks this long
+VIDEO_AUDIO_QUEUE = 8 # Decoded audio chunks buffered ahead
+AV_SYNC_TOLERANCE = 0.08 # Seconds the video clock may drift from the audio before it is corrected
+SCRUB_TILE_SIZE = (80, 45) # Seek-bar preview frame size (shown at twice this size)
+SCRUB_INTERVAL_SECONDS = 10 # One preview frame per seek step
+SCRUB_MAX_TILES = 720 # Longer videos than 2 hours get a wider interval (720 tiles are about 8 MB)
+SCRUB_COLUMNS = 24 # Tiles per row of a sprite sheet
+SCRUB_HOLD_DELAY = 0.4 # Seconds LB/RB is held before the preview starts stepping on its own
+SCRUB_REPEAT_SECONDS = 0.1 # Preview step rate while LB/RB is held
+SCRUB_MAX_STEPS = 6 # Seek steps per repeat after holding for several seconds
+WAVEFORM_BUCKETS = 512 # Min/max pairs kept per track (1 KB in the probe cache)
+WAVEFORM_SAMPLE_RATE = 8000 # Mono rate ffmpeg decodes to for the overview; plenty for peaks
+WAVEFORM_BLOCK_BYTES = 64 * 1024 # PCM read from the pipe per NumPy reduction
+WAVEFORM_BAR_HEIGHT = 20 # Music progress bar height, so the waveform is readable
+FOLDER_ART_NAMES = ('folder.jpg', 'cover.jpg', 'front.jpg', 'folder.png', 'cover.png', 'front.png', 'albumart.jpg')
 
 # Gamepad Buttons (adjust indices based on your gamepad/pygame detection)
 A_BUTTON = 0  # Typically the 'A' or 'X' button
@@ -60,26 +129,31 @@ DPAD_LEFT = (-1, 0)
 DPAD_RIGHT = (1, 0)
 # Analog stick thresholds
 STICK_THRESHOLD = 0.5
+SCREEN_OFF_KEY = pygame.K_o # Toggle screen off (audio keeps playing); a key or button press wakes it
+# Deliberate input: wakes the screen and counts as activity. Key releases, stick jitter
+# and window/audio-device events do neither (the release of SCREEN_OFF_KEY would undo it)
+WAKE_EVENT_TYPES = (pygame.KEYDOWN, pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.QUIT)
 
 # --- Helper Functions ---
 
 def validate_ffmpeg_path(dir_path):
-    """Checks if ffprobe.exe and ffplay.exe exist in the given directory."""
+    """Checks if ffprobe.exe and ffmpeg.exe exist in the given directory."""
     if not dir_path or not os.path.isdir(dir_path):
         return False
     ffprobe_path = os.path.join(dir_path, "ffprobe.exe")
-    ffplay_path = os.path.join(dir_path, "ffplay.exe")
-    return os.path.isfile(ffprobe_path) and os.path.isfile(ffplay_path)
+    ffmpeg_path = os.path.join(dir_path, "ffmpeg.exe")
+    return os.path.isfile(ffprobe_path) and os.path.isfile(ffmpeg_path)
 
 def prompt_and_validate_ffmpeg_path():
     """Prompts user to select FFmpeg directory and validates it."""
+    from tkinter import messagebox
     messagebox.showinfo("FFmpeg Location Needed",
                         "Perfect Pineapple Player needs the location of the directory containing \n"
-                        "ffprobe.exe and ffplay.exe for video playback.\n\n"
+                        "ffprobe.exe and ffmpeg.exe for video playback.\n\n"
                         "Please select the directory (often named 'bin') in the next dialog.")
     
     while True:
-        dir_path = select_directory("Select FFmpeg Directory (containing ffprobe.exe, ffplay.exe)")
+        dir_path = select_directory("Select FFmpeg Directory (containing ffprobe.exe, ffmpeg.exe)")
         if not dir_path: # User cancelled
             messagebox.showwarning("FFmpeg Path Required", "Video playback will be disabled because the FFmpeg path was not provided.")
             return None
@@ -89,11 +163,24 @@ def prompt_and_validate_ffmpeg_path():
             return dir_path
         else:
             if not messagebox.askretrycancel("Invalid FFmpeg Path",
-                                            f"Could not find ffprobe.exe and ffplay.exe in:\n{dir_path}\n\n"
+                                            f"Could not find ffprobe.exe and ffmpeg.exe in:\n{dir_path}\n\n"
                                             "Please ensure you selected the correct directory. Retry?"):
                 messagebox.showwarning("FFmpeg Path Required", "Video playback will be disabled because an invalid FFmpeg path was selected.")
                 return None # User chose not to retry
 
+PILImage = ImageOps = None # Pillow modules, once load_pil() has imported them
+_pil_lock = threading.Lock() # Several decode workers can ask for Pillow at once
+
+def load_pil():
+    """Imports Pillow on first use (photos, thumbnails, covers); the main menu doesn't need it."""
+    global PILImage, ImageOps
+    if PILImage is not None: return
+    with _pil_lock:
+        if PILImage is None:
+            from PIL import Image, ImageOps as ops
+            ImageOps = ops
+            PILImage = Image # Set last: other threads only skip the lock once both are ready
+
 def load_settings():
     """Loads settings from the JSON file."""
     default_settings = {
@@ -102,7 +189,11 @@ def load_settings():
         "video_dirs": [],
         "image_dirs": [],
         "ffmpeg_path": None, # ADDED
-        "games": [] # ADDED for imported games
+        "games": [], # ADDED for imported games
+        "photo_prefetch_depth": PHOTO_PREFETCH_DEPTH,
+        "photo_cache_mb": PHOTO_CACHE_MB,
+        "gapless_playback": True, # Queue the next song in the mixer so albums play without gaps
+        "screen_off_timeout": 0 # Seconds without input before the screen turns off while playing (0 = never)
     }
     if not os.path.exists(SETTINGS_FILE):
         return default_settings
@@ -142,30 +233,36 @@ def get_themed_color(theme_name, color_key):
     """Gets a color from the current theme."""
     return THEMES.get(theme_name, THEMES[DEFAULT_THEME]).get(color_key, BLACK)
 
-def draw_gradient_rect(surface, rect, start_color, end_color, vertical=True):
-    """Draws a gradient rectangle."""
-    steps = rect.height if vertical else rect.width
-    if steps == 0: return # Avoid division by zero
-    start_r, start_g, start_b = start_color
-    end_r, end_g, end_b = end_color
-    delta_r = (end_r - start_r) / steps
-    delta_g = (end_g - start_g) / steps
-    delta_b = (end_b - start_b) / steps
-
+_gradient_cache = {} # (size, start_color, end_color, vertical) -> baked Surface
+
+def bake_gradient(size, start_color, end_color, vertical=True):
+    """Returns a surface holding a linear gradient. It is built once as a 1-pixel strip
+       (one bytes buffer, no per-line draw calls) and scaled up to size."""
+    key = (tuple(size), tuple(start_color), tuple(end_color), vertical)
+    surface = _gradient_cache.get(key)
+    if surface is not None:
+        return surface
+    width, height = size
+    steps = height if vertical else width
+    strip = bytearray()
     for i in range(steps):
-        color = (
-            min(255, max(0, int(start_r + i * delta_r))),
-            min(255, max(0, int(start_g + i * delta_g))),
-            min(255, max(0, int(start_b + i * delta_b)))
-        )
-        if vertical:
-            line_rect = pygame.Rect(rect.left, rect.top + i, rect.width, 1)
-        else:
-            line_rect = pygame.Rect(rect.left + i, rect.top, 1, rect.height)
-        pygame.draw.rect(surface, color, line_rect)
+        for start, end in zip(start_color, end_color):
+            strip.append(min(255, max(0, int(start + i * (end - start) / steps))))
+    strip_surface = pygame.image.frombuffer(bytes(strip), (1, steps) if vertical else (steps, 1), "RGB")
+    surface = pygame.transform.scale(strip_surface, (width, height))
+    if pygame.display.get_surface():
+        surface = surface.convert() # Match the display format for fast blits
+    _gradient_cache[key] = surface
+    return surface
+
+def draw_gradient_rect(surface, rect, start_color, end_color, vertical=True):
+    """Draws a gradient rectangle by blitting a cached pre-baked gradient."""
+    if rect.width <= 0 or rect.height <= 0: return # Nothing to draw
+    surface.blit(bake_gradient(rect.size, start_color, end_color, vertical), rect.topleft)
 
 def select_directory(title="Select Directory"):
     """Opens a directory selection dialog."""
+    from tkinter import Tk, filedialog
     root = Tk()
     root.withdraw()  # Hide the main window
     root.attributes('-topmost', True) # Bring the dialog to the front
@@ -173,20 +270,10 @@ def select_directory(title="Select Directory"):
     root.destroy()
     return directory if directory else None
 
-def get_media_files(directories, extensions):
-    """Scans directories for files with given extensions."""
-    files = []
-    for directory in directories:
-        if not os.path.isdir(directory):
-            continue
-        try:
-            for item in os.listdir(directory):
-                full_path = os.path.join(directory, item)
-                if os.path.isfile(full_path) and item.lower().endswith(extensions):
-                    files.append(full_path)
-        except OSError as e:
-            print(f"Error scanning directory {directory}: {e}")
-    return files
+def open_link(url):
+    """Opens url in the default browser (webbrowser is only imported when a link is opened)."""
+    import webbrowser
+    webbrowser.open_new_tab(url)
 
 def format_time(seconds):
     """Formats seconds into MM:SS format."""
@@ -194,20 +281,76 @@ def format_time(seconds):
     seconds = int(seconds % 60)
     return f"{minutes:02d}:{seconds:02d}"
 
+_truncate_memo = OrderedDict() # (font, text, max_width) -> truncated text
+
 def truncate_text(text, font, max_width):
-    """Truncates text with '...' if it exceeds max_width in pixels."""
+    """Truncates text with '...' if it exceeds max_width in pixels.
+       Binary-searches the longest prefix that fits (O(log n) font measurements instead of
+       one per dropped character) and memoises the result per font, string and width."""
     if not text: return ""
-    original_width = font.size(text)[0]
-    if original_width <= max_width:
-        return text
+    key = (font, text, max_width)
+    result = _truncate_memo.get(key)
+    if result is not None:
+        _truncate_memo.move_to_end(key)
+        return result
+    if font.size(text)[0] <= max_width:
+        result = text
     else:
         ellipsis = "..."
-        ellipsis_width = font.size(ellipsis)[0]
-        # Start removing chars from the end until it fits with ellipsis
-        truncated = text
-        while len(truncated) > 0 and font.size(truncated + ellipsis)[0] > max_width:
-            truncated = truncated[:-1]
-        return truncated + ellipsis
+        # Largest prefix length whose width (with ellipsis) still fits; prefix widths grow monotonically
+        low, high = 0, len(text) - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if font.size(text[:mid] + ellipsis)[0] <= max_width:
+                low = mid
+            else:
+                high = mid - 1
+        result = text[:low] + ellipsis
+    _truncate_memo[key] = result
+    if len(_truncate_memo) > TRUNCATE_MEMO_SIZE:
+        _truncate_memo.popitem(last=False)
+    return result
+
+class TextSurfaceCache:
+    """LRU cache of rendered text surfaces keyed by (font, text, colour, antialias, max_width).
+
+    Menus, the status bar and the players redraw the same strings every frame; serving
+    them from here means steady-state frames do no glyph rasterisation at all."""
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True, max_width=None):
+        """Returns a surface for text, truncated with '...' to max_width if given."""
+        key = (font, text, tuple(color), antialias, max_width)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        display_text = truncate_text(text, font, max_width) if max_width is not None else text
+        surface = font.render(display_text, antialias, color)
+        self._surfaces[key] = surface
+        while len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False) # Evict least recently used
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._surfaces), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+TEXT_CACHE = TextSurfaceCache()
+
+def render_text(font, text, color, antialias=True, max_width=None):
+    """Renders text through the shared TEXT_CACHE."""
+    return TEXT_CACHE.render(font, text, color, antialias, max_width)
 
 def render_text_wrapped(surface, text, font, color, rect, aa=True):
     """Renders text wrapped within a given rect. Returns the total height used."""
@@ -240,13 +383,1100 @@ def render_text_wrapped(surface, text, font, color, rect, aa=True):
         traceback.print_exc()
         return 0 # Indicate error
 
+# --- Media Library Index ---
+
+try:
+    locale.setlocale(locale.LC_COLLATE, "") # Sort library names the way the user's language does
+except locale.Error:
+    pass
+
+def library_sort_key(name):
+    """Sort key for artist/album/title names: case- and accent-insensitive, collated for the
+       user's locale, ignoring a leading article ("The Beatles" sorts under B)."""
+    text = (name or "").strip()
+    lowered = text.casefold()
+    for article in LEADING_ARTICLES:
+        if lowered.startswith(article) and len(lowered) > len(article):
+            text = text[len(article):]
+            break
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text.casefold()) if not unicodedata.combining(ch))
+    return locale.strxfrm(text)
+
+
+# files is None when the directory is unchanged since the last scan (its files come from the index)
+DirectoryScan = namedtuple("DirectoryScan", "path root parent mtime_ns files subdirs")
+
+def _scan_directory(path, root, parent, extensions, known_dirs):
+    """Lists one directory with os.scandir. DirEntry type info avoids a stat per entry;
+       entry.stat() for matching files is served from the directory listing on Windows."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        known = known_dirs.get(path)
+        if known and known[0] == mtime_ns:
+            return DirectoryScan(path, root, parent, mtime_ns, None, known[1])
+        files, subdirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(extensions) and entry.is_file():
+                        st = entry.stat()
+                        files.append((entry.path, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    continue # Entry vanished or is unreadable, skip it
+        return DirectoryScan(path, root, parent, mtime_ns, files, subdirs)
+    except OSError as e:
+        print(f"Error scanning directory {path}: {e}")
+        return None
+
+def scan_media_tree(roots, extensions, known_dirs=None, cancel_event=None, max_workers=SCAN_WORKERS):
+    """Recursively scans roots, fanning subtrees out across a thread pool.
+       Yields a DirectoryScan for each directory as soon as it has been listed, so callers can
+       stream results. Stops early when cancel_event is set."""
+    known_dirs = known_dirs or {}
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="library-scan")
+    try:
+        pending = {pool.submit(_scan_directory, root, root, None, extensions, known_dirs) for root in roots}
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                scan = future.result()
+                if scan is None:
+                    continue
+                for subdir in scan.subdirs:
+                    pending.add(pool.submit(_scan_directory, subdir, scan.root, scan.path, extensions, known_dirs))
+                yield scan
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LibraryIndex:
+    """Persistent SQLite index of imported media files.
+
+    Menus are served from the index instead of rescanning folders on every open.
+    Each scanned directory is stored with its mtime so a refresh only lists the
+    directories that actually changed since the last scan."""
+    METADATA_FIELDS = ("duration", "title", "artist", "album", "genre", "track", "width", "height")
+    SORT_KEY_FIELDS = {"title": "title_key", "artist": "artist_key", "album": "album_key", "genre": "genre_key"}
+    UNKNOWN_SORT_KEY = "\U0010ffff" # Untagged groups sort last
+    SCHEMA_VERSION = 3
+
+    def __init__(self, db_path=LIBRARY_INDEX_FILE):
+        self._lock = threading.Lock()
+        try:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._create_schema()
+        except sqlite3.Error as e:
+            print(f"Error opening library index {db_path}: {e}, using in-memory index.")
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                # The index is only a cache of the file system, so an outdated layout is rebuilt
+                self.conn.executescript("DROP TABLE IF EXISTS directories; DROP TABLE IF EXISTS files; "
+                                        "DROP TABLE IF EXISTS music_groups;")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS directories (
+                    media_type TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    root TEXT NOT NULL,
+                    parent TEXT,
+                    mtime_ns INTEGER NOT NULL,
+                    PRIMARY KEY (media_type, path)
+                );
+                CREATE TABLE IF NOT EXISTS files (
+                    media_type TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    root TEXT NOT NULL,
+                    directory TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    duration REAL,
+                    title TEXT,
+                    artist TEXT,
+                    album TEXT,
+                    genre TEXT,
+                    track INTEGER,
+                    width INTEGER,
+                    height INTEGER,
+                    title_key TEXT,
+                    artist_key TEXT,
+                    album_key TEXT,
+                    genre_key TEXT,
+                    tagged INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (media_type, path)
+                );
+                CREATE INDEX IF NOT EXISTS files_by_directory ON files(media_type, directory);
+                CREATE INDEX IF NOT EXISTS files_by_album ON files(media_type, album, artist, track, title_key);
+                CREATE INDEX IF NOT EXISTS files_untagged ON files(media_type, tagged);
+                -- Browse groupings (artists, albums, genres), rebuilt after each scan so menus
+                -- read one sorted index range instead of grouping the whole library
+                CREATE TABLE IF NOT EXISTS music_groups (
+                    kind TEXT NOT NULL,
+                    parent TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    sort_key TEXT NOT NULL,
+                    track_count INTEGER NOT NULL,
+                    PRIMARY KEY (kind, parent, name)
+                );
+                CREATE INDEX IF NOT EXISTS music_groups_sorted ON music_groups(kind, parent, sort_key);
+            """)
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self.conn.commit()
+
+    def refresh(self, media_type, roots, extensions, cancel_event=None, on_directory=None):
+        """Brings the index for media_type in line with the imported root folders.
+           Folders are walked recursively; only directories whose mtime changed are listed again.
+           on_directory(scan, new_paths) is called after each directory is applied.
+           Returns True if any file was added, changed or removed."""
+        changed = self._prune_roots(media_type, roots)
+        known_dirs = self._known_directories(media_type)
+        seen = set()
+        for scan in scan_media_tree(roots, extensions, known_dirs, cancel_event):
+            seen.add(scan.path)
+            new_paths = []
+            if scan.files is not None:
+                new_paths, dir_changed = self._replace_directory(media_type, scan)
+                changed = changed or dir_changed
+            if on_directory:
+                on_directory(scan, new_paths)
+        if cancel_event is not None and cancel_event.is_set():
+            return changed # Partial scan, keep what could not be verified
+        vanished = [path for path in known_dirs if path not in seen]
+        if vanished:
+            changed = self._remove_directories(media_type, vanished) or changed
+        return changed
+
+    def _known_directories(self, media_type):
+        """Returns {path: (mtime_ns, [subdirectories])} for every indexed directory."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, parent, mtime_ns FROM directories WHERE media_type = ?", (media_type,)).fetchall()
+        known = {path: (mtime_ns, []) for path, _, mtime_ns in rows}
+        for path, parent, _ in rows:
+            if parent in known:
+                known[parent][1].append(path)
+        return known
+
+    def _prune_roots(self, media_type, roots):
+        """Drops entries belonging to folders that are no longer imported."""
+        with self._lock:
+            stale = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT root FROM directories WHERE media_type = ?", (media_type,)) if row[0] not in roots]
+        changed = False
+        for root in stale:
+            changed = self._remove_root(media_type, root) or changed
+        return changed
+
+    def _remove_root(self, media_type, root):
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM files WHERE media_type = ? AND root = ?", (media_type, root))
+            self.conn.execute("DELETE FROM directories WHERE media_type = ? AND root = ?", (media_type, root))
+            self.conn.commit()
+            return cur.rowcount > 0
+
+    def _remove_directories(self, media_type, directories):
+        with self._lock:
+            for directory in directories:
+                self.conn.execute("DELETE FROM files WHERE media_type = ? AND directory = ?", (media_type, directory))
+                self.conn.execute("DELETE FROM directories WHERE media_type = ? AND path = ?", (media_type, directory))
+            self.conn.commit()
+        return True
+
+    def _replace_directory(self, media_type, scan):
+        """Diffs a fresh listing of one directory against the index.
+           Unchanged files keep their probed metadata. Returns (new_paths, changed)."""
+        root, directory = scan.root, scan.path
+        with self._lock:
+            existing = {path: (size, mtime) for path, size, mtime in self.conn.execute(
+                "SELECT path, size, mtime_ns FROM files WHERE media_type = ? AND directory = ?", (media_type, directory))}
+            inserts, updates = [], []
+            for path, size, file_mtime_ns in scan.files:
+                old = existing.pop(path, None)
+                if old is None:
+                    inserts.append((media_type, path, root, directory, size, file_mtime_ns))
+                elif old != (size, file_mtime_ns):
+                    updates.append((size, file_mtime_ns, media_type, path))
+            clear_metadata = ", ".join(f"{field} = NULL" for field in
+                                       self.METADATA_FIELDS + tuple(self.SORT_KEY_FIELDS.values())) + ", tagged = 0"
+            self.conn.executemany(
+                "INSERT INTO files (media_type, path, root, directory, size, mtime_ns) VALUES (?, ?, ?, ?, ?, ?)", inserts)
+            self.conn.executemany(
+                f"UPDATE files SET size = ?, mtime_ns = ?, {clear_metadata} WHERE media_type = ? AND path = ?", updates)
+            self.conn.executemany(
+                "DELETE FROM files WHERE media_type = ? AND path = ?", [(media_type, path) for path in existing])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO directories (media_type, path, root, parent, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                (media_type, directory, root, scan.parent, scan.mtime_ns))
+            self.conn.commit()
+            return [row[1] for row in inserts], bool(inserts or updates or existing)
+
+    def get_paths(self, media_type):
+        """Returns all indexed file paths for media_type, sorted by path."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path FROM files WHERE media_type = ? ORDER BY path COLLATE NOCASE", (media_type,))
+            return [row[0] for row in rows]
+
+    def get_metadata(self, media_type, path):
+        """Returns the stored metadata for a file as a dict (None values omitted)."""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.METADATA_FIELDS)} FROM files WHERE media_type = ? AND path = ?",
+                (media_type, path)).fetchone()
+        if not row:
+            return {}
+        return {field: value for field, value in zip(self.METADATA_FIELDS, row) if value is not None}
+
+    def get_search_rows(self, media_type):
+        """Returns (path, title, artist, album) for every indexed file, sorted by path."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, title, artist, album FROM files WHERE media_type = ? ORDER BY path COLLATE NOCASE",
+                (media_type,))
+            return rows.fetchall()
+
+    def set_metadata(self, media_type, path, metadata):
+        """Stores probed metadata (duration, tags, dimensions) for an indexed file."""
+        self.set_metadata_many(media_type, [(path, metadata)])
+
+    def set_metadata_many(self, media_type, entries):
+        """Stores metadata for several files in one transaction; entries are (path, metadata).
+           Sort keys are derived here, and the files are marked as tagged."""
+        with self._lock:
+            for path, metadata in entries:
+                values = {field: metadata[field] for field in self.METADATA_FIELDS if metadata.get(field) is not None}
+                for field, key_field in self.SORT_KEY_FIELDS.items():
+                    if field in values:
+                        values[key_field] = library_sort_key(values[field])
+                assignments = "".join(f"{field} = ?, " for field in values)
+                self.conn.execute(f"UPDATE files SET {assignments}tagged = 1 WHERE media_type = ? AND path = ?",
+                                  list(values.values()) + [media_type, path])
+            self.conn.commit()
+
+    def untagged_paths(self, media_type):
+        """Files whose tags have not been read yet (new or changed since the last scan)."""
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT path FROM files WHERE media_type = ? AND tagged = 0", (media_type,))]
+
+    # --- Music browse groupings ---
+    # kind/parent pairs: ("artist", ""), ("artist_album", artist), ("album", ""), ("genre", ""), ("genre_artist", genre)
+    _GROUP_QUERIES = (
+        ("artist", "''", "COALESCE(artist, '')", "artist_key", "COALESCE(artist, '')"),
+        ("artist_album", "COALESCE(artist, '')", "COALESCE(album, '')", "album_key", "COALESCE(artist, ''), COALESCE(album, '')"),
+        ("album", "''", "COALESCE(album, '')", "album_key", "COALESCE(album, '')"),
+        ("genre", "''", "COALESCE(genre, '')", "genre_key", "COALESCE(genre, '')"),
+        ("genre_artist", "COALESCE(genre, '')", "COALESCE(artist, '')", "artist_key", "COALESCE(genre, ''), COALESCE(artist, '')"),
+    )
+
+    def rebuild_groups(self):
+        """Recomputes the music browse groupings and their sort keys (one pass per kind in SQLite)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM music_groups")
+            for kind, parent, name, key, group_by in self._GROUP_QUERIES:
+                self.conn.execute(
+                    f"INSERT INTO music_groups (kind, parent, name, sort_key, track_count) "
+                    f"SELECT ?, {parent}, {name}, COALESCE(MIN({key}), ?), COUNT(*) FROM files "
+                    f"WHERE media_type = 'music' GROUP BY {group_by}", (kind, self.UNKNOWN_SORT_KEY))
+            self.conn.commit()
+
+    def count_groups(self, kind, parent=""):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM music_groups WHERE kind = ? AND parent = ?",
+                                     (kind, parent)).fetchone()[0]
+
+    def get_groups(self, kind, parent="", offset=0, limit=64):
+        """Returns a sorted page of (name, track_count) for one browse level."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT name, track_count FROM music_groups WHERE kind = ? AND parent = ? "
+                "ORDER BY sort_key, name LIMIT ? OFFSET ?", (kind, parent, limit, offset)).fetchall()
+
+    def get_album_tracks(self, album, artist=None):
+        """Returns (path, title) for an album ("" = untagged) in track order, optionally for one artist."""
+        query = "SELECT path, title FROM files WHERE media_type = 'music' AND COALESCE(album, '') = ?"
+        params = [album]
+        if artist is not None:
+            query += " AND COALESCE(artist, '') = ?"
+            params.append(artist)
+        with self._lock:
+            return self.conn.execute(query + " ORDER BY track, title_key, path", params).fetchall()
+
+    def close(self):
+        with self._lock:
+            try:
+                self.conn.close()
+            except sqlite3.Error as e:
+                print(f"Error closing library index: {e}")
+
+
+class LibraryScan:
+    """Refreshes one library section on a background thread.
+       Newly found files are queued so the menu can show them while the walk continues."""
+    def __init__(self, library, media_type, roots, extensions, tag_reader=None):
+        self.library = library
+        self.media_type = media_type
+        self.tag_reader = tag_reader # Optional read_audio_metadata-style callable for new/changed files
+        self.cancel_event = threading.Event()
+        self.new_paths = queue.Queue()
+        self.dirs_scanned = 0
+        self.files_found = 0
+        self.tags_pending = 0
+        self.tags_read = 0
+        self.changed = False
+        self.done = False
+        self._thread = threading.Thread(target=self._run, args=(list(roots), extensions), daemon=True)
+        self._thread.start()
+
+    def _run(self, roots, extensions):
+        try:
+            self.changed = self.library.refresh(self.media_type, roots, extensions,
+                                                cancel_event=self.cancel_event, on_directory=self._on_directory)
+            if self.tag_reader:
+                self._read_tags()
+        except Exception as e:
+            print(f"Error refreshing {self.media_type} library: {e}")
+        finally:
+            self.done = True
+
+    def _read_tags(self):
+        """Reads tags for new/changed files and refreshes the browse groupings if anything changed."""
+        paths = self.library.untagged_paths(self.media_type)
+        self.tags_pending = len(paths)
+        for start in range(0, len(paths), TAG_BATCH_SIZE):
+            if self.cancel_event.is_set(): break
+            batch = [(path, self.tag_reader(path) or {}) for path in paths[start:start + TAG_BATCH_SIZE]]
+            self.library.set_metadata_many(self.media_type, batch) # Unreadable files are marked too
+            self.tags_read += len(batch)
+        if self.tags_read or self.changed:
+            self.library.rebuild_groups()
+
+    def _on_directory(self, scan, new_paths):
+        self.dirs_scanned += 1
+        if scan.files is not None:
+            self.files_found += len(scan.files)
+        for path in new_paths:
+            self.new_paths.put(path)
+
+    def poll_new_paths(self, max_items=500):
+        """Returns up to max_items newly discovered paths without blocking."""
+        paths = []
+        while len(paths) < max_items:
+            try:
+                paths.append(self.new_paths.get_nowait())
+            except queue.Empty:
+                break
+        return paths
+
+    @property
+    def progress_text(self):
+        if self.tags_pending:
+            return f"Reading tags... {self.tags_read}/{self.tags_pending}"
+        return f"Scanning... {self.dirs_scanned} folders, {self.files_found} files"
+
+    def cancel(self, wait=False):
+        self.cancel_event.set()
+        if wait:
+            self._thread.join()
+
+# --- Library Search ---
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+def normalize_search_text(text):
+    """Casefolds, strips accents and turns punctuation into spaces ("Beyoncé!" -> "beyonce ")."""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text)
+
+def _query_grams(word):
+    """Grams looked up for one typed word; no trailing pad, since the word may be unfinished."""
+    padded = f" {word}"
+    if len(padded) < 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _first_common_ids(postings, docs, limit, exclude=frozenset()):
+    """The first `limit` live doc ids (ascending) present in every posting array, not in exclude.
+
+    Works through the shortest array in growing chunks and intersects only the matching
+    id range of the others, so a common query stops as soon as it has enough hits
+    instead of intersecting whole lists."""
+    postings = sorted(postings, key=len)
+    smallest = postings[0]
+    found = []
+    start, chunk = 0, 1024
+    while start < len(smallest) and len(found) < limit:
+        end = min(start + chunk, len(smallest))
+        low, high = smallest[start], smallest[end - 1] + 1
+        ids = set(smallest[start:end])
+        for posting in postings[1:]:
+            first = bisect_left(posting, low)
+            last = bisect_left(posting, high, first)
+            if len(ids) * 8 < last - first:
+                # Few ids left against a long range: binary search beats walking the range
+                ids = {doc for doc in ids if (i := bisect_left(posting, doc, first, last)) < last and posting[i] == doc}
+            else:
+                ids.intersection_update(posting[first:last])
+            if not ids: break
+        found.extend(sorted(doc for doc in ids if doc not in exclude and docs[doc] is not None))
+        start, chunk = end, chunk * 2
+    return found[:limit]
+
+
+def _first_fuzzy_ids(postings, docs, need, limit, exclude=frozenset()):
+    """The first `limit` live doc ids (ascending) present in at least `need` of the posting
+       arrays, counted one id range at a time so enough early hits end the scan."""
+    end_id = max((posting[-1] for posting in postings if posting), default=-1) + 1
+    found = []
+    low, span = 0, 4096
+    while low < end_id and len(found) < limit:
+        high = low + span
+        counts = Counter()
+        for posting in postings:
+            first = bisect_left(posting, low)
+            counts.update(posting[first:bisect_left(posting, high, first)])
+        found.extend(sorted(doc for doc, count in counts.items()
+                            if count >= need and doc not in exclude and docs[doc] is not None))
+        low, span = high, span * 2
+    return found[:limit]
+
+
+class SearchIndex:
+    """In-memory trigram index over song titles, artists, albums and filenames.
+
+    Postings are append-only arrays of doc ids, so adding a file is cheap and the
+    arrays stay sorted. Re-indexing a file gives it a new id and leaves the old one
+    as a tombstone that is skipped when results are read."""
+    EMPTY = array('I')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {} # gram -> array('I') of doc ids, ascending
+        self._docs = [] # doc id -> (path, label, text), or None once superseded/removed
+        self._doc_of = {} # path -> live doc id
+        self.ready = False # Set once the initial build from the library index finishes
+        self.version = 0 # Bumped on every change, so open searches know to re-run
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    def build(self, library, media_type="music", replace=False):
+        """Indexes everything the library already knows on a background thread.
+           With replace, files already indexed are re-indexed if their tags changed."""
+        def run():
+            try:
+                for path, title, artist, album in library.get_search_rows(media_type):
+                    self.add(path, {"title": title, "artist": artist, "album": album}, replace=replace)
+            except Exception as e:
+                print(f"Error building search index: {e}")
+            finally:
+                self.ready = True
+        threading.Thread(target=run, daemon=True).start()
+
+    def add(self, path, metadata=None, replace=True):
+        """Adds a file, or re-indexes it when its searchable text changed (and replace is set)."""
+        metadata = metadata or {}
+        title, artist, album = metadata.get("title"), metadata.get("artist"), metadata.get("album")
+        name = os.path.splitext(os.path.basename(path))[0]
+        label = f"{title} - {artist}" if title and artist else title or os.path.basename(path)
+        text = normalize_search_text(" ".join(filter(None, (title, artist, album, name))))
+        with self._lock:
+            old = self._doc_of.get(path)
+            if old is not None and (not replace or self._docs[old][2] == text):
+                return
+        words = list(dict.fromkeys(text.split())) # Titles usually repeat in the filename
+        padded = f" {' '.join(words)} "
+        # Every trigram of " word " for each word (windows centred on a space would span two words)
+        grams = {padded[i:i + 3] for i in range(len(padded) - 2) if padded[i + 1] != " "}
+        grams.update(" " + word[0] for word in words) # 2-char word starts, for one-letter queries
+        first_word = normalize_search_text(title or name).split()[:1]
+        if first_word: # Marks where the title starts, for ranking
+            grams.update("^" + first_word[0][:k] for k in (1, 2, 3))
+        with self._lock:
+            old = self._doc_of.get(path)
+            if old is not None:
+                self._docs[old] = None
+            doc_id = len(self._docs)
+            self._docs.append((path, label, text))
+            self._doc_of[path] = doc_id
+            self.version += 1
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array('I')
+                postings.append(doc_id)
+
+    def retain(self, paths):
+        """Drops files that are no longer in the library (paths: the full current listing)."""
+        keep = set(paths)
+        with self._lock:
+            for path in [path for path in self._doc_of if path not in keep]:
+                self._docs[self._doc_of.pop(path)] = None
+                self.version += 1
+
+    def search(self, query, limit=SEARCH_MAX_RESULTS):
+        """Returns up to limit (path, label) pairs: titles starting with the query first,
+           then other files matching every typed word, then near misses (typos)."""
+        words = normalize_search_text(query).split()
+        if not words: return []
+        grams = set()
+        for word in words:
+            grams |= _query_grams(word)
+        with self._lock:
+            postings = [self._postings.get(gram, self.EMPTY) for gram in grams]
+            title_start = self._postings.get("^" + words[0][:3], self.EMPTY)
+            # Ids follow path order from the initial build, so each tier comes out sorted.
+            # Tombstones are skipped as ids are collected, so they never use up the limit
+            ranked = _first_common_ids(postings + [title_start], self._docs, limit)
+            ranked += _first_common_ids(postings, self._docs, limit - len(ranked), exclude=set(ranked))
+            if len(ranked) < limit and len(postings) >= 4:
+                # Tolerate typos: files sharing at least half of the query's grams
+                ranked += _first_fuzzy_ids(postings, self._docs, (len(postings) + 1) // 2, limit - len(ranked), exclude=set(ranked))
+            return [self._docs[doc_id][:2] for doc_id in ranked]
+
+# --- Child Processes ---
+
+class ProcessSupervisor:
+    """Owns every child process the player starts (ffmpeg decoders, ffprobe).
+
+    Each child gets a daemon thread blocked in wait(), so children are reaped off the
+    UI thread as soon as they exit. The exit goes into the pygame event queue as
+    PROCESS_EXIT_EVENT (pid, name, returncode, killed, lifetime). stop() only sends
+    the kill and returns. Children still running when the interpreter exits are killed.
+    Spawn latency and lifetime are recorded per kind of child for stats()."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._children = {} # pid -> (Popen, name, started)
+        self._killed = set() # pids stopped on purpose, so their exit isn't reported as a failure
+        self.metrics = {} # name -> counters, see stats()
+        self.closed = False # Set by kill_all; nothing new is started after that
+        atexit.register(self.kill_all)
+
+    def spawn(self, command, name, low_priority=False, **popen_kwargs):
+        """Starts command like subprocess.Popen (no console window on Windows) and tracks it.
+           low_priority runs it at idle priority, for background work that must never compete
+           with playback. Returns the Popen, or None if it could not be started (or at exit)."""
+        if self.closed:
+            return None
+        if sys.platform == 'win32':
+            popen_kwargs.setdefault("creationflags", subprocess.CREATE_NO_WINDOW |
+                                    (subprocess.IDLE_PRIORITY_CLASS if low_priority else 0))
+        started = time.perf_counter()
+        try:
+            proc = subprocess.Popen(command, **popen_kwargs)
+        except (FileNotFoundError, OSError) as e:
+            print(f"Error launching {name}: {e}")
+            return None
+        spawned = time.perf_counter()
+        if low_priority and hasattr(os, "setpriority"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, proc.pid, 19)
+            except OSError:
+                pass # Already gone, or not allowed; it just runs at normal priority
+        with self._lock:
+            self._children[proc.pid] = (proc, name, spawned)
+            metrics = self.metrics.setdefault(name, {"spawned": 0, "exited": 0, "killed": 0, "failed": 0,
+                                                     "spawn_seconds": 0.0, "spawn_max": 0.0,
+                                                     "lifetime_seconds": 0.0, "lifetime_max": 0.0})
+            metrics["spawned"] += 1
+            metrics["spawn_seconds"] += spawned - started
+            metrics["spawn_max"] = max(metrics["spawn_max"], spawned - started)
+            closed = self.closed
+        threading.Thread(target=self._reap, args=(proc,), name=f"reap-{name}", daemon=True).start()
+        if closed: # kill_all ran while this one was starting
+            self.stop(proc)
+        return proc
+
+    def run(self, command, name, **popen_kwargs):
+        """subprocess.run(capture_output=True) for a supervised child (call from worker threads)."""
+        proc = self.spawn(command, name, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kwargs)
+        if proc is None:
+            raise OSError(f"could not start {name}")
+        stdout, stderr = proc.communicate()
+        return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr)
+
+    def stop(self, proc):
+        """Kills proc without waiting; the reaper thread collects it."""
+        if proc is None or proc.poll() is not None:
+            return
+        with self._lock:
+            self._killed.add(proc.pid)
+        try:
+            proc.kill()
+        except OSError as e:
+            print(f"Error stopping process {proc.pid}: {e}")
+
+    def _reap(self, proc):
+        returncode = proc.wait()
+        with self._lock:
+            _, name, started = self._children.pop(proc.pid, (proc, "process", time.perf_counter()))
+            killed = proc.pid in self._killed
+            self._killed.discard(proc.pid)
+            lifetime = time.perf_counter() - started
+            metrics = self.metrics[name]
+            metrics["exited"] += 1
+            if killed:
+                metrics["killed"] += 1
+            elif returncode:
+                metrics["failed"] += 1
+            metrics["lifetime_seconds"] += lifetime
+            metrics["lifetime_max"] = max(metrics["lifetime_max"], lifetime)
+        if pygame.display.get_init(): # Events need the video subsystem
+            try:
+                pygame.event.post(pygame.event.Event(PROCESS_EXIT_EVENT, pid=proc.pid, name=name, returncode=returncode,
+                                                     killed=killed, lifetime=lifetime))
+            except pygame.error:
+                pass # Queue full or shutting down
+
+    @property
+    def running(self):
+        with self._lock:
+            return len(self._children)
+
+    def kill_all(self):
+        """Kills every child still running (at exit, so no ffmpeg outlives the player).
+           Later spawns are refused, so background tasks still finishing can't start more."""
+        with self._lock:
+            self.closed = True
+            children = [proc for proc, _, _ in self._children.values()]
+        for proc in children:
+            self.stop(proc)
+
+    def stats(self):
+        """Per kind of child: counts plus average/max spawn latency and lifetime in ms."""
+        with self._lock:
+            report = {}
+            for name, metrics in self.metrics.items():
+                report[name] = {key: metrics[key] for key in ("spawned", "exited", "killed", "failed")}
+                report[name]["spawn_ms_avg"] = 1000 * metrics["spawn_seconds"] / metrics["spawned"]
+                report[name]["spawn_ms_max"] = 1000 * metrics["spawn_max"]
+                ended = metrics["exited"]
+                report[name]["lifetime_ms_avg"] = 1000 * metrics["lifetime_seconds"] / ended if ended else 0.0
+                report[name]["lifetime_ms_max"] = 1000 * metrics["lifetime_max"]
+            return report
+
+PROCESSES = ProcessSupervisor()
+
+# --- Media Probing ---
+
+def _first_tag(tags, key):
+    values = tags.get(key) if tags else None
+    if not values:
+        return None
+    value = values[0] if isinstance(values, list) else values
+    return str(value).strip() or None
+
+def read_audio_metadata(filepath, include_art=False):
+    """Reads duration, title, artist, album, genre and track number in-process with mutagen.
+       Returns None if mutagen is unavailable or can't parse the file, so the caller can
+       fall back to ffprobe. With include_art, embedded cover bytes are added as "art"."""
+    if mutagen is None:
+        return None
+    try:
+        audio = mutagen.File(filepath, easy=True)
+    except Exception as e: # mutagen raises a variety of format-specific errors
+        print(f"mutagen could not read {filepath}: {e}")
+        return None
+    if audio is None or audio.info is None:
+        return None
+    tags = audio.tags
+    track = _first_tag(tags, "tracknumber")
+    try:
+        track = int(track.split("/")[0]) if track else None
+    except ValueError:
+        track = None
+    metadata = {
+        "duration": float(getattr(audio.info, "length", 0) or 0),
+        "title": _first_tag(tags, "title"),
+        "artist": _first_tag(tags, "artist"),
+        "album": _first_tag(tags, "album"),
+        "genre": _first_tag(tags, "genre"),
+        "track": track,
+    }
+    if include_art:
+        metadata["art"] = read_embedded_art(filepath)
+    return metadata
+
+def read_embedded_art(filepath):
+    """Returns the embedded cover image bytes (ID3 APIC, FLAC/Vorbis PICTURE) or None."""
+    if mutagen is None:
+        return None
+    try:
+        audio = mutagen.File(filepath)
+        if audio is None:
+            return None
+        pictures = list(getattr(audio, "pictures", None) or []) # FLAC
+        tags = audio.tags
+        if not pictures and tags is not None:
+            if hasattr(tags, "getall"): # ID3 (MP3, WAV)
+                pictures = tags.getall("APIC")
+            elif "metadata_block_picture" in tags: # Ogg Vorbis/Opus
+                from mutagen.flac import Picture
+                pictures = [Picture(base64.b64decode(data)) for data in tags["metadata_block_picture"]]
+        if not pictures:
+            return None
+        # Prefer the front cover (picture type 3) when several are embedded
+        front = [picture for picture in pictures if getattr(picture, "type", None) == 3]
+        return (front or pictures)[0].data
+    except Exception as e:
+        print(f"Could not read embedded art from {filepath}: {e}")
+        return None
+
+def run_ffprobe(ffprobe_exec, filepath):
+    """Runs ffprobe once and returns a dict with duration, dimensions, codec and
+       per-stream info, or None if the file could not be probed."""
+    if not ffprobe_exec or not os.path.isfile(ffprobe_exec):
+        print("ffprobe.exe not set or not found. Cannot probe media.")
+        return None
+    command = [
+        ffprobe_exec,
+        "-v", "error",
+        "-show_entries", "format=duration:stream=index,codec_type,codec_name,width,height,duration",
+        "-of", "json",
+        filepath
+    ]
+    try:
+        result = PROCESSES.run(command, "ffprobe", text=True)
+        data = json.loads(result.stdout or "{}")
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"ffprobe error reading {filepath}: {e}")
+        return None
+    streams = [{"index": stream.get("index"),
+                "type": stream.get("codec_type"),
+                "codec": stream.get("codec_name"),
+                "width": int(stream.get("width", 0)),
+                "height": int(stream.get("height", 0)),
+                "duration": float(stream.get("duration", 0) or 0)} for stream in data.get("streams", [])]
+    if not streams:
+        # Cache-able negative result, so unreadable files don't fork ffprobe on every load
+        print(f"ffprobe could not read streams for: {filepath}")
+        return {"duration": 0, "width": 0, "height": 0, "codec": None, "streams": []}
+    video = next((stream for stream in streams if stream["type"] == "video"), None)
+    audio = next((stream for stream in streams if stream["type"] == "audio"), None)
+    main_stream = video or audio or streams[0]
+    try:
+        duration = float(data.get("format", {}).get("duration", 0) or 0)
+    except ValueError:
+        duration = 0
+    return {
+        "duration": main_stream["duration"] or duration,
+        "width": video["width"] if video else 0,
+        "height": video["height"] if video else 0,
+        "codec": main_stream["codec"],
+        "streams": streams,
+    }
+
+
+class ProbeCache:
+    """Persistent cache of probe results keyed by (path, size, mtime).
+
+    Lives in the library index database, on the index's own connection and lock so
+    the two never contend for the file. A repeat play or skipping back through a
+    playlist is answered from memory or SQLite instead of forking ffprobe again."""
+    def __init__(self, library):
+        self.conn = library.conn
+        self._lock = library._lock
+        self._memory = OrderedDict() # path -> ((size, mtime_ns), info), least recently used first
+        self.hits = 0
+        self.misses = 0
+        try:
+            self._create_schema()
+        except sqlite3.Error as e:
+            print(f"Error creating probe cache tables: {e}")
+
+    def _create_schema(self):
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS probe_cache (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    info TEXT NOT NULL
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS keyframe_index (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    times BLOB NOT NULL -- array('d') of keyframe seconds
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS waveform_peaks (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    peaks BLOB NOT NULL -- array('b') of interleaved min/max per bucket
+                )""")
+            self.conn.commit()
+
+    @staticmethod
+    def file_key(filepath):
+        """Returns the (size, mtime_ns) identity of a file, or None if it can't be read."""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def get(self, filepath, key=None):
+        """Returns the cached info for filepath if it is still current, otherwise None."""
+        key = key or self.file_key(filepath)
+        if key is None:
+            return None
+        with self._lock:
+            cached = self._memory.get(filepath)
+            if cached and cached[0] == key:
+                self._memory.move_to_end(filepath)
+                self.hits += 1
+                return cached[1]
+            row = self.conn.execute("SELECT size, mtime_ns, info FROM probe_cache WHERE path = ?", (filepath,)).fetchone()
+            if row and (row[0], row[1]) == key:
+                try:
+                    info = json.loads(row[2])
+                except json.JSONDecodeError:
+                    info = None
+                if info is not None:
+                    self._remember(filepath, key, info)
+                    self.hits += 1
+                    return info
+            self.misses += 1
+            return None
+
+    def put(self, filepath, info, key=None):
+        key = key or self.file_key(filepath)
+        if key is None or info is None:
+            return
+        with self._lock:
+            self._remember(filepath, key, info)
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO probe_cache (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                                  (filepath, key[0], key[1], json.dumps(info)))
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing probe cache for {filepath}: {e}")
+
+    def _remember(self, filepath, key, info):
+        """Adds to the in-memory tier, evicting the least recently used entry (caller holds the lock)."""
+        self._memory[filepath] = (key, info)
+        self._memory.move_to_end(filepath)
+        if len(self._memory) > PROBE_MEMO_SIZE:
+            self._memory.popitem(last=False)
+
+    def get_keyframes(self, filepath):
+        """Returns the cached keyframe times (array('d')) if still current, otherwise None."""
+        key = self.file_key(filepath)
+        if key is None:
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, times FROM keyframe_index WHERE path = ?", (filepath,)).fetchone()
+        if not row or (row[0], row[1]) != key:
+            return None
+        times = array('d')
+        times.frombytes(row[2])
+        return times
+
+    def put_keyframes(self, filepath, times):
+        key = self.file_key(filepath)
+        if key is None:
+            return
+        with self._lock:
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO keyframe_index (path, size, mtime_ns, times) VALUES (?, ?, ?, ?)",
+                                  (filepath, key[0], key[1], times.tobytes()))
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing keyframe index for {filepath}: {e}")
+
+    def get_waveform(self, filepath):
+        """Returns the cached waveform peaks (array('b')) if still current, otherwise None."""
+        key = self.file_key(filepath)
+        if key is None:
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, peaks FROM waveform_peaks WHERE path = ?", (filepath,)).fetchone()
+        if not row or (row[0], row[1]) != key:
+            return None
+        peaks = array('b')
+        peaks.frombytes(row[2])
+        return peaks
+
+    def put_waveform(self, filepath, peaks):
+        key = self.file_key(filepath)
+        if key is None:
+            return
+        with self._lock:
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO waveform_peaks (path, size, mtime_ns, peaks) VALUES (?, ?, ?, ?)",
+                                  (filepath, key[0], key[1], peaks.tobytes()))
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing waveform for {filepath}: {e}")
+
+    def get_or_probe(self, filepath, probe_fn):
+        """Returns cached info, or calls probe_fn(filepath) on a miss and stores the result."""
+        key = self.file_key(filepath)
+        info = self.get(filepath, key)
+        if info is None:
+            info = probe_fn(filepath)
+            self.put(filepath, info, key)
+        return info
+
+    def stats(self):
+        """Returns hit/miss counters for tuning."""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class MetadataProbePool:
+    """Bounded pool of worker threads that probes playlist entries ahead of time.
+
+    Only the current track and its neighbours are probed; other entries are probed
+    when they come into that window. Results go back to the main loop through a
+    bounded queue that is drained once per frame, so a slow ffprobe never blocks
+    input or drawing. Probed metadata is written to the library in batches."""
+    def __init__(self, library=None, max_workers=PROBE_WORKERS, neighbour_radius=PROBE_NEIGHBOURS):
+        self.library = library # Optional LibraryIndex that receives probed metadata
+        self.neighbour_radius = neighbour_radius
+        # One window's worth of results; workers wait if the main loop falls behind
+        self.results = queue.Queue(maxsize=2 * neighbour_radius + 1)
+        self._cond = threading.Condition()
+        self._owner = None # Player whose playlist is being probed
+        self._urgent = deque()
+        self._done = set() # Paths already probed (or in flight) this session
+        self._unsaved = [] # (media_type, path, info) not yet written to the library
+        self._running = True
+        self._threads = [threading.Thread(target=self._worker, name=f"probe-{i}", daemon=True) for i in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def schedule(self, owner, playlist, current_index):
+        """Re-prioritises probing around current_index of owner's playlist.
+           owner must provide probe_track(path) and media_type."""
+        with self._cond:
+            if owner is not self._owner:
+                self._done.clear()
+            self._owner = owner
+            self._urgent.clear()
+            if playlist and 0 <= current_index < len(playlist):
+                # The current track is always re-probed (cheap when cached) so its result is delivered
+                self._urgent.append((playlist[current_index], True))
+                for distance in range(1, self.neighbour_radius + 1):
+                    for index in (current_index + distance, current_index - distance):
+                        self._urgent.append((playlist[index % len(playlist)], False))
+            self._cond.notify_all()
+
+    def _next_path(self):
+        """Returns the next path to probe (caller holds the condition lock)."""
+        while self._urgent:
+            path, force = self._urgent.popleft()
+            if force or path not in self._done:
+                return path
+        return None
+
+    def _save_metadata(self):
+        """Writes the probed metadata gathered so far in one transaction per media type."""
+        with self._cond:
+            unsaved, self._unsaved = self._unsaved, []
+        by_type = {}
+        for media_type, path, info in unsaved:
+            by_type.setdefault(media_type, []).append((path, info))
+        for media_type, entries in by_type.items():
+            self.library.set_metadata_many(media_type, entries)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                path = self._next_path() if self._running else None
+                flush = path is None and bool(self._unsaved)
+                if not flush:
+                    while self._running and path is None:
+                        self._cond.wait()
+                        path = self._next_path()
+                    if not self._running:
+                        return
+                    self._done.add(path)
+                    owner = self._owner
+            if flush: # Window finished; store its metadata before waiting for more work
+                self._save_metadata()
+                continue
+            try:
+                info = owner.probe_track(path)
+            except Exception as e:
+                print(f"Error probing {path}: {e}")
+                info = None
+            if info and self.library:
+                with self._cond:
+                    self._unsaved.append((owner.media_type, path, info))
+            self.results.put((owner, path, info))
+
+    def drain(self):
+        """Returns all finished (owner, path, info) results without blocking."""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def shutdown(self, wait=False):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                while thread.is_alive(): # A worker may be blocked on the full results queue
+                    self.drain()
+                    thread.join(0.05)
+        if self.library and self._unsaved:
+            self._save_metadata()
+
 # --- UI Classes ---
 
-class StatusBar:
+class Widget:
+    """Mixin for retained-mode drawing: a widget only redraws when what it shows changed.
+
+    Subclasses return everything their draw() depends on from render_state(); state that
+    can't be snapshotted cheaply (e.g. theme colours) calls mark_dirty() instead."""
+    dirty = True
+    _drawn_state = None
+
+    def render_state(self):
+        return None
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def needs_redraw(self):
+        return self.dirty or self.render_state() != self._drawn_state
+
+    def mark_drawn(self):
+        self.dirty = False
+        self._drawn_state = self.render_state()
+
+    @property
+    def dirty_rect(self):
+        """Screen area touched by draw()."""
+        return self.rect
+
+
+class StatusBar(Widget):
     """Handles drawing the top status bar."""
+    BATTERY_SIZE = (20, 10)
+
     def __init__(self, font, current_theme_name):
         self.font = font
         self.height = STATUS_BAR_HEIGHT
+        self.rect = pygame.Rect(0, 0, SCREEN_WIDTH, self.height)
         self.battery_level = 1.0 # 0.0 to 1.0
         self.battery_charging = False # Placeholder
         self.update_theme(current_theme_name)
@@ -256,8 +1486,16 @@ class StatusBar:
         self.text_color = get_themed_color(theme_name, "text")
         self.gradient_start = (0, 150, 0) # Green gradient for battery
         self.gradient_end = (0, 255, 0)
+        # Full battery fill baked once; lower levels blit a clipped part of it
+        self.battery_fill = bake_gradient((self.BATTERY_SIZE[0] - 2, self.BATTERY_SIZE[1] - 2),
+                                          self.gradient_start, self.gradient_end, vertical=False)
+        self.mark_dirty()
+
+    def render_state(self):
+        return (datetime.datetime.now().strftime("%H:%M"), self.battery_level, self.battery_charging)
 
     def draw(self, surface):
+        self.mark_drawn()
         # Background
         pygame.draw.rect(surface, self.bg_color, (0, 0, SCREEN_WIDTH, self.height))
         pygame.draw.line(surface, GRAY, (0, self.height -1), (SCREEN_WIDTH, self.height -1))
@@ -265,13 +1503,12 @@ class StatusBar:
         # Time
         now = datetime.datetime.now()
         time_str = now.strftime("%H:%M")
-        time_surf = self.font.render(time_str, True, self.text_color)
+        time_surf = render_text(self.font, time_str, self.text_color)
         time_rect = time_surf.get_rect(center=(SCREEN_WIDTH // 2, self.height // 2))
         surface.blit(time_surf, time_rect)
 
         # Battery Icon (simple gradient version)
-        batt_width = 20
-        batt_height = 10
+        batt_width, batt_height = self.BATTERY_SIZE
         batt_x = SCREEN_WIDTH - batt_width - 10
         batt_y = (self.height - batt_height) // 2
         batt_rect = pygame.Rect(batt_x, batt_y, batt_width, batt_height)
@@ -286,9 +1523,8 @@ class StatusBar:
 
         # Fill based on level with gradient
         fill_width = int((batt_width - 2) * self.battery_level) # -2 for border
-        fill_rect = pygame.Rect(batt_x + 1, batt_y + 1, fill_width, batt_height - 2)
         if fill_width > 0:
-            draw_gradient_rect(surface, fill_rect, self.gradient_start, self.gradient_end, vertical=False)
+            surface.blit(self.battery_fill, (batt_x + 1, batt_y + 1), area=(0, 0, fill_width, batt_height - 2))
 
         # Program Name (Optional, maybe place elsewhere)
         # name_surf = self.font.render("Perfect Pineapple Player", True, self.text_color)
@@ -296,29 +1532,121 @@ class StatusBar:
         # surface.blit(name_surf, name_rect)
 
 
-class SidePanel:
+class SidePanel(Widget):
     """Handles drawing the side panel (e.g., for album art or context)."""
     def __init__(self, current_theme_name):
         self.width = SIDE_PANEL_WIDTH
         # Position on the right
         self.rect = pygame.Rect(SCREEN_WIDTH - self.width, STATUS_BAR_HEIGHT, self.width, SCREEN_HEIGHT - STATUS_BAR_HEIGHT)
+        self.art = None # Cover of the highlighted track's album, pre-scaled to the panel width
         self.update_theme(current_theme_name)
 
     def update_theme(self, theme_name):
         theme = THEMES.get(theme_name, THEMES[DEFAULT_THEME])
         self.gradient_start, self.gradient_end = theme["side_gradient"]
+        # Baked once per theme so the frame path is a single blit
+        self.background = bake_gradient(self.rect.size, self.gradient_start, self.gradient_end, vertical=True)
+        self.mark_dirty()
 
-    def draw(self, surface):
-        draw_gradient_rect(surface, self.rect, self.gradient_start, self.gradient_end, vertical=True)
-        # Placeholder for content (e.g., album art)
-        # title_font = pygame.font.SysFont(None, 18)
-        # title_surf = title_font.render("Now Playing", True, BLACK) # Use theme text color
+    def render_state(self):
+        return id(self.art)
 
+    def set_art(self, art):
+        self.art = art
 
-class Menu:
+    def draw(self, surface):
+        self.mark_drawn()
+        surface.blit(self.background, self.rect.topleft)
+        if self.art:
+            surface.blit(self.art, self.art.get_rect(centerx=self.rect.centerx, top=self.rect.top + 10))
+
+
+class PlaylistMenuItems:
+    """Lazy menu item provider over a playlist: a row is only built when the Menu draws it.
+
+    Shares the player's playlist list, so streamed scan results show up without copying.
+    File rows carry their playlist index (an int) as the action; header rows, the
+    placeholder rows and the trailing Back keep string actions.
+    labels, if given, are display names parallel to paths (e.g. song titles)."""
+    def __init__(self, media_type, paths, header=(), empty_text="No media found.", labels=None):
+        self.media_type = media_type
+        self.paths = paths
+        self.labels = labels
+        self.header = list(header)
+        self.placeholder = [(empty_text, None), ("(Import in Settings)", None)]
+
+    def __len__(self):
+        if not self.paths:
+            return len(self.placeholder) + 1
+        return len(self.header) + len(self.paths) + 1
+
+    def __getitem__(self, index):
+        length = len(self)
+        if index < 0: index += length
+        if not 0 <= index < length:
+            raise IndexError(index)
+        if index == length - 1:
+            return ("Back", "back")
+        if not self.paths:
+            return self.placeholder[index]
+        if index < len(self.header):
+            return self.header[index]
+        index -= len(self.header)
+        label = self.labels[index] if self.labels and index < len(self.labels) else None
+        return (label or os.path.basename(self.paths[index]), index)
+
+
+class GroupMenuItems:
+    """Lazy menu item provider over one level of the music hierarchy (artists, albums, genres).
+
+    Rows come from the precomputed, pre-sorted music_groups table a page at a time, so a
+    library with thousands of artists opens instantly. Rows carry their position (an int)
+    as the action; name_at() maps it back to the group name."""
+    PAGE_SIZE = 64
+    UNKNOWN_NAMES = {"artist": "Unknown Artist", "genre_artist": "Unknown Artist", "album": "Unknown Album",
+                     "artist_album": "Unknown Album", "genre": "Unknown Genre"}
+
+    def __init__(self, library, kind, parent=""):
+        self.media_type = "music"
+        self.library = library
+        self.kind = kind
+        self.parent = parent
+        self.placeholder = [("No music found.", None), ("(Import in Settings)", None)]
+        self.reload()
+
+    def reload(self):
+        """Drops cached pages, e.g. after a scan rebuilt the groupings."""
+        self._count = None
+        self._pages = {}
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.library.count_groups(self.kind, self.parent)
+        return (self._count or len(self.placeholder)) + 1
+
+    def name_at(self, index):
+        page, offset = divmod(index, self.PAGE_SIZE)
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self._pages[page] = self.library.get_groups(self.kind, self.parent, page * self.PAGE_SIZE, self.PAGE_SIZE)
+        return rows[offset][0] if offset < len(rows) else None
+
+    def __getitem__(self, index):
+        length = len(self)
+        if index < 0: index += length
+        if not 0 <= index < length:
+            raise IndexError(index)
+        if index == length - 1:
+            return ("Back", "back")
+        if not self._count:
+            return self.placeholder[index]
+        return (self.name_at(index) or self.UNKNOWN_NAMES[self.kind], index)
+
+
+class Menu(Widget):
     """Handles drawing and interaction for a list-based menu."""
     def __init__(self, items, font, item_height=20):
-        self.items = items # List of strings or tuples (display_name, action_key)
+        self.items = items # Sequence of strings or tuples (display_name, action_key), e.g. a list or PlaylistMenuItems
         self.font = font
         self.item_height = item_height
         self.selected_index = 0
@@ -328,14 +1656,21 @@ class Menu:
         self.theme_bg = WHITE
         self.theme_text = BLACK
         self.theme_highlight = BLUE
+        self.footer_text = None # Optional status line (e.g. scan progress) below the items
 
     def update_theme(self, theme_name):
         self.theme_bg = get_themed_color(theme_name, "bg")
         self.theme_text = get_themed_color(theme_name, "text")
         self.theme_highlight = get_themed_color(theme_name, "highlight")
+        self.mark_dirty()
+
+    def render_state(self):
+        # Items are replaced or grow (streaming scans), so identity + length covers changes
+        return (id(self.items), len(self.items), self.selected_index, self.scroll_offset, self.footer_text)
 
     def get_visible_items_count(self):
-        return self.rect.height // self.item_height
+        rows = self.rect.height // self.item_height
+        return rows - 1 if self.footer_text else rows
 
     def navigate(self, direction):
         """Handles up/down navigation."""
@@ -365,6 +1700,7 @@ class Menu:
         return item[1] if isinstance(item, tuple) else item # Return action key or the item itself if simple list
 
     def draw(self, surface):
+        self.mark_drawn()
         surface.fill(self.theme_bg, self.rect)
         visible_count = self.get_visible_items_count()
         max_text_width = self.rect.width - 10
@@ -380,23 +1716,32 @@ class Menu:
             text_color = self.theme_bg if is_selected else self.theme_text
             if is_selected:
                 pygame.draw.rect(surface, bg_color, (self.rect.left, y, self.rect.width, self.item_height))
-            # Truncate text if too long
-            display_text = truncate_text(display_text, self.font, max_text_width)
-            text_surf = self.font.render(display_text, True, text_color)
+            # Truncate text if too long (cached, so steady-state frames don't rasterise)
+            text_surf = render_text(self.font, display_text, text_color, max_width=max_text_width)
             text_rect = text_surf.get_rect(left=self.rect.left + 5, centery=y + self.item_height // 2)
             surface.blit(text_surf, text_rect)
+        if self.footer_text:
+            footer_y = self.rect.bottom - self.item_height
+            pygame.draw.line(surface, GRAY, (self.rect.left, footer_y), (self.rect.right, footer_y))
+            footer_surf = render_text(self.font, self.footer_text, self.theme_text, max_width=max_text_width)
+            footer_rect = footer_surf.get_rect(left=self.rect.left + 5, centery=footer_y + self.item_height // 2)
+            surface.blit(footer_surf, footer_rect)
 
 # --- Media Player Classes (Placeholders) ---
 
-class BaseMediaPlayer:
+class BaseMediaPlayer(Widget):
     """Base class for media players."""
-    def __init__(self, font, initial_theme):
+    media_type = None # Library section the player's files belong to
+
+    def __init__(self, font, initial_theme, probe_pool=None):
         self.font = font
+        self.probe_pool = probe_pool # Optional MetadataProbePool for non-blocking metadata
         self.playlist = []
         self.current_index = -1
         self.is_playing = False
         self.playback_position = 0 # In seconds
         self.duration = 0 # In seconds
+        self.track_info = {} # Metadata of the loaded track (path, title, artist, ...)
         # Player area should match the Menu area (now on the left)
         self.rect = pygame.Rect(0, STATUS_BAR_HEIGHT, MAIN_AREA_WIDTH, SCREEN_HEIGHT - STATUS_BAR_HEIGHT)
         self.update_theme(initial_theme)
@@ -405,13 +1750,20 @@ class BaseMediaPlayer:
         self.theme_bg = get_themed_color(theme_name, "bg")
         self.theme_text = get_themed_color(theme_name, "text")
         self.theme_highlight = get_themed_color(theme_name, "highlight") # For progress bar etc.
+        self.mark_dirty()
 
     def load_playlist(self, files):
+        """Replaces the playlist; no track is loaded until one is picked (open_media)."""
         self.playlist = files
-        self.current_index = 0 if files else -1
+        self.current_index = -1
         self.stop()
-        if self.current_index != -1:
-            self._load_current_track()
+
+    def replace_playlist(self, files):
+        """Swaps in a re-read listing in place (menus share the list), keeping the current track."""
+        current_path = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+        self.playlist[:] = files
+        if current_path is not None:
+            self.current_index = self.playlist.index(current_path) if current_path in self.playlist else -1
 
     def play_pause(self):
         if self.current_index == -1: return
@@ -455,7 +1807,27 @@ class BaseMediaPlayer:
             if self.playback_position >= self.duration > 0:
                 self.next_track() # Auto-advance
 
+    def _progress_bar_rect(self):
+        content_area = self.rect.inflate(-20, -20) # Area for positioning text
+        return pygame.Rect(content_area.left, content_area.bottom - 10, content_area.width, 10)
+
+    def _progress_fill_width(self, pb_rect):
+        if self.duration <= 0: return 0
+        progress = self.playback_position / self.duration
+        return max(0, int((pb_rect.width - 2) * progress)) # Ensure fill_width is not negative
+
+    def _time_text(self):
+        status_text = "Playing" if self.is_playing else "Paused" if self.current_index != -1 else "Stopped"
+        pos_str = format_time(self.playback_position) # Always format current position
+        dur_str = format_time(self.duration) if self.duration > 0 else "--:--" # Show --:-- if duration unknown
+        return f"{status_text} | {pos_str} / {dur_str}"
+
+    def render_state(self):
+        # Only redraw when a visible pixel changes: title, time text (per second) or progress fill
+        return (self.current_track_title, self._time_text(), self._progress_fill_width(self._progress_bar_rect()))
+
     def draw(self, surface):
+        self.mark_drawn()
         surface.fill(self.theme_bg, self.rect)
 
         # --- Define Layout Areas ---
@@ -464,35 +1836,57 @@ class BaseMediaPlayer:
         # --- Draw Title (Truncated) --- Near the Top
         if self.current_track_title:
             title_max_width = content_area.width
-            truncated_title = truncate_text(self.current_track_title, self.font, title_max_width)
-            title_surf = self.font.render(truncated_title, True, self.theme_text)
+            title_surf = render_text(self.font, self.current_track_title, self.theme_text, max_width=title_max_width)
             # Position title near the top, centered horizontally
             title_rect = title_surf.get_rect(centerx=self.rect.centerx, top=content_area.top + 10)
             surface.blit(title_surf, title_rect)
 
         # --- Progress Bar --- Near the Bottom
-        pb_rect = pygame.Rect(content_area.left, content_area.bottom - 10, content_area.width, 10)
+        pb_rect = self._progress_bar_rect()
         pygame.draw.rect(surface, GRAY, pb_rect, 1) # Draw outline regardless of duration
         # Draw fill only if duration is known and positive
-        if self.duration > 0:
-            progress = self.playback_position / self.duration if self.duration else 0
-            fill_width = int((pb_rect.width - 2) * progress)
-            # Ensure fill_width is not negative
-            fill_width = max(0, fill_width)
-            fill_rect = pygame.Rect(pb_rect.left + 1, pb_rect.top + 1, fill_width, pb_rect.height - 2)
-            pygame.draw.rect(surface, self.theme_highlight, fill_rect)
+        self._draw_progress_fill(surface, pb_rect, self._progress_fill_width(pb_rect))
 
         # --- Playback Status and Time --- Just Above Progress Bar
-        status_text = "Playing" if self.is_playing else "Paused" if self.current_index != -1 else "Stopped"
-        pos_str = format_time(self.playback_position) # Always format current position
-        dur_str = format_time(self.duration) if self.duration > 0 else "--:--" # Show --:-- if duration unknown
-        time_text = f"{status_text} | {pos_str} / {dur_str}"
-        time_surf = self.font.render(time_text, True, self.theme_text)
+        time_surf = render_text(self.font, self._time_text(), self.theme_text)
         # Position time text just above the progress bar
         time_rect = time_surf.get_rect(centerx=self.rect.centerx, bottom=pb_rect.top - 5)
         surface.blit(time_surf, time_rect)
 
+    def _draw_progress_fill(self, surface, pb_rect, fill_width):
+        if fill_width > 0:
+            fill_rect = pygame.Rect(pb_rect.left + 1, pb_rect.top + 1, fill_width, pb_rect.height - 2)
+            pygame.draw.rect(surface, self.theme_highlight, fill_rect)
+
+    def request_track_info(self):
+        """Fills in track_info/duration for the current track without blocking the UI.
+           Duration shows as --:-- until the probe lands in on_probe_result()."""
+        filepath = self.playlist[self.current_index]
+        self.track_info = {"path": filepath}
+        self.duration = 0
+        if self.probe_pool:
+            self.probe_pool.schedule(self, self.playlist, self.current_index)
+        else:
+            self.on_probe_result(filepath, self.probe_track(filepath))
+
+    def on_probe_result(self, filepath, info):
+        """Applies a finished probe if it belongs to the current track (main thread)."""
+        if not info or not (0 <= self.current_index < len(self.playlist)): return
+        if self.playlist[self.current_index] != filepath: return
+        self.track_info = dict(info, path=filepath)
+        self.duration = info.get("duration") or 0
+
+    @property
+    def is_loading(self):
+        """True while background work for the current item is still outstanding."""
+        return False
+
+    def next_change_ms(self):
+        """Milliseconds until the display next changes while playing, or None if unknown."""
+        return None
+
     # --- Methods to be implemented by subclasses ---
+    def probe_track(self, filepath): return {} # Runs on a probe worker thread
     def _load_current_track(self): pass
     def _play(self): pass
     def _pause(self): pass
@@ -503,30 +1897,283 @@ class BaseMediaPlayer:
     @property
     def current_track_title(self):
         if self.current_index != -1 and self.current_index < len(self.playlist):
-            return os.path.basename(self.playlist[self.current_index])
+            filepath = self.playlist[self.current_index]
+            if self.track_info.get("path") == filepath and self.track_info.get("title"):
+                return self.track_info["title"]
+            return os.path.basename(filepath)
         return ""
 
 
+def read_waveform_peaks(ffmpeg_exec, filepath, duration, buckets=WAVEFORM_BUCKETS):
+    """Decodes a track to low-rate mono PCM with an idle-priority ffmpeg and reduces it to
+       min/max peaks per bucket, block by block with NumPy, so the whole track is never in
+       memory. Returns array('b') of interleaved min/max pairs (8-bit), or None."""
+    rate = WAVEFORM_SAMPLE_RATE
+    command = [ffmpeg_exec, "-v", "error", "-nostdin", "-threads", "1", "-i", filepath,
+               "-vn", "-sn", "-ac", "1", "-ar", str(rate), "-f", "s16le", "pipe:1"]
+    proc = PROCESSES.spawn(command, "ffmpeg-waveform", low_priority=True, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    if proc is None:
+        return None
+    # Reduce to 4x the final resolution while streaming (duration may be off), then merge below
+    per_bucket = max(1, int(duration * rate / (buckets * 4))) if duration > 0 else rate // 10
+    lows, highs = [], []
+    carry = numpy.empty(0, dtype=numpy.int16)
+    with proc.stdout:
+        while True:
+            block = proc.stdout.read(WAVEFORM_BLOCK_BYTES)
+            if not block: break
+            samples = numpy.frombuffer(block, dtype="<i2", count=len(block) // 2)
+            if carry.size:
+                samples = numpy.concatenate((carry, samples))
+            whole = samples.size - samples.size % per_bucket
+            if whole:
+                frames = samples[:whole].reshape(-1, per_bucket)
+                lows.append(frames.min(axis=1))
+                highs.append(frames.max(axis=1))
+            carry = samples[whole:]
+    if carry.size:
+        lows.append(carry.min(keepdims=True))
+        highs.append(carry.max(keepdims=True))
+    if proc.wait() != 0 or not lows: # Killed at exit, or not audio ffmpeg can read
+        return None
+    lows, highs = numpy.concatenate(lows), numpy.concatenate(highs)
+    if lows.size > buckets:
+        edges = numpy.linspace(0, lows.size, buckets + 1).astype(numpy.intp)[:-1]
+        lows, highs = numpy.minimum.reduceat(lows, edges), numpy.maximum.reduceat(highs, edges)
+    peaks = numpy.empty(2 * lows.size, dtype=numpy.int8)
+    peaks[0::2] = lows >> 8
+    peaks[1::2] = highs >> 8
+    return array('b', peaks.tobytes())
+
+
+class WaveformIndex:
+    """Waveform peaks per track for the music progress bar, computed once on a background
+       thread (the decoding happens in ffmpeg) and kept in the probe cache, keyed by path,
+       size and mtime. Needs NumPy and ffmpeg; without them the bar stays flat."""
+    def __init__(self, ffmpeg_exec, probe_cache=None):
+        self.ffmpeg_exec = ffmpeg_exec
+        self.probe_cache = probe_cache
+        self._peaks = {} # path -> array('b') (empty if the track couldn't be read)
+        self._pending = {} # path -> Future
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="waveforms")
+
+    def get(self, path):
+        """Returns the peaks for path, or None while they are still being computed."""
+        future = self._pending.get(path)
+        if future and future.done():
+            del self._pending[path]
+            try:
+                self._peaks[path] = future.result() or array('b')
+            except Exception as e:
+                print(f"Error reading waveform of {path}: {e}")
+                self._peaks[path] = array('b')
+        return self._peaks.get(path)
+
+    def request(self, path, duration):
+        if path in self._peaks or path in self._pending: return
+        if self.probe_cache or (self.ffmpeg_exec and numpy is not None):
+            self._pending[path] = self._executor.submit(self._build, path, duration)
+
+    def _build(self, path, duration):
+        """Worker: loads the cached peaks or computes and caches them."""
+        peaks = self.probe_cache.get_waveform(path) if self.probe_cache else None
+        if peaks is None and self.ffmpeg_exec and numpy is not None:
+            started = time.perf_counter()
+            peaks = read_waveform_peaks(self.ffmpeg_exec, path, duration)
+            if peaks is not None:
+                print(f"Read waveform of {os.path.basename(path)} in {time.perf_counter() - started:.2f}s")
+                if self.probe_cache:
+                    self.probe_cache.put_waveform(path, peaks)
+        return peaks
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def bake_waveform(peaks, size, color):
+    """Draws min/max peaks (array('b') pairs) as one vertical line per column on a
+       transparent surface of size, scaled so the loudest peak fills the height."""
+    width, height = size
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    buckets = len(peaks) // 2
+    if not buckets or width <= 0 or height <= 0:
+        return surface
+    loudest = max(1, max(abs(value) for value in peaks))
+    middle = (height - 1) / 2
+    for x in range(width):
+        first = x * buckets // width
+        last = max(first + 1, (x + 1) * buckets // width)
+        low = min(peaks[2 * first:2 * last:2])
+        high = max(peaks[2 * first + 1:2 * last:2])
+        top = round(middle - high / loudest * middle)
+        bottom = round(middle - low / loudest * middle)
+        pygame.draw.line(surface, color, (x, top), (x, max(top, bottom)))
+    return surface
+
+
+class PlaybackClock:
+    """Position of the track in pygame.mixer.music, measured by the mixer itself.
+
+    pygame.mixer.music.get_pos() counts milliseconds of audio actually mixed since play()
+    (it stands still while paused, and restarts when a queued track takes over), but it
+    knows nothing about set_pos(). The clock adds the last seek target and subtracts the
+    get_pos() reading taken at that seek. Readings never move backwards except on seek()."""
+    def __init__(self):
+        self.offset = 0.0 # Track position (seconds) at the last start/seek
+        self._base_ms = 0 # get_pos() when that position was set
+        self._last = 0.0
+
+    def start(self, position=0.0):
+        """Call right after pygame.mixer.music.play() (or a gapless switch) at position."""
+        self.offset = position
+        self._base_ms = 0 # get_pos() restarts from 0 on play() and on a queued track
+        self._last = position
+
+    def seek(self, position):
+        """Call after a successful pygame.mixer.music.set_pos(position)."""
+        self.offset = position
+        self._base_ms = max(0, pygame.mixer.music.get_pos())
+        self._last = position
+
+    def position(self):
+        ms = pygame.mixer.music.get_pos()
+        if ms >= 0: # -1 when nothing has been played
+            self._last = max(self._last, self.offset + (ms - self._base_ms) / 1000)
+        return self._last
+
+
 class MusicPlayer(BaseMediaPlayer):
     """Handles music playback using pygame.mixer."""
-    def __init__(self, font, initial_theme, ffprobe_exec=None):
-        super().__init__(font, initial_theme)
+    media_type = "music"
+
+    def __init__(self, font, initial_theme, ffprobe_exec=None, probe_cache=None, probe_pool=None, gapless=True,
+                 ffmpeg_exec=None):
+        super().__init__(font, initial_theme, probe_pool)
         pygame.mixer.init()
-        self._start_time = 0
-        self._paused_position = 0
+        pygame.mixer.music.set_endevent(MUSIC_END_EVENT) # Track ends are handled in on_track_end()
+        self.clock = PlaybackClock()
+        self._paused = False
         self.ffprobe_exec = ffprobe_exec # Store ffprobe path for duration detection
+        self.probe_cache = probe_cache # Optional ProbeCache shared with the other players
+        self.gapless = gapless
+        self._queued_index = None # Playlist entry already handed to the mixer to follow the current one
+        self._probed_ahead = OrderedDict() # path -> metadata of recently probed neighbours, for the switch
+        self.waveforms = WaveformIndex(ffmpeg_exec, probe_cache) # Progress bar overviews, made in the background
+
+    def update_theme(self, theme_name):
+        super().update_theme(theme_name)
+        self._waveform = None # (path, played surface, unplayed surface), baked in the theme colours
+
+    def _halt_mixer(self):
+        """Stops the mixer (dropping any queued track) without it counting as a track ending."""
+        pygame.mixer.music.set_endevent() # Stopping posts the end event too; mute it
+        pygame.mixer.music.stop()
+        pygame.mixer.music.set_endevent(MUSIC_END_EVENT)
+        pygame.event.clear(MUSIC_END_EVENT) # An end that raced with this stop is stale now
+        self._queued_index = None
+        self._paused = False
+
+    def _queue_next_track(self):
+        """Hands the next playlist entry to the mixer so it starts the instant this one ends.
+           Its metadata is probed ahead by the probe pool (neighbours of the current track)."""
+        if not self.gapless or self._queued_index is not None or len(self.playlist) < 2: return
+        next_index = (self.current_index + 1) % len(self.playlist)
+        try:
+            pygame.mixer.music.queue(self.playlist[next_index]) # Opened and decoder set up now, not at the switch
+        except pygame.error as e:
+            print(f"Error queueing music {self.playlist[next_index]}: {e}")
+            return # Falls back to loading it when the end event arrives
+        self._queued_index = next_index
+
+    def replace_playlist(self, files):
+        """Also follows the track already queued in the mixer to its new position; if it
+           is gone, the new next entry replaces it (pygame keeps one queued track)."""
+        queued_path = self.playlist[self._queued_index] if self._queued_index is not None else None
+        super().replace_playlist(files)
+        if queued_path is None: return
+        if queued_path in self.playlist and self.current_index != -1:
+            self._queued_index = self.playlist.index(queued_path)
+        else:
+            self._queued_index = None
+            if self.is_playing and self.current_index != -1:
+                self._queue_next_track()
+
+    def on_probe_result(self, filepath, info):
+        if info: # The probe pool works ahead of the current track; keep those for gapless switches
+            self._probed_ahead[filepath] = info
+            self._probed_ahead.move_to_end(filepath)
+            if len(self._probed_ahead) > 2 * PROBE_NEIGHBOURS + 1:
+                self._probed_ahead.popitem(last=False)
+        super().on_probe_result(filepath, info)
+
+    def on_track_end(self):
+        """Handles the mixer's end event: the queued track is already playing, so only the
+           player state switches over; without one, the next track is loaded as before."""
+        if not self.is_playing or self.current_index == -1: return
+        if self._queued_index is None:
+            self.next_track()
+            return
+        self.current_index = self._queued_index
+        self._queued_index = None
+        info = self._probed_ahead.get(self.playlist[self.current_index])
+        if info:
+            self.on_probe_result(self.playlist[self.current_index], info)
+            if self.probe_pool: # Keep probing ahead of the new position
+                self.probe_pool.schedule(self, self.playlist, self.current_index)
+        else:
+            self.request_track_info()
+        self.clock.start() # The mixer restarted get_pos() when it switched
+        self.playback_position = 0
+        print(f"Playing Music: {os.path.basename(self.playlist[self.current_index])} (gapless)")
+        self._queue_next_track()
+
+    def update(self):
+        if self.is_playing:
+            self._update_position() # Track changes come from the mixer end event (on_track_end)
+        if self.current_index != -1 and self.duration > 0:
+            path = self.playlist[self.current_index]
+            if not self._waveform or self._waveform[0] != path:
+                self.waveforms.request(path, self.duration) # After the probe, so playback has already started
+                peaks = self.waveforms.get(path)
+                if peaks:
+                    self._bake_waveform(path, peaks)
+
+    def _progress_bar_rect(self):
+        content_area = self.rect.inflate(-20, -20)
+        return pygame.Rect(content_area.left, content_area.bottom - WAVEFORM_BAR_HEIGHT, content_area.width, WAVEFORM_BAR_HEIGHT)
+
+    def _bake_waveform(self, path, peaks):
+        """Renders the track's peaks once per track (and theme); drawing is then two blits."""
+        pb_rect = self._progress_bar_rect()
+        size = (pb_rect.width - 2, pb_rect.height - 2)
+        self._waveform = (path, bake_waveform(peaks, size, self.theme_highlight), bake_waveform(peaks, size, GRAY))
+
+    def _draw_progress_fill(self, surface, pb_rect, fill_width):
+        if not self._waveform or self._waveform[0] != self.playlist[self.current_index]:
+            return super()._draw_progress_fill(surface, pb_rect, fill_width)
+        _, played, unplayed = self._waveform
+        inner = (pb_rect.left + 1, pb_rect.top + 1)
+        surface.blit(unplayed, inner)
+        if fill_width > 0:
+            surface.blit(played, inner, (0, 0, fill_width, played.get_height()))
+
+    def render_state(self):
+        return super().render_state() + (self._waveform[0] if self._waveform else None,)
+
+    def shutdown(self, wait=False):
+        self.waveforms.shutdown(wait)
 
     def _load_current_track(self):
         if self.current_index != -1:
             filepath = self.playlist[self.current_index]
             try:
+                self._halt_mixer()
                 pygame.mixer.music.load(filepath)
-                self.duration = self._get_music_duration_ffprobe(filepath)
+                self.request_track_info() # Duration arrives asynchronously
                 self.playback_position = 0
-                self._start_time = 0
-                self._paused_position = 0
+                self.clock.start()
                 self.is_playing = False # Reset playing state
-                print(f"Loaded Music: {os.path.basename(filepath)} ({self.duration:.2f}s)")
+                print(f"Loaded Music: {os.path.basename(filepath)}")
             except pygame.error as e:
                 print(f"Error loading music {filepath}: {e}")
                 self.current_index = -1
@@ -537,124 +2184,536 @@ class MusicPlayer(BaseMediaPlayer):
                 self.duration = 0 # Set duration to 0 if ffprobe fails
                 self.playback_position = 0
 
+    def probe_track(self, filepath):
+        """Reads tags and duration in-process; ffprobe is only used for files mutagen can't parse."""
+        metadata = read_audio_metadata(filepath) or {}
+        if not metadata.get("duration"):
+            metadata["duration"] = self._get_music_duration_ffprobe(filepath)
+        return metadata
+
     def _get_music_duration_ffprobe(self, filepath):
-        """Gets music duration using ffprobe.exe."""
-        if not self.ffprobe_exec or not os.path.isfile(self.ffprobe_exec):
-            print("ffprobe.exe not set or not found. Cannot get music duration.")
-            return 0
-        try:
-            result = subprocess.run([
-                self.ffprobe_exec,
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                filepath
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            duration_str = result.stdout.strip()
-            if duration_str:
-                duration = float(duration_str)
-                if duration > 0:
-                    return duration
-            print(f"ffprobe could not get duration for: {filepath}")
-        except Exception as e:
-            print(f"ffprobe error reading {filepath}: {e}")
+        """Gets music duration using ffprobe.exe (cached by path, size and mtime)."""
+        probe = lambda path: run_ffprobe(self.ffprobe_exec, path)
+        info = self.probe_cache.get_or_probe(filepath, probe) if self.probe_cache else probe(filepath)
+        if info and info["duration"] > 0:
+            return info["duration"]
+        print(f"ffprobe could not get duration for: {filepath}")
         return 0
 
     def play_pause(self):
         if self.current_index == -1: return
 
-        if not pygame.mixer.music.get_busy(): # If not playing or paused
+        # get_busy() is False while paused (pygame 2), so the pause state is tracked here
+        if self.is_playing: # If playing, pause
+            pygame.mixer.music.pause() # get_pos() stands still while paused, so the clock does too
+            self.is_playing = False
+            self._paused = True
+            print("Music paused")
+        elif self._paused: # If paused, unpause
+            pygame.mixer.music.unpause()
+            self.is_playing = True
+            self._paused = False
+            print("Music resumed")
+        else: # Stopped or freshly loaded
             try:
                 pygame.mixer.music.play()
                 self.is_playing = True
-                self._start_time = time.time() - self._paused_position # Adjust start time based on paused pos
-                self._paused_position = 0
+                self.clock.start()
                 print("Music playing")
+                self._queue_next_track()
             except pygame.error as e:
                 print(f"Error playing music: {e}")
-        elif self.is_playing: # If playing, pause
-            pygame.mixer.music.pause()
-            self.is_playing = False
-            # Store position when paused
-            self._paused_position = time.time() - self._start_time + self._paused_position
-            print("Music paused")
-        else: # If paused, unpause
-            pygame.mixer.music.unpause()
-            self.is_playing = True
-            # Reset start time based on stored paused position
-            self._start_time = time.time() - self._paused_position
-            self._paused_position = 0
-            print("Music resumed")
 
     def stop(self):
-        pygame.mixer.music.stop()
+        self._halt_mixer()
         self.is_playing = False
         self.playback_position = 0
-        self._start_time = 0
-        self._paused_position = 0
-        self.current_index = -1 # Indicate stopped
+        self.clock.start()
+        # current_index is kept so next_track/prev_track and load_playlist move relative to it
         self.duration = 0
         print("Music stopped")
 
     def seek(self, seconds):
         if not self.duration > 0: return # Can't seek without duration
-        # Calculate target position based on internal timer
-        current_pos = self.playback_position
-        target_pos = current_pos + seconds
-        target_pos = max(0, min(self.duration - 0.1, target_pos)) # Clamp within bounds
-
+        target_pos = max(0, min(self.duration - 0.1, self.playback_position + seconds)) # Clamp within bounds
         try:
-            # Still use set_pos for the actual audio engine seek
             pygame.mixer.music.set_pos(target_pos)
-            # Update internal timer state to match seek
-            self.playback_position = target_pos
-            self._paused_position = 0 # Reset paused position after seek
-            if self.is_playing:
-                 self._start_time = time.time() - target_pos
-            else:
-                 # If paused, update the effective _paused_position
-                 self._paused_position = target_pos
-            print(f"Seeked music to: {target_pos:.2f}s")
         except pygame.error as e:
             print(f"Error seeking music (set_pos): {e}")
-            # Attempt to resync internal timer even if set_pos fails
-            self.playback_position = target_pos
-            self._paused_position = 0
-            if self.is_playing:
-                 self._start_time = time.time() - target_pos
-            else:
-                 self._paused_position = target_pos
+            return # The mixer didn't move, so neither does the clock
+        self.clock.seek(target_pos)
+        self.playback_position = target_pos
+        print(f"Seeked music to: {target_pos:.2f}s")
 
     def _update_position(self):
-        # Remove the duration > 0 check here - update timer if playing
-        if self.is_playing:
-            elapsed = time.time() - self._start_time + self._paused_position
-            # Clamp position based on duration *if* duration is known
-            if self.duration > 0:
-                self.playback_position = max(0, min(elapsed, self.duration))
-                # Check if track ended based on our timer
-                if self.playback_position >= self.duration:
-                    self.stop() # Or potentially move to next track
-                    print("Music track finished (timer based)")
+        position = self.clock.position()
+        # Clamp to the duration when known; the mixer end event advances the track
+        self.playback_position = min(position, self.duration) if self.duration > 0 else position
+
+    def next_change_ms(self):
+        """Milliseconds until the time text or the progress fill next changes, so the main
+           loop can sleep exactly that long instead of polling."""
+        if not self.is_playing: return None
+        position = self.clock.position()
+        wait = 1 - position % 1 # Next whole second on the time text
+        fill_width = self._progress_bar_rect().width - 2
+        if self.duration > 0 and fill_width > 0:
+            per_pixel = self.duration / fill_width
+            wait = min(wait, per_pixel - position % per_pixel)
+        return max(1, int(wait * 1000) + 1)
+
+
+# --- In-window Video ---
+
+def read_keyframe_times(ffprobe_exec, filepath):
+    """Lists a video's keyframe times (seconds from the start) by reading packet headers
+       with ffprobe; nothing is decoded, so this is fast even for long films."""
+    command = [ffprobe_exec, "-v", "error", "-select_streams", "v:0",
+               "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", filepath]
+    try:
+        result = PROCESSES.run(command, "ffprobe-keyframes", text=True)
+    except OSError as e:
+        print(f"ffprobe error indexing {filepath}: {e}")
+        return None
+    first, keyframes = None, []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        try:
+            pts = float(pts)
+        except ValueError:
+            continue # N/A
+        first = pts if first is None else min(first, pts) # ffmpeg's -ss counts from the stream start
+        if "K" in flags:
+            keyframes.append(pts)
+    return array('d', sorted(pts - first for pts in keyframes))
+
+def nearest_keyframe(times, target, current):
+    """The keyframe time closest to target that still moves away from current in the seek's
+       direction (with sparse keyframes the closest one may be behind a forward seek).
+       Returns None if there is none, e.g. past the last keyframe."""
+    index = bisect_left(times, target)
+    candidates = times[max(0, index - 1):index + 1]
+    if target > current:
+        candidates = [time_ for time_ in candidates if time_ > current] or times[bisect_right(times, current):][:1]
+    else:
+        candidates = [time_ for time_ in candidates if time_ < current] or times[:bisect_left(times, current)][-1:]
+    return min(candidates, key=lambda time_: abs(time_ - target)) if candidates else None
+
+
+class KeyframeIndex:
+    """Keyframe times per video, built once on a background thread and kept on disk in the
+       probe cache (keyed by path, size and mtime), so seeks can land on keyframes."""
+    def __init__(self, ffprobe_exec, probe_cache=None):
+        self.ffprobe_exec = ffprobe_exec
+        self.probe_cache = probe_cache
+        self._times = {} # path -> array('d') (empty if the file couldn't be indexed)
+        self._pending = {} # path -> Future
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keyframes")
+
+    def get(self, path):
+        """Returns the keyframe times for path, or None while it is still being built."""
+        future = self._pending.get(path)
+        if future and future.done():
+            del self._pending[path]
+            try:
+                self._times[path] = future.result() or array('d')
+            except Exception as e:
+                print(f"Error indexing keyframes of {path}: {e}")
+                self._times[path] = array('d')
+        return self._times.get(path)
+
+    def request(self, path):
+        if path not in self._times and path not in self._pending and self.ffprobe_exec:
+            self._pending[path] = self._executor.submit(self._build, path)
+
+    def _build(self, path):
+        """Worker: loads the cached index or builds and caches it."""
+        times = self.probe_cache.get_keyframes(path) if self.probe_cache else None
+        if times is None:
+            started = time.perf_counter()
+            times = read_keyframe_times(self.ffprobe_exec, path)
+            if times is not None:
+                print(f"Indexed {len(times)} keyframes of {os.path.basename(path)} in {time.perf_counter() - started:.2f}s")
+                if self.probe_cache:
+                    self.probe_cache.put_keyframes(path, times)
+        return times
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def scrub_interval(duration):
+    """Seconds between seek-bar preview frames for a video of this length."""
+    return max(SCRUB_INTERVAL_SECONDS, -(-int(duration) // SCRUB_MAX_TILES))
+
+def read_scrub_frames(ffmpeg_exec, filepath, interval, tile_size):
+    """Decodes one small frame every interval seconds in a single ffmpeg pass and returns
+       them as RGB bytes. Only keyframes are decoded (-skip_frame nokey), and the fps filter
+       repeats the nearest one where they are sparse, so a film takes seconds, not a full
+       decode. ffmpeg runs at idle priority so it never competes with playback."""
+    width, height = tile_size
+    command = [ffmpeg_exec, "-v", "error", "-nostdin", "-threads", "1", "-skip_frame", "nokey", "-i", filepath,
+               "-an", "-sn", "-vf", f"fps=1/{interval},scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                                    f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+               "-pix_fmt", "rgb24", "-f", "rawvideo", "pipe:1"]
+    proc = PROCESSES.spawn(command, "ffmpeg-scrub", low_priority=True, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    if proc is None:
+        return None
+    frame_bytes = width * height * 3
+    frames = []
+    with proc.stdout:
+        while True:
+            frame = proc.stdout.read(frame_bytes)
+            if len(frame) < frame_bytes: break
+            frames.append(frame)
+    if proc.wait() != 0: # Killed at exit, or the file isn't a video ffmpeg can read
+        return None
+    return frames
+
+
+class ScrubSheet:
+    """A video's seek-bar previews: one surface of tiles, one every interval seconds."""
+    def __init__(self, surface, interval, tile_size=SCRUB_TILE_SIZE):
+        self.surface = surface
+        self.interval = interval
+        self.tile_size = tile_size
+        self.columns = surface.get_width() // tile_size[0]
+        self.count = self.columns * (surface.get_height() // tile_size[1])
+
+    def tile(self, position):
+        """Subsurface with the preview nearest to position (seconds)."""
+        index = max(0, min(self.count - 1, round(position / self.interval)))
+        width, height = self.tile_size
+        row, column = divmod(index, self.columns)
+        return self.surface.subsurface((column * width, row * height, width, height))
+
+
+class ScrubPreviews:
+    """Seek-bar preview sheets per video, made once on a background thread and saved as a
+       JPEG under SCRUB_DIR keyed by path, size and mtime (like ThumbnailStore)."""
+    def __init__(self, ffmpeg_exec, cache_dir=SCRUB_DIR, tile_size=SCRUB_TILE_SIZE):
+        self.ffmpeg_exec = ffmpeg_exec
+        self.cache_dir = cache_dir
+        self.tile_size = tile_size
+        self._sheets = {} # path -> ScrubSheet (None if no previews could be made)
+        self._pending = {} # path -> Future
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrub-previews")
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, filepath, interval):
+        st = os.stat(filepath)
+        key = (f"{os.path.abspath(filepath)}|{st.st_size}|{st.st_mtime_ns}|"
+               f"{self.tile_size[0]}x{self.tile_size[1]}|{interval}")
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+    def get(self, path):
+        """Returns the ScrubSheet for path, or None while it is still being made (or failed)."""
+        future = self._pending.get(path)
+        if future and future.done():
+            del self._pending[path]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error making seek previews for {path}: {e}")
+                result = None
+            if result:
+                size, data, interval = result
+                self._sheets[path] = ScrubSheet(pygame.image.fromstring(data, size, "RGB").convert(), interval,
+                                                self.tile_size)
             else:
-                # If duration is unknown, just let playback_position increase
-                self.playback_position = max(0, elapsed)
-        # If paused, position is fixed
-        elif not self.is_playing and self._paused_position > 0:
-             self.playback_position = self._paused_position
+                self._sheets[path] = None
+        return self._sheets.get(path)
+
+    def request(self, path, duration):
+        if duration > 0 and path not in self._sheets and path not in self._pending and self.ffmpeg_exec:
+            self._pending[path] = self._executor.submit(self._build, path, scrub_interval(duration))
+
+    def _build(self, path, interval):
+        """Worker: loads the cached sheet or makes and caches it. Returns (size, RGB bytes, interval)."""
+        load_pil()
+        cached = self.cache_path(path, interval)
+        try:
+            with PILImage.open(cached) as img:
+                img = img.convert("RGB")
+            self.hits += 1
+            return img.size, img.tobytes(), interval
+        except OSError:
+            pass # Not made yet (or unreadable)
+        self.misses += 1
+        started = time.perf_counter()
+        frames = read_scrub_frames(self.ffmpeg_exec, path, interval, self.tile_size)
+        if not frames:
+            return None
+        width, height = self.tile_size
+        columns = min(SCRUB_COLUMNS, len(frames))
+        rows = -(-len(frames) // columns)
+        frames += [frames[-1]] * (columns * rows - len(frames)) # Pad the last row with the final frame
+        sheet = PILImage.new("RGB", (columns * width, rows * height))
+        for index, frame in enumerate(frames):
+            row, column = divmod(index, columns)
+            sheet.paste(PILImage.frombytes("RGB", (width, height), frame), (column * width, row * height))
+        print(f"Made {len(frames)} seek previews of {os.path.basename(path)} in {time.perf_counter() - started:.2f}s")
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            tmp_path = f"{cached}.{threading.get_ident()}.tmp"
+            sheet.save(tmp_path, "JPEG", quality=80)
+            os.replace(tmp_path, cached) # Readers never see a half-written sheet
+        except OSError as e:
+            print(f"Error writing seek previews for {path}: {e}")
+        return sheet.size, sheet.tobytes(), interval
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class MediaClock:
+    """Pausable playback clock on time.monotonic, shared by a video's audio and frames.
+       The audio feed re-anchors it when the sound card drifts (VideoStream.feed_audio)."""
+    def __init__(self, position=0.0):
+        self._origin = None # monotonic time of position 0 while running
+        self._position = position # Position while paused
+
+    @property
+    def running(self):
+        return self._origin is not None
+
+    def start(self):
+        if self._origin is None:
+            self._origin = time.monotonic() - self._position
+
+    def pause(self):
+        self._position = self.position()
+        self._origin = None
+
+    def set(self, position):
+        if self._origin is None:
+            self._position = position
+        else:
+            self._origin = time.monotonic() - position
+
+    def position(self):
+        return time.monotonic() - self._origin if self._origin is not None else self._position
+
+
+class FrameRing:
+    """Preallocated RGB frame buffers cycled between a decoder thread and the main loop.
+
+    Every buffer has a surface made with pygame.image.frombuffer that shares its memory, so
+    a frame read off the pipe is blitted as-is: no bytes objects, no per-frame surfaces."""
+    def __init__(self, size, count=VIDEO_RING_FRAMES):
+        self.size = size
+        self.frame_bytes = size[0] * size[1] * 3
+        self.buffers = [bytearray(self.frame_bytes) for _ in range(count)]
+        self.surfaces = [pygame.image.frombuffer(buffer, size, "RGB") for buffer in self.buffers]
+        self.free = queue.Queue() # Slots the decoder thread may fill
+        for slot in range(count):
+            self.free.put(slot)
+        self.filled = deque() # (slot, frame number, decode seconds) in display order; popped by the main loop
+
+    def release(self, slot):
+        self.free.put(slot)
+
+
+class VideoStream:
+    """One ffmpeg decode of a video from a start position, for in-window playback.
+
+    Frames come from an ffmpeg that scales and letterboxes to the video area and emits
+    rawvideo at VIDEO_FPS, so frame n belongs at start + n / VIDEO_FPS. Audio comes from a
+    second ffmpeg as PCM in the mixer's own format and is played in short chunks on a
+    reserved mixer channel. Both pipes are read on daemon threads; the main loop only
+    pops finished frames and queues audio chunks.
+
+    With keyframe set, start is a keyframe time and ffmpeg starts decoding right there
+    (-noaccurate_seek) instead of decoding from the previous keyframe and discarding."""
+    def __init__(self, ffmpeg_exec, filepath, start, size, channel, audio=True, keyframe=False):
+        self.start = start
+        self.ring = FrameRing(size)
+        self.channel = channel
+        self.launched = time.perf_counter()
+        self.first_frame_seconds = None # Launch to first decoded frame
+        self.video_eof = False
+        self.audio_eof = False
+        self._stop = threading.Event()
+        self._audio_chunks = queue.Queue(maxsize=VIDEO_AUDIO_QUEUE)
+        self._audio_sent = 0 # Sample frames handed to the channel so far
+        self._queued_start = None # Position where the chunk waiting in the channel queue begins
+
+        width, height = size
+        video_filter = (f"fps={VIDEO_FPS},scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
+        seek = []
+        if keyframe and start > 0: # Just past the keyframe, so rounding can't land on the one before
+            seek = ["-noaccurate_seek", "-ss", f"{start + 0.001:.3f}"]
+        elif start > 0:
+            seek = ["-ss", f"{start:.3f}"]
+        self._video_proc = PROCESSES.spawn([ffmpeg_exec, "-v", "error", "-nostdin", *seek, "-i", filepath,
+                                            "-an", "-sn", "-vf", video_filter, "-pix_fmt", "rgb24", "-f", "rawvideo", "pipe:1"],
+                                           "ffmpeg-video", stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, bufsize=0)
+        self.video_pid = self._video_proc.pid if self._video_proc else None
+        self.video_exit = None if self._video_proc else -1 # Decoder exit code, from PROCESS_EXIT_EVENT
+        threading.Thread(target=self._read_video, name="video-frames", daemon=True).start()
+
+        self._audio_proc = None
+        frequency, sample_format, channels = pygame.mixer.get_init() or (0, 0, 0)
+        if audio and sample_format == -16: # Signed 16-bit, pygame's default; other formats play silent
+            self.frequency = frequency
+            self._frame_size = 2 * channels
+            self._audio_proc = PROCESSES.spawn([ffmpeg_exec, "-v", "error", "-nostdin", *seek, "-i", filepath,
+                                                "-vn", "-sn", "-f", "s16le", "-ac", str(channels), "-ar", str(frequency), "pipe:1"],
+                                               "ffmpeg-audio", stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, bufsize=0)
+        if self._audio_proc:
+            threading.Thread(target=self._read_audio, name="video-audio", daemon=True).start()
+        else:
+            self.audio_eof = True
+
+    def _read_video(self):
+        """Decoder thread: reads whole frames straight into free ring buffers."""
+        ring, number = self.ring, 0
+        pipe = self._video_proc.stdout if self._video_proc else None
+        while pipe and not self._stop.is_set():
+            try:
+                slot = ring.free.get(timeout=0.1)
+            except queue.Empty:
+                continue # Ring full: the main loop is behind or paused
+            view = memoryview(ring.buffers[slot])
+            started = time.perf_counter()
+            got = 0
+            try:
+                while got < ring.frame_bytes:
+                    count = pipe.readinto(view[got:])
+                    if not count: break
+                    got += count
+            except (OSError, ValueError): # Pipe closed by stop()
+                pass
+            view.release()
+            if got < ring.frame_bytes:
+                ring.release(slot)
+                break
+            if number == 0:
+                self.first_frame_seconds = time.perf_counter() - self.launched
+            ring.filled.append((slot, number, time.perf_counter() - started))
+            number += 1
+        self.video_eof = True
+
+    def _read_audio(self):
+        """Audio thread: reads fixed-size PCM chunks for the mixer channel."""
+        chunk_bytes = int(self.frequency * VIDEO_AUDIO_CHUNK_SECONDS) * self._frame_size
+        pipe = self._audio_proc.stdout
+        while not self._stop.is_set():
+            try:
+                chunk = pipe.read(chunk_bytes)
+                while chunk and len(chunk) < chunk_bytes: # Pipes return short reads
+                    more = pipe.read(chunk_bytes - len(chunk))
+                    if not more: break
+                    chunk += more
+            except (OSError, ValueError):
+                break
+            if not chunk: break
+            while not self._stop.is_set():
+                try:
+                    self._audio_chunks.put(chunk, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue # Enough audio buffered; wait for the channel to use some
+        self.audio_eof = True
+
+    @property
+    def ready(self):
+        """True once there is something to start playback with (first frame and audio)."""
+        video = bool(self.ring.filled) or self.video_eof
+        audio = not self._audio_chunks.empty() or self.audio_eof
+        return video and audio
+
+    @property
+    def finished(self):
+        return (self.video_eof and not self.ring.filled and self.audio_eof
+                and self._audio_chunks.empty() and not self.channel.get_busy())
+
+    def frame_time(self, number):
+        return self.start + number / VIDEO_FPS
+
+    def feed_audio(self, clock):
+        """Keeps one chunk queued behind the playing one (main thread, every update).
+           When a queued chunk takes over, its start position is known exactly, so the
+           clock is pulled back to the audio if they drifted more than AV_SYNC_TOLERANCE."""
+        if self._queued_start is not None and self.channel.get_queue() is None:
+            if abs(clock.position() - self._queued_start) > AV_SYNC_TOLERANCE:
+                clock.set(self._queued_start)
+            self._queued_start = None
+        if self._queued_start is not None: return
+        try:
+            chunk = self._audio_chunks.get_nowait()
+        except queue.Empty:
+            return
+        chunk_start = self.start + self._audio_sent / self.frequency
+        self._audio_sent += len(chunk) // self._frame_size
+        sound = pygame.mixer.Sound(buffer=chunk)
+        if self.channel.get_busy():
+            self.channel.queue(sound)
+            self._queued_start = chunk_start
+        else: # First chunk, or the decoder fell behind and the channel ran dry
+            self.channel.play(sound)
+            clock.set(chunk_start)
+
+    def pause(self):
+        self.channel.pause()
+
+    def resume(self):
+        self.channel.unpause()
+
+    def close(self):
+        """Stops decoding without waiting for the ffmpeg processes to exit."""
+        self._stop.set()
+        self.channel.stop()
+        PROCESSES.stop(self._video_proc)
+        PROCESSES.stop(self._audio_proc)
 
 
 class VideoPlayer(BaseMediaPlayer):
-    """Handles video playback using ffplay external process."""
-    def __init__(self, font, initial_theme, settings):
-        super().__init__(font, initial_theme)
+    """Plays video inside the window: frames and audio decoded by ffmpeg (see VideoStream)."""
+    media_type = "videos"
+
+    def __init__(self, font, initial_theme, settings, probe_cache=None, probe_pool=None):
+        super().__init__(font, initial_theme, probe_pool)
         self.settings = settings # Need settings reference
+        self.probe_cache = probe_cache # Optional ProbeCache shared with the other players
         self.ffprobe_exec = None # Full path to ffprobe.exe
-        self.ffplay_exec = None  # Full path to ffplay.exe
+        self.ffmpeg_exec = None  # Full path to ffmpeg.exe
         self.video_playback_enabled = False
-        # Initialize ffplay process tracking attributes
-        self._ffplay_process = None
-        self._ff_start_time = 0
+        self.info_font = pygame.font.SysFont(None, 18) # Created once so cached text surfaces stay valid
+        self.stream = None # VideoStream of the current video, kept while paused
+        self.clock = MediaClock()
+        self.frame = None # Surface on screen; belongs to a stream's FrameRing
+        self._frame_slot = None
+        self._frame_ring = None # Ring that owns the frame on screen (the previous stream's until a seek lands)
+        self._seek_started = None # perf_counter() of the seek still waiting for its first frame
+        self._started = False # The stream delivered its first frame and the clock may run
+        self.decode_failed = False # ffmpeg exited with an error for the current video
+        self.scrub_target = None # Position previewed while LB/RB is held; playback moves there on release
+        self.scrub_sheet = None # ScrubSheet of the current video, once made
+        self._scrub_direction = 0
+        self._scrub_pressed_at = 0.0
+        self._scrub_next_step = 0.0
+        # Counters for tuning (stats())
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self._decode_seconds = 0.0
+        self._decode_max = 0.0
+        self.first_frame_seconds = None
+        self.seek_latencies = deque(maxlen=100) # Seek to first new frame on screen, seconds
+
+        # The video sits between the title and the time text
+        content_area = self.rect.inflate(-20, -20)
+        top = content_area.top + 10 + self.font.get_linesize() + 4
+        bottom = self._progress_bar_rect().top - 5 - self.font.get_linesize() - 4
+        self.video_rect = pygame.Rect(content_area.left, top, content_area.width, bottom - top)
+
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_reserved(1) # Channel 0 carries video audio; Sound.play() never takes it
+        self.audio_channel = pygame.mixer.Channel(0)
 
         # --- Find and set FFmpeg path --- 
         ffmpeg_dir = self.settings.get("ffmpeg_path")
@@ -670,297 +2729,682 @@ class VideoPlayer(BaseMediaPlayer):
                  
         if ffmpeg_dir: # Path is now validated (either from settings or prompt)
             self.ffprobe_exec = os.path.join(ffmpeg_dir, "ffprobe.exe")
-            self.ffplay_exec = os.path.join(ffmpeg_dir, "ffplay.exe")
+            self.ffmpeg_exec = os.path.join(ffmpeg_dir, "ffmpeg.exe")
             self.video_playback_enabled = True
-            print(f"FFmpeg executables set: \n  Probe: {self.ffprobe_exec}\n  Play: {self.ffplay_exec}")
+            print(f"FFmpeg executables set: \n  Probe: {self.ffprobe_exec}\n  Decode: {self.ffmpeg_exec}")
         else:
              print("ERROR: Could not determine FFmpeg path. Video playback will be disabled.")
-             # Keep self.ffprobe_exec and self.ffplay_exec as None
+             # Keep self.ffprobe_exec and self.ffmpeg_exec as None
              self.video_playback_enabled = False
+        self.keyframes = KeyframeIndex(self.ffprobe_exec, probe_cache) # Seek targets, built in the background
+        self.scrub_previews = ScrubPreviews(self.ffmpeg_exec) # Seek-bar previews, made in the background
 
     def _get_video_info(self, filepath):
-        """Uses ffprobe to get video duration and dimensions."""
+        """Uses ffprobe to get video duration, dimensions and whether there is an audio track
+           (cached by path, size and mtime)."""
         if not self.video_playback_enabled or not self.ffprobe_exec:
             print("Video info unavailable: Playback disabled or ffprobe path not set.")
-            return 0, (0, 0)
-
-        command = [
-            self.ffprobe_exec, # USE FULL PATH
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height,duration",
-            "-of", "json",
-            filepath
-        ]
-        try:
-            result = subprocess.run(command, capture_output=True, text=True, check=True,
-                                  creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
-            data = json.loads(result.stdout)
-            if "streams" in data and data["streams"]:
-                stream = data["streams"][0]
-                duration = float(stream.get("duration", 0))
-                width = int(stream.get("width", 0))
-                height = int(stream.get("height", 0))
-                return duration, (width, height)
-            else:
-                return 0, (0, 0)
-        except (subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError, KeyError, ValueError) as e:
-            print(f"Error getting video info for {filepath}: {e}")
-            return 0, (0, 0)
+            return 0, (0, 0), False
+
+        probe = lambda path: run_ffprobe(self.ffprobe_exec, path)
+        info = self.probe_cache.get_or_probe(filepath, probe) if self.probe_cache else probe(filepath)
+        if not info:
+            print(f"Error getting video info for {filepath}")
+            return 0, (0, 0), False
+        has_audio = any(stream["type"] == "audio" for stream in info.get("streams", []))
+        return info["duration"], (info["width"], info["height"]), has_audio
+
+    def probe_track(self, filepath):
+        duration, (width, height), has_audio = self._get_video_info(filepath)
+        return {"duration": duration, "width": width, "height": height, "has_audio": has_audio}
+
+    def on_probe_result(self, filepath, info):
+        super().on_probe_result(filepath, info)
+        if self.track_info.get("path") == filepath and self.duration > 0:
+            self.scrub_previews.request(filepath, self.duration) # Needs the duration for its interval
 
     def _load_current_track(self):
-        self._stop_ffplay() # Ensure previous process is stopped
+        self._close_stream() # Ensure previous decode is stopped
         self.is_playing = False
+        self.decode_failed = False
+        self.scrub_target = None
+        self._scrub_direction = 0
+        self.scrub_sheet = None
         self.playback_position = 0
         self.duration = 0
 
         if self.current_index != -1 and self.video_playback_enabled:
             filepath = self.playlist[self.current_index]
             try:
-                self.duration, _ = self._get_video_info(filepath)
-                print(f"Loaded Video: {filepath} ({self.duration:.2f}s)")
+                self.request_track_info() # Duration arrives asynchronously
+                self.keyframes.request(filepath)
+                print(f"Loaded Video: {filepath}")
             except Exception as e:
                 print(f"Error preparing video {filepath}: {e}")
                 self.duration = 0
         elif not self.video_playback_enabled:
              print("Cannot load video track: Video playback is disabled.")
 
-    def _launch_ffplay(self, start_pos=0):
-        """Launches ffplay process."""
-        if not self.video_playback_enabled or not self.ffplay_exec or self.current_index == -1:
-             print("Cannot launch ffplay: Playback disabled, path not found, or no track selected.")
+    def _open_stream(self, position, keyframe=False):
+        """Starts decoding the current video at position; the clock waits for the first frame.
+           The frame on screen stays up until the new stream's first frame replaces it."""
+        self._close_stream(keep_frame=True)
+        if not self.video_playback_enabled or not self.ffmpeg_exec or self.current_index == -1:
+             print("Cannot start video: Playback disabled, path not found, or no track selected.")
              return
-
         filepath = self.playlist[self.current_index]
-        command = [
-            self.ffplay_exec, # USE FULL PATH
-            "-v", "error",
-            "-autoexit",
-            "-window_title", f"Perfect Pineapple Player - {os.path.basename(filepath)}",
-        ]
-        if start_pos > 0:
-            command.extend(["-ss", str(start_pos)])
-        command.append(filepath)
-
-        try:
-            # Use Popen for non-blocking execution
-            # CREATE_NEW_PROCESS_GROUP allows terminating the whole process tree (might not be needed)
-            # CREATE_NO_WINDOW hides the console window on Windows if ffplay itself shows one
-            creation_flags = 0
-            if sys.platform == 'win32':
-                 creation_flags = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
-
-            self._ffplay_process = subprocess.Popen(command, creationflags=creation_flags)
-            self._ff_start_time = time.time() - start_pos # Record start time relative to seek position
-            self.playback_position = start_pos # Set estimated position
-            print(f"Launched ffplay for {filepath} at {start_pos}s")
-        except (FileNotFoundError, OSError) as e:
-            print(f"Error launching ffplay: {e}")
-            self._ffplay_process = None
-
-    def _stop_ffplay(self):
-        """Stops the ffplay process if running."""
-        if self._ffplay_process:
-            print("Stopping ffplay...")
-            try:
-                # Terminate politely first, then kill if necessary
-                self._ffplay_process.terminate()
-                try:
-                    self._ffplay_process.wait(timeout=0.5) # Wait briefly
-                except subprocess.TimeoutExpired:
-                    print("ffplay did not terminate, killing...")
-                    self._ffplay_process.kill()
-            except OSError as e:
-                # Handle cases where process already exited
-                if e.winerror != 5: # Access is denied (sometimes happens if already gone)
-                     print(f"Error stopping ffplay: {e}")
-            except Exception as e:
-                 print(f"Unexpected error stopping ffplay: {e}")
-            finally:
-                 self._ffplay_process = None
+        self.clock.pause()
+        self.clock.set(position)
+        self.playback_position = position
+        has_audio = self.track_info.get("has_audio", True) # Unknown until the probe lands: try
+        self.stream = VideoStream(self.ffmpeg_exec, filepath, position, self.video_rect.size, self.audio_channel,
+                                  has_audio, keyframe=keyframe)
+        self.decode_failed = False
+        print(f"Decoding {os.path.basename(filepath)} from {position:.1f}s")
+
+    def _close_stream(self, keep_frame=False):
+        if self.stream:
+            self.stream.close() # Its reader thread never touches the slot on screen
+            self.stream = None
+        if not keep_frame:
+            self.frame = None
+            self._frame_slot = None
+            self._frame_ring = None
+            self._seek_started = None
+        self._started = False
+        self.clock.pause()
 
     def _play(self):
         if not self.video_playback_enabled: return
-        if self._ffplay_process: # Already playing (or process exists)
-            # We can't reliably unpause, so maybe do nothing or log?
-            print("ffplay already running (or failed to stop previously)")
-            # Attempt to stop just in case it's a zombie process
-            # self._stop_ffplay()
+        if self.stream: # Paused: the decode session is still there
+            self.stream.resume()
+            if self._started:
+                self.clock.start()
         else:
-            # Relaunch from current (possibly paused) position
-            self._launch_ffplay(start_pos=self.playback_position)
+            self._open_stream(self.playback_position)
 
     def _pause(self):
-        # Can't truly pause, so stop ffplay and keep position
-        if self._ffplay_process:
-             # Update estimated position before stopping
-             self._update_position()
-             self._stop_ffplay()
-             # is_playing will be set to False by play_pause
+        # ffmpeg simply blocks on the full pipe while paused
+        if self.stream:
+            self.stream.pause()
+            self.clock.pause()
+            self._update_position()
 
     def _stop(self):
-        self._stop_ffplay()
+        self._close_stream()
         self.playback_position = 0
+        self.scrub_target = None
+        self._scrub_direction = 0
         # is_playing handled by caller (stop method in BaseMediaPlayer)
 
-    def _seek(self, position_sec):
-        # Stop current playback and restart at new position
-        if self.current_index != -1 and self.video_playback_enabled:
-            was_playing = self.is_playing
-            self._stop_ffplay()
-            self.playback_position = position_sec
-            if was_playing:
-                 self._launch_ffplay(start_pos=self.playback_position)
-                 self.is_playing = True # Ensure state is correct after relaunch
-            else:
-                 # If paused, just update position, don't relaunch yet
-                 self.is_playing = False
+    def seek(self, time_delta):
+        """Seeks by time_delta seconds, to the nearest keyframe once the file's keyframe index
+           is built (decoding starts right there), otherwise to the exact time."""
+        if self.current_index == -1 or self.duration <= 0 or not self.video_playback_enabled: return
+        self._seek_to(self.playback_position + time_delta)
+
+    def _seek_to(self, target):
+        target = max(0, min(self.duration, target))
+        times = self.keyframes.get(self.playlist[self.current_index])
+        keyframe = nearest_keyframe(times, target, self.playback_position) if times else None
+        self._seek_started = time.perf_counter()
+        # Decode again from the new position; a paused video shows the new frame and stays paused
+        if keyframe is not None:
+            self._open_stream(keyframe, keyframe=True)
+        else:
+            self._open_stream(target)
+
+    def begin_scrub(self, direction):
+        """LB/RB pressed: pauses the picture and previews one seek step in that direction.
+           Holding keeps stepping (faster the longer it is held) without touching the decoder."""
+        if self.current_index == -1 or self.duration <= 0 or not self.video_playback_enabled: return
+        if self.scrub_target is None:
+            if self.stream:
+                self.stream.pause()
+                self.clock.pause()
+            self._update_position()
+            self.scrub_target = self.playback_position
+        self._scrub_direction = direction
+        self._scrub_pressed_at = time.monotonic()
+        self._scrub_next_step = self._scrub_pressed_at + SCRUB_HOLD_DELAY
+        self._step_scrub()
+
+    def _step_scrub(self):
+        held = time.monotonic() - self._scrub_pressed_at
+        steps = min(SCRUB_MAX_STEPS, 1 + int(held))
+        step = self._scrub_direction * steps * SCRUB_INTERVAL_SECONDS
+        self.scrub_target = max(0, min(self.duration, self.scrub_target + step))
+
+    def end_scrub(self):
+        """LB/RB released: playback restarts at the previewed position."""
+        self._scrub_direction = 0
+        if self.scrub_target is None: return
+        target, self.scrub_target = self.scrub_target, None
+        self._seek_to(target)
+
+    @property
+    def scrubbing(self):
+        return self.scrub_target is not None
 
     def _update_position(self):
-        # Estimate position based on time elapsed since launch/seek
-        # This is NOT accurate, especially if ffplay is manually closed or stalls.
-        if self.is_playing and self._ffplay_process:
-            # Check if process is still alive
-            if self._ffplay_process.poll() is None:
-                self.playback_position = (time.time() - self._ff_start_time)
-                self.playback_position = max(0, min(self.playback_position, self.duration)) # Clamp to duration
-            else:
-                # Process exited, likely finished or closed manually
-                print("ffplay process ended.")
-                self._stop_ffplay() # Clean up reference
-                self.is_playing = False
-                # If it finished naturally, set position to end?
-                if self.duration > 0: self.playback_position = self.duration
-                # Auto-advance handled by BaseMediaPlayer.update()
+        position = self.clock.position()
+        self.playback_position = max(0, min(position, self.duration)) if self.duration > 0 else max(0, position)
 
-    def draw(self, surface):
-        # Draw base player UI (title, progress bar, time, etc.)
-        super().draw(surface)
+    def update(self):
+        """Starts the clock once decoding is primed, feeds audio, and puts due frames on screen."""
+        if self.current_index != -1 and self.scrub_sheet is None:
+            self.scrub_sheet = self.scrub_previews.get(self.playlist[self.current_index])
+        if self._scrub_direction and time.monotonic() >= self._scrub_next_step:
+            self._step_scrub()
+            self._scrub_next_step += SCRUB_REPEAT_SECONDS
+        if self.scrubbing: return # Picture and clock wait for the release
+        stream = self.stream
+        if not stream: return
+        if not self._started and stream.ready:
+            self._started = True
+            if self.is_playing:
+                self.clock.start()
+        if self._started and self.is_playing:
+            stream.feed_audio(self.clock)
+        if self._started or (not self.is_playing and stream.ring.filled):
+            self._show_due_frame(self.clock.position())
+        self._update_position()
+        if stream.video_exit not in (None, 0) and stream.first_frame_seconds is None:
+            self._decode_failed() # Nothing decoded at all
+        elif self.is_playing and stream.finished and stream.video_exit is not None:
+            print("Video finished.")
+            self.next_track() # Auto-advance
+
+    def on_process_exit(self, event):
+        """PROCESS_EXIT_EVENT: records how the current stream's video decoder ended."""
+        if self.stream and event.pid == self.stream.video_pid and not event.killed:
+            self.stream.video_exit = event.returncode
+
+    def _decode_failed(self):
+        """Stops on a video ffmpeg could not decode instead of skipping through the playlist."""
+        print(f"ffmpeg could not decode {self.playlist[self.current_index]} (exit code {self.stream.video_exit})")
+        self._close_stream()
+        self.is_playing = False
+        self.decode_failed = True
+
+    def _show_due_frame(self, position):
+        """Shows the newest decoded frame whose time has come; older due frames are dropped.
+           A new stream's first frame is shown as soon as it exists (e.g. after a paused seek)."""
+        ring = self.stream.ring
+        shown = None
+        while ring.filled:
+            slot, number, decode_seconds = ring.filled[0]
+            due = self.stream.frame_time(number) <= position
+            if not due and (shown is not None or self._frame_ring is ring):
+                break
+            ring.filled.popleft()
+            self._decode_seconds += decode_seconds
+            self._decode_max = max(self._decode_max, decode_seconds)
+            if shown is not None:
+                ring.release(shown)
+                self.frames_dropped += 1
+            shown = slot
+            if not due: break
+        if shown is None: return
+        if self._frame_ring is ring:
+            ring.release(self._frame_slot)
+        else: # First frame of a new stream
+            self.first_frame_seconds = self.stream.first_frame_seconds
+            if self._seek_started is not None:
+                self.seek_latencies.append(time.perf_counter() - self._seek_started)
+                self._seek_started = None
+        self._frame_slot = shown
+        self._frame_ring = ring
+        self.frame = ring.surfaces[shown]
+        self.frames_shown += 1
 
-        # --- Display Video Specific Message --- Position Below Title
-        info_font = pygame.font.SysFont(None, 18)
+    @property
+    def is_loading(self):
+        return self.stream is not None and not self._started
+
+    def next_change_ms(self):
+        """Milliseconds until the next frame is due (the main loop sleeps until then)."""
+        if self._scrub_direction:
+            return max(1, int((self._scrub_next_step - time.monotonic()) * 1000) + 1)
+        if not self.is_playing or not self.stream or self.scrubbing: return None
+        wait = 1 / VIDEO_FPS
+        if self.stream.ring.filled:
+            wait = self.stream.frame_time(self.stream.ring.filled[0][1]) - self.clock.position()
+        return max(1, min(int(wait * 1000) + 1, int(VIDEO_AUDIO_CHUNK_SECONDS * 500)))
+
+    def stats(self):
+        decoded = self.frames_shown + self.frames_dropped
+        return {"frames_shown": self.frames_shown, "frames_dropped": self.frames_dropped,
+                "decode_ms_avg": 1000 * self._decode_seconds / decoded if decoded else 0.0,
+                "decode_ms_max": 1000 * self._decode_max,
+                "first_frame_ms": 1000 * self.first_frame_seconds if self.first_frame_seconds is not None else None,
+                "seeks": len(self.seek_latencies),
+                "seek_ms_avg": 1000 * sum(self.seek_latencies) / len(self.seek_latencies) if self.seek_latencies else 0.0}
+
+    def shutdown(self, wait=False):
+        self._close_stream()
+        self.keyframes.shutdown(wait)
+        self.scrub_previews.shutdown(wait)
+
+    def _status_message(self):
+        """Returns the (message, colour) shown in the video area when there is no frame."""
         if not self.video_playback_enabled:
              msg = "Video Playback Disabled (FFmpeg path not set/valid)"
              color = RED # Assume RED is defined globally or add it
         elif self.current_index == -1:
             msg = "No video loaded."
             color = self.theme_text
-        elif self.is_playing:
-            msg = "Video playing in separate window..."
+        elif self.decode_failed:
+            msg = "Could not decode video"
+            color = RED
+        elif self.stream and not self._started:
+            msg = "Loading..."
             color = self.theme_text
         else:
-            msg = "Video paused/stopped (external window closed)"
+            msg = "Video stopped"
             color = self.theme_text
+        return msg, color
+
+    def _time_text(self):
+        if self.scrubbing:
+            return f"Seek | {format_time(self.scrub_target)} / {format_time(self.duration)}"
+        return super()._time_text()
+
+    def _progress_fill_width(self, pb_rect):
+        if not self.scrubbing or self.duration <= 0:
+            return super()._progress_fill_width(pb_rect)
+        return max(0, int((pb_rect.width - 2) * self.scrub_target / self.duration))
 
-        msg_surf = info_font.render(msg, True, color)
-        # Position message below where the title was drawn
-        # Get title position from super().draw() if possible, or estimate
-        title_bottom_approx = self.rect.inflate(-20, -20).top + 10 + self.font.get_linesize() # Approx bottom of title
-        msg_rect = msg_surf.get_rect(centerx=self.rect.centerx, top=title_bottom_approx + 10)
-        surface.blit(msg_surf, msg_rect)
-
-    def focus_ffplay_window(self):
-        """Attempts to bring the ffplay window to the foreground (Windows only)."""
-        if not self._ffplay_process or not self._ffplay_process.pid:
-            print("No ffplay process to focus.")
+    def _scrub_tile_index(self):
+        if not self.scrubbing or not self.scrub_sheet: return None
+        return round(self.scrub_target / self.scrub_sheet.interval)
+
+    def render_state(self):
+        return (super().render_state() + (self.frames_shown, self.frame is None, self._scrub_tile_index())
+                + self._status_message())
+
+    def draw(self, surface):
+        # Draw base player UI (title, progress bar, time, etc.)
+        super().draw(surface)
+        if self.scrubbing and self.scrub_sheet:
+            # Seek-bar preview over the video area, the paused frame dimmed behind it
+            if self.frame:
+                surface.blit(self.frame, self.video_rect)
+                surface.fill((96, 96, 96), self.video_rect, special_flags=pygame.BLEND_RGB_MULT)
+            else:
+                surface.fill(BLACK, self.video_rect)
+            tile = self.scrub_sheet.tile(self.scrub_target)
+            width, height = tile.get_size()
+            scale = max(1, min(2, self.video_rect.width // width, self.video_rect.height // height))
+            preview = pygame.transform.scale(tile, (width * scale, height * scale))
+            preview_rect = preview.get_rect(center=self.video_rect.center)
+            surface.blit(preview, preview_rect)
+            pygame.draw.rect(surface, self.theme_highlight, preview_rect.inflate(2, 2), 1)
             return
-        try:
-            import time
-            import ctypes
-            import ctypes.wintypes
-            import win32gui
-            import win32process
-            import win32con
-        except ImportError:
-            print("win32gui/win32process not available; cannot focus ffplay window.")
+        if self.frame:
+            surface.blit(self.frame, self.video_rect)
             return
-        pid = self._ffplay_process.pid
-        hwnd = None
-        def enum_handler(h, l):
-            nonlocal hwnd
-            tid, win_pid = win32process.GetWindowThreadProcessId(h)
-            if win_pid == pid:
-                # Check window title
-                title = win32gui.GetWindowText(h)
-                if "ffplay" in title.lower() or "perfect pineapple player" in title.lower():
-                    hwnd = h
-        win32gui.EnumWindows(enum_handler, None)
-        if hwnd:
-            print(f"Focusing ffplay window (HWND={hwnd})...")
-            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-            win32gui.SetForegroundWindow(hwnd)
-        else:
-            print("Could not find ffplay window to focus.")
+        # --- Display Video Specific Message --- Centred in the video area
+        msg, color = self._status_message()
+        msg_surf = render_text(self.info_font, msg, color, max_width=self.video_rect.width)
+        surface.blit(msg_surf, msg_surf.get_rect(center=self.video_rect.center))
+
+
+EXIF_ORIENTATION_TAG = 0x0112
+EXIF_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8) # Orientations that rotate the image by 90 degrees
+
+def decode_image_for_display(filepath, max_size):
+    """Decodes an image, upright per its EXIF orientation, scaled to fit within max_size.
+       Returns (mode, size, bytes) for pygame.image.fromstring; safe to call from worker threads."""
+    load_pil()
+    with PILImage.open(filepath) as img: # Closes the file even if decoding fails
+        orientation = img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+        box_w, box_h = max_size
+        if orientation in EXIF_TRANSPOSED_ORIENTATIONS:
+            box_w, box_h = box_h, box_w # Fit the stored (sideways) pixels into the rotated box
+
+        img_w, img_h = img.size
+        ratio = min(box_w / img_w, box_h / img_h)
+        scaled_size = (max(1, int(img_w * ratio)), max(1, int(img_h * ratio)))
+
+        # JPEG: let the decoder do a DCT-scaled decode (1/2, 1/4, 1/8) no smaller than the target
+        img.draft("RGB", scaled_size)
+        img = ImageOps.exif_transpose(img)
+        if orientation in EXIF_TRANSPOSED_ORIENTATIONS:
+            scaled_size = scaled_size[::-1]
+
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB") # A loaded copy, independent of the file
+    # reducing_gap box-reduces other formats to ~2x the target before the LANCZOS pass
+    img = img.resize(scaled_size, PILImage.Resampling.LANCZOS, reducing_gap=2.0)
+    return img.mode, img.size, img.tobytes()
+
+
+class ImagePrefetcher:
+    """Decodes photos on worker threads into an LRU cache of surfaces with a memory budget.
+
+    Decoding (Pillow) happens off the main thread; turning the pixels into a display
+    surface happens in collect(), which the viewer calls once per frame."""
+    def __init__(self, max_size, cache_mb=PHOTO_CACHE_MB, max_workers=2, decode=decode_image_for_display):
+        self.max_size = max_size
+        self.decode = decode # decode(filepath, max_size) -> (mode, size, bytes), runs on a worker
+        self.cache_budget = int(cache_mb * 1024 * 1024)
+        self.cache_bytes = 0
+        self._cache = OrderedDict() # path -> Surface (or None if the photo can't be decoded)
+        self._pending = {} # path -> Future
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="photo-prefetch")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """Returns (found, surface) from the cache; counts a hit or miss."""
+        if path in self._cache:
+            self._cache.move_to_end(path)
+            self.hits += 1
+            return True, self._cache[path]
+        self.misses += 1
+        return False, None
+
+    def request(self, paths):
+        """Queues decodes for paths (in priority order); drops queued decodes that are no longer wanted."""
+        wanted = set(paths)
+        for path, future in list(self._pending.items()):
+            if path not in wanted and future.cancel():
+                del self._pending[path]
+        for path in paths:
+            if path not in self._cache and path not in self._pending:
+                self._pending[path] = self._executor.submit(self.decode, path, self.max_size)
+
+    def is_pending(self, path):
+        return path in self._pending
+
+    def collect(self):
+        """Converts finished decodes to surfaces (main thread). Returns the paths that finished."""
+        finished = []
+        for path, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[path]
+            try:
+                mode, size, data = future.result()
+                surface = pygame.image.fromstring(data, size, mode)
+                surface = surface.convert_alpha() if mode == 'RGBA' else surface.convert()
+            except Exception as e:
+                print(f"Error loading image {path}: {e}")
+                surface = None
+            self._store(path, surface)
+            finished.append(path)
+        return finished
+
+    def _store(self, path, surface):
+        self._cache[path] = surface
+        if surface:
+            self.cache_bytes += surface.get_bytesize() * surface.get_width() * surface.get_height()
+        while self.cache_bytes > self.cache_budget and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False) # Least recently viewed
+            if evicted:
+                self.cache_bytes -= evicted.get_bytesize() * evicted.get_width() * evicted.get_height()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._cache), "bytes": self.cache_bytes, "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class ThumbnailStore:
+    """On-disk thumbnail cache: one small JPEG per (path, size, mtime, thumbnail size).
+       A changed photo gets a new key, so stale thumbnails are never shown."""
+    def __init__(self, cache_dir=THUMBNAIL_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, filepath, max_size):
+        st = os.stat(filepath)
+        key = f"{os.path.abspath(filepath)}|{st.st_size}|{st.st_mtime_ns}|{max_size[0]}x{max_size[1]}"
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+    def load_or_create(self, filepath, max_size):
+        """Same contract as decode_image_for_display; runs on ImagePrefetcher workers."""
+        load_pil()
+        cached = self.cache_path(filepath, max_size)
+        try:
+            with PILImage.open(cached) as img:
+                img = img.convert("RGB")
+            self.hits += 1
+            return img.mode, img.size, img.tobytes()
+        except OSError:
+            pass # Not generated yet (or unreadable); build it below
+        self.misses += 1
+        mode, size, data = decode_image_for_display(filepath, max_size)
+        img = PILImage.frombytes(mode, size, data).convert("RGB")
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            tmp_path = f"{cached}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, "JPEG", quality=85)
+            os.replace(tmp_path, cached) # Readers never see a half-written thumbnail
+        except OSError as e:
+            print(f"Error writing thumbnail for {filepath}: {e}")
+        return img.mode, img.size, img.tobytes()
+
+
+class AlbumArtCache:
+    """Cover art for the side panel, keyed by album (artist + album tags, or the folder).
+
+    Covers come from embedded art (ID3 APIC, FLAC/Vorbis PICTURE) or a folder image, are
+    scaled once to the panel width on a worker thread and saved under ALBUM_ART_DIR;
+    collect() turns finished loads into surfaces on the main thread."""
+    def __init__(self, library=None, cache_dir=ALBUM_ART_DIR, size=SIDE_PANEL_WIDTH, max_entries=ALBUM_ART_CACHE_SIZE):
+        self.library = library # Tags already probed into the index save a mutagen read
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_entries = max_entries
+        self._cache = OrderedDict() # album key -> Surface (or None if the album has no art)
+        self._album_of = {} # track path -> album key, learnt from finished loads
+        self._pending = {} # track path -> Future
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="album-art")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def album_key(filepath, metadata):
+        if metadata and metadata.get("album"):
+            return f"{metadata.get('artist') or ''}|{metadata['album']}"
+        return f"dir|{os.path.dirname(os.path.abspath(filepath))}"
+
+    def get(self, path):
+        """Returns (found, surface) for a track's album; counts a hit or miss."""
+        key = self._album_of.get(path)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return True, self._cache[key]
+        self.misses += 1
+        return False, None
+
+    def request(self, path):
+        """Queues the cover of path's album; earlier queued requests are dropped (only the highlighted track matters)."""
+        for pending_path, future in list(self._pending.items()):
+            if pending_path != path and future.cancel():
+                del self._pending[pending_path]
+        if path not in self._pending:
+            self._pending[path] = self._executor.submit(self._load, path)
 
-    def is_ffplay_running(self):
-        return self._ffplay_process and self._ffplay_process.poll() is None
+    @property
+    def is_loading(self):
+        return bool(self._pending)
+
+    def _cache_path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".jpg")
+
+    def _load(self, path):
+        """Worker: returns (album key, (mode, size, bytes) or None)."""
+        load_pil()
+        metadata = self.library.get_metadata("music", path) if self.library else None
+        if not (metadata and metadata.get("album")):
+            metadata = read_audio_metadata(path) # Not probed yet
+        key = self.album_key(path, metadata)
+        cached = self._cache_path(key)
+        try: # Adding a cover image to the folder changes its mtime, which the marker records
+            folder_mtime = str(os.stat(os.path.dirname(path) or ".").st_mtime_ns)
+        except OSError:
+            folder_mtime = ""
+        try:
+            with open(cached + ".none", "r") as marker:
+                if marker.read() == folder_mtime:
+                    return key, None # Looked before, the album has no art
+        except OSError:
+            pass
+        try:
+            with PILImage.open(cached) as img:
+                img = img.convert("RGB")
+            return key, (img.mode, img.size, img.tobytes())
+        except OSError:
+            pass # Not extracted yet
+
+        source = None
+        art = read_embedded_art(path)
+        if art:
+            source = io.BytesIO(art)
+        else:
+            try:
+                names = {name.lower(): name for name in os.listdir(os.path.dirname(path) or ".")}
+            except OSError:
+                names = {}
+            for candidate in FOLDER_ART_NAMES:
+                if candidate in names:
+                    source = os.path.join(os.path.dirname(path), names[candidate])
+                    break
+        decoded = None
+        if source is not None:
+            try:
+                decoded = decode_image_for_display(source, (self.size, self.size))
+            except Exception as e:
+                print(f"Could not decode album art for {path}: {e}")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if decoded:
+                tmp_path = f"{cached}.{threading.get_ident()}.tmp"
+                PILImage.frombytes(*decoded).convert("RGB").save(tmp_path, "JPEG", quality=90)
+                os.replace(tmp_path, cached)
+                if os.path.exists(cached + ".none"): # Art turned up since the last look
+                    os.remove(cached + ".none")
+            else:
+                with open(cached + ".none", "w") as marker:
+                    marker.write(folder_mtime)
+        except OSError as e:
+            print(f"Error writing album art cache for {path}: {e}")
+        return key, decoded
+
+    def collect(self):
+        """Converts finished loads to surfaces (main thread). Returns the track paths that finished."""
+        finished = []
+        for path, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[path]
+            try:
+                key, decoded = future.result()
+            except Exception as e:
+                print(f"Error loading album art for {path}: {e}")
+                continue
+            self._album_of[path] = key
+            if key not in self._cache: # Another track of the album may have got there first
+                surface = None
+                if decoded:
+                    mode, size, data = decoded
+                    surface = pygame.image.fromstring(data, size, mode).convert()
+                self._cache[key] = surface
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            finished.append(path)
+        return finished
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
 
 
 class ImageViewer(BaseMediaPlayer):
     """Handles image viewing using Pillow and pygame."""
+    media_type = "photos"
     # Adapting BaseMediaPlayer structure slightly for non-timed media
-    def __init__(self, font, initial_theme):
+    def __init__(self, font, initial_theme, prefetch_depth=PHOTO_PREFETCH_DEPTH, cache_mb=PHOTO_CACHE_MB):
         super().__init__(font, initial_theme)
         self.image_surface = None
         self.current_image_path = None
         self.duration = 0 # Not applicable, but keep attribute for consistency
         self.playback_position = 0
-
-    def load_playlist(self, files):
-        # Filter for image files specifically, although BaseMediaPlayer might have done this
-        img_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
-        self.playlist = [f for f in files if f.lower().endswith(img_extensions)]
-        self.current_index = 0 if self.playlist else -1
-        self.stop() # Clear previous image
-        if self.current_index != -1:
-            self._load_current_track()
+        self.prefetch_depth = prefetch_depth # Photos decoded ahead on each side of the current one
+        self.prefetcher = ImagePrefetcher(self.rect.inflate(-20, -20).size, cache_mb) # Padding
+        self.error_font = pygame.font.SysFont(None, 20)
 
     def _load_current_track(self):
         if self.current_index != -1:
             filepath = self.playlist[self.current_index]
             self.current_image_path = filepath
-            try:
-                img = PILImage.open(filepath)
-                img = img.convert("RGBA") # Ensure consistent format
-
-                # Scale image to fit display area
-                target_rect = self.rect.inflate(-20, -20) # Padding
-                img_w, img_h = img.size
-                ratio = min(target_rect.width / img_w, target_rect.height / img_h)
-                scaled_size = (int(img_w * ratio), int(img_h * ratio))
-
-                # Use thumbnail for potentially faster scaling? Or resize directly
-                # img.thumbnail(scaled_size, PILImage.Resampling.LANCZOS)
-                img = img.resize(scaled_size, PILImage.Resampling.LANCZOS)
-
-                # Convert PIL image to Pygame surface
-                mode = img.mode
-                size = img.size
-                data = img.tobytes()
-
-                if mode == 'RGBA':
-                    self.image_surface = pygame.image.fromstring(data, size, mode).convert_alpha()
-                else:
-                    self.image_surface = pygame.image.fromstring(data, size, mode).convert()
+            found, surface = self.prefetcher.get(filepath)
+            if found:
+                self._show_surface(surface)
+            else:
+                self.image_surface = None # Shown as "Loading..." until the decode lands
+            # Current photo first, then its neighbours outwards
+            window = [filepath]
+            for distance in range(1, self.prefetch_depth + 1):
+                for index in (self.current_index + distance, self.current_index - distance):
+                    if 0 <= index < len(self.playlist):
+                        window.append(self.playlist[index])
+            self.prefetcher.request(window)
+
+    def _show_surface(self, surface):
+        if surface:
+            self.image_surface = surface
+            print(f"Loaded Image: {self.current_image_path}")
+        else:
+            # Create an error surface
+            target_rect = self.rect.inflate(-20, -20) # Padding
+            error_surf = self.error_font.render(f"Cannot load image", True, RED) # Need RED color
+            self.image_surface = pygame.Surface((target_rect.width, 50))
+            self.image_surface.fill(GRAY)
+            err_rect = error_surf.get_rect(center=self.image_surface.get_rect().center)
+            self.image_surface.blit(error_surf, err_rect)
+        self.image_draw_pos = self.image_surface.get_rect(center=self.rect.center)
 
-                self.image_draw_pos = self.image_surface.get_rect(center=self.rect.center)
-                print(f"Loaded Image: {filepath}")
+    @property
+    def is_loading(self):
+        return self.current_image_path is not None and self.prefetcher.is_pending(self.current_image_path)
 
-            except Exception as e:
-                print(f"Error loading image {filepath}: {e}")
-                self.image_surface = None
-                self.current_image_path = None
-                # Create an error surface?
-                error_font = pygame.font.SysFont(None, 20)
-                error_surf = error_font.render(f"Cannot load image", True, RED) # Need RED color
-                self.image_surface = pygame.Surface((target_rect.width, 50))
-                self.image_surface.fill(GRAY)
-                err_rect = error_surf.get_rect(center=self.image_surface.get_rect().center)
-                self.image_surface.blit(error_surf, err_rect)
-                self.image_draw_pos = self.image_surface.get_rect(center=self.rect.center)
+    def update(self):
+        """Picks up photos decoded in the background."""
+        for path in self.prefetcher.collect():
+            if path == self.current_image_path and self.image_surface is None:
+                found, surface = self.prefetcher.get(path)
+                if found: self._show_surface(surface)
+
+    def seek(self, time_delta):
+        """LB/RB step through photos (there is no timeline to seek)."""
+        if not self.playlist: return
+        if time_delta > 0: self.next_track()
+        else: self.prev_track()
+
+    def render_state(self):
+        return (id(self.image_surface), self.current_index, len(self.playlist), self.is_loading)
 
+    @property
+    def dirty_rect(self):
+        return pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT) # Draws over the whole window
 
     def draw(self, surface):
+        self.mark_drawn()
         # Hide side panel and center image in the whole window
         surface.fill(self.theme_bg)
         if self.image_surface:
@@ -971,13 +3415,14 @@ class ImageViewer(BaseMediaPlayer):
             filename = os.path.basename(self.current_image_path) if self.current_image_path else "Error"
             img_count = f"{self.current_index + 1} of {len(self.playlist)}"
             info_text = f"{filename} ({img_count})"
-            info_text = truncate_text(info_text, self.font, win_rect.width - 20)
-            info_surf = self.font.render(info_text, True, self.theme_text)
+            info_surf = render_text(self.font, info_text, self.theme_text, max_width=win_rect.width - 20)
             info_rect = info_surf.get_rect(centerx=win_rect.centerx, bottom=win_rect.bottom - 5)
             surface.blit(info_surf, info_rect)
+        elif self.is_loading:
+            loading_surf = render_text(self.error_font, "Loading...", self.theme_text)
+            surface.blit(loading_surf, loading_surf.get_rect(center=surface.get_rect().center))
         elif self.current_index != -1:
-            error_font = pygame.font.SysFont(None, 20)
-            error_surf = error_font.render(f"Error loading image", True, self.theme_text)
+            error_surf = render_text(self.error_font, "Error loading image", self.theme_text)
             err_rect = error_surf.get_rect(center=surface.get_rect().center)
             surface.blit(error_surf, err_rect)
         else:
@@ -987,8 +3432,6 @@ class ImageViewer(BaseMediaPlayer):
 
     # --- Overrides for non-applicable methods ---
     def play_pause(self): pass # N/A for images
-    def seek(self, time_delta): pass # N/A
-    def update(self): pass # N/A
     def _play(self): pass
     def _pause(self): pass
     def _stop(self):
@@ -998,9 +3441,143 @@ class ImageViewer(BaseMediaPlayer):
     def _update_position(self): pass
 
 
+class PhotoGrid(Widget):
+    """Virtualised thumbnail grid over the ImageViewer playlist.
+       Only cells in (or a row either side of) the viewport are drawn or queued for thumbnails."""
+    CELL_SIZE = THUMB_SIZE + 8
+    PREFETCH_ROWS = 1 # Rows above and below the viewport queued for thumbnails
+
+    def __init__(self, font, theme_name, viewer, thumbnails):
+        self.font = font
+        self.viewer = viewer # Shares its playlist, so streamed scan results show up here too
+        self.thumbnails = thumbnails # ImagePrefetcher backed by ThumbnailStore
+        self.rect = pygame.Rect(0, STATUS_BAR_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT - STATUS_BAR_HEIGHT)
+        self.caption_height = 20
+        self.columns = max(1, self.rect.width // self.CELL_SIZE)
+        self.visible_rows = max(1, (self.rect.height - self.caption_height) // self.CELL_SIZE)
+        self.margin_x = (self.rect.width - self.columns * self.CELL_SIZE) // 2
+        self.selected_index = max(0, viewer.current_index)
+        self.scroll_row = 0
+        self._thumbs_version = 0 # Bumped when visible thumbnails arrive
+        self.update_theme(theme_name)
+        self._scroll_to_selection()
+
+    @property
+    def paths(self):
+        return self.viewer.playlist
+
+    def update_theme(self, theme_name):
+        self.theme_bg = get_themed_color(theme_name, "bg")
+        self.theme_text = get_themed_color(theme_name, "text")
+        self.theme_highlight = get_themed_color(theme_name, "highlight")
+        self.mark_dirty()
+
+    def render_state(self):
+        return (self.selected_index, self.scroll_row, len(self.paths), self._thumbs_version)
+
+    def visible_range(self, extra_rows=0):
+        first = max(0, self.scroll_row - extra_rows) * self.columns
+        last = (self.scroll_row + self.visible_rows + extra_rows) * self.columns
+        return range(first, min(last, len(self.paths)))
+
+    def select(self, index):
+        if not self.paths: return
+        self.selected_index = max(0, min(len(self.paths) - 1, index))
+        self._scroll_to_selection()
+
+    def _scroll_to_selection(self):
+        row = self.selected_index // self.columns
+        if row < self.scroll_row:
+            self.scroll_row = row
+        elif row >= self.scroll_row + self.visible_rows:
+            self.scroll_row = row - self.visible_rows + 1
+        self._request_thumbnails()
+
+    def _request_thumbnails(self):
+        visible = self.visible_range()
+        nearby = self.visible_range(self.PREFETCH_ROWS)
+        wanted = [self.paths[i] for i in visible]
+        wanted += [self.paths[i] for i in nearby if i not in visible]
+        self.thumbnails.request(wanted)
+
+    @property
+    def is_loading(self):
+        return any(self.thumbnails.is_pending(self.paths[i]) for i in self.visible_range())
+
+    def update(self):
+        """Picks up thumbnails finished in the background (called once per frame)."""
+        finished = self.thumbnails.collect()
+        if finished:
+            visible = {self.paths[i] for i in self.visible_range()}
+            if visible.intersection(finished):
+                self._thumbs_version += 1
+        if self.paths and self.selected_index >= len(self.paths):
+            self.select(len(self.paths) - 1) # Scan reconciliation removed photos
+
+    def handle_input(self, events):
+        """Arrows/D-pad move, LB/RB page, A opens the selected photo ('open'), B closes. Returns an action string or None."""
+        move = 0
+        action = None
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key in [pygame.K_UP, pygame.K_w]: move = -self.columns
+                elif event.key in [pygame.K_DOWN, pygame.K_s]: move = self.columns
+                elif event.key in [pygame.K_LEFT, pygame.K_a]: move = -1
+                elif event.key in [pygame.K_RIGHT, pygame.K_d]: move = 1
+                elif event.key in [pygame.K_RETURN, pygame.K_SPACE]: action = 'open'
+                elif event.key in [pygame.K_ESCAPE, pygame.K_BACKSPACE]: action = 'close'
+            elif event.type == pygame.JOYBUTTONDOWN:
+                if event.button == A_BUTTON: action = 'open'
+                elif event.button == B_BUTTON: action = 'close'
+                elif event.button == LB_BUTTON: move = -self.columns * self.visible_rows # Page up
+                elif event.button == RB_BUTTON: move = self.columns * self.visible_rows # Page down
+            elif event.type == pygame.JOYHATMOTION:
+                if event.value == DPAD_UP: move = -self.columns
+                elif event.value == DPAD_DOWN: move = self.columns
+                elif event.value == DPAD_LEFT: move = -1
+                elif event.value == DPAD_RIGHT: move = 1
+            elif event.type == pygame.JOYAXISMOTION:
+                if event.axis == 1: # Left stick vertical
+                    if event.value < -STICK_THRESHOLD: move = -self.columns
+                    elif event.value > STICK_THRESHOLD: move = self.columns
+
+        if move:
+            self.select(self.selected_index + move)
+        if action == 'open' and not self.paths:
+            return None
+        return action
+
+    def draw(self, surface):
+        self.mark_drawn()
+        surface.fill(self.theme_bg, self.rect)
+        if not self.paths:
+            empty_surf = render_text(self.font, "No media found.", self.theme_text)
+            surface.blit(empty_surf, empty_surf.get_rect(center=self.rect.center))
+            return
+        for index in self.visible_range():
+            row, col = divmod(index - self.scroll_row * self.columns, self.columns)
+            cell = pygame.Rect(self.rect.left + self.margin_x + col * self.CELL_SIZE,
+                               self.rect.top + row * self.CELL_SIZE, self.CELL_SIZE, self.CELL_SIZE)
+            if index == self.selected_index:
+                pygame.draw.rect(surface, self.theme_highlight, cell)
+            found, thumb = self.thumbnails.get(self.paths[index])
+            if found and thumb:
+                surface.blit(thumb, thumb.get_rect(center=cell.center))
+            else:
+                # Placeholder while loading (or for photos that can't be decoded)
+                pygame.draw.rect(surface, GRAY, cell.inflate(-12, -12), 1)
+
+        # Caption: name of the selected photo and its position
+        caption_y = self.rect.bottom - self.caption_height
+        pygame.draw.line(surface, GRAY, (self.rect.left, caption_y), (self.rect.right, caption_y))
+        caption = f"{self.selected_index + 1}/{len(self.paths)}  {os.path.basename(self.paths[self.selected_index])}"
+        caption_surf = render_text(self.font, caption, self.theme_text, max_width=self.rect.width - 10)
+        surface.blit(caption_surf, caption_surf.get_rect(left=self.rect.left + 5, centery=caption_y + self.caption_height // 2))
+
+
 # --- New Screen Classes ---
 
-class BaseScreen:
+class BaseScreen(Widget):
     """Base class for full-screen informational views like About, Donate."""
     def __init__(self, font, theme_name):
         self.font = font
@@ -1017,6 +3594,10 @@ class BaseScreen:
         self.theme_text = get_themed_color(theme_name, "text")
         self.theme_highlight = get_themed_color(theme_name, "highlight") # Or a specific text color?
         self.theme_border = GRAY # Example border color
+        self.mark_dirty()
+
+    def render_state(self):
+        return self.scroll_y
 
     def _pre_render_content(self):
         """Subclasses must implement this to render their specific text
@@ -1065,6 +3646,7 @@ class BaseScreen:
 
     def draw(self, surface):
         """Draws the screen content, handling scrolling."""
+        self.mark_drawn()
         surface.fill(self.theme_bg, self.rect) # Fill background
 
         if self.content_surface:
@@ -1358,6 +3940,266 @@ class GamePlaceholderScreen(BaseScreen):
         self.content_surface.blit(temp_surface, (0,0), (0, 0, render_width, actual_height))
         self.total_content_height = actual_height
 
+class SearchScreen(Widget):
+    """Search-as-you-type over the music library.
+
+    Type on a keyboard, or use the on-screen keyboard with a gamepad: D-pad picks a key,
+    A types it, B deletes (or closes when empty), LB/RB move through the results and
+    Start plays the highlighted song."""
+    KEYS = "abcdefghijklmnopqrstuvwxyz0123456789 <"
+    KEY_COLUMNS = 10
+    RESULT_ROWS = 6
+
+    def __init__(self, font, theme_name, search_index):
+        self.font = font
+        self.search_index = search_index
+        self.rect = pygame.Rect(0, STATUS_BAR_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT - STATUS_BAR_HEIGHT)
+        self.row_height = 20
+        self.key_rows = (len(self.KEYS) + self.KEY_COLUMNS - 1) // self.KEY_COLUMNS
+        self.key_height = (self.rect.height - self.row_height * (self.RESULT_ROWS + 1)) // self.key_rows
+        self.key_width = self.rect.width // self.KEY_COLUMNS
+        self.query = ""
+        self.results = [] # (path, label) pairs, best first
+        self.selected_index = 0
+        self.scroll_offset = 0
+        self.key_index = 0 # Highlighted key on the on-screen keyboard
+        self._index_version = -1 # SearchIndex.version the current results were computed against
+        self._results_version = 0 # Bumped per search (a new list may reuse the old one's id())
+        self.update_theme(theme_name)
+
+    def update_theme(self, theme_name):
+        self.theme_bg = get_themed_color(theme_name, "bg")
+        self.theme_text = get_themed_color(theme_name, "text")
+        self.theme_highlight = get_themed_color(theme_name, "highlight")
+        self.mark_dirty()
+
+    def render_state(self):
+        return (self.query, self._results_version, self.selected_index, self.scroll_offset, self.key_index, self.search_index.ready)
+
+    @property
+    def selected_path(self):
+        return self.results[self.selected_index][0] if self.results else None
+
+    def set_query(self, query):
+        self.query = query
+        self.results = self.search_index.search(query)
+        self._results_version += 1
+        self._index_version = self.search_index.version
+        self.selected_index = 0
+        self.scroll_offset = 0
+
+    def update(self):
+        """Re-runs the query when the index changed (initial build, scans, newly probed tags)."""
+        if self.query and self.search_index.version != self._index_version:
+            self.set_query(self.query)
+
+    def move_selection(self, direction):
+        if not self.results: return
+        self.selected_index = max(0, min(len(self.results) - 1, self.selected_index + direction))
+        if self.selected_index < self.scroll_offset:
+            self.scroll_offset = self.selected_index
+        elif self.selected_index >= self.scroll_offset + self.RESULT_ROWS:
+            self.scroll_offset = self.selected_index - self.RESULT_ROWS + 1
+
+    def move_key(self, dx, dy):
+        row, col = divmod(self.key_index, self.KEY_COLUMNS)
+        row = (row + dy) % self.key_rows
+        col = (col + dx) % self.KEY_COLUMNS
+        self.key_index = min(len(self.KEYS) - 1, row * self.KEY_COLUMNS + col)
+
+    def type_key(self, char):
+        if char == "<":
+            self.set_query(self.query[:-1])
+        else:
+            self.set_query(self.query + char)
+
+    def handle_input(self, events):
+        """Returns 'open' to play the highlighted result, 'close', or None."""
+        action = None
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key in [pygame.K_ESCAPE]: action = 'close'
+                elif event.key == pygame.K_BACKSPACE:
+                    if self.query: self.set_query(self.query[:-1])
+                    else: action = 'close'
+                elif event.key == pygame.K_RETURN: action = 'open'
+                elif event.key == pygame.K_UP: self.move_selection(-1)
+                elif event.key == pygame.K_DOWN: self.move_selection(1)
+                elif event.unicode and event.unicode.isprintable():
+                    self.set_query(self.query + event.unicode)
+            elif event.type == pygame.JOYBUTTONDOWN:
+                if event.button == A_BUTTON: self.type_key(self.KEYS[self.key_index])
+                elif event.button == B_BUTTON:
+                    if self.query: self.set_query(self.query[:-1])
+                    else: action = 'close'
+                elif event.button == LB_BUTTON: self.move_selection(-1)
+                elif event.button == RB_BUTTON: self.move_selection(1)
+                elif event.button == START_BUTTON: action = 'open'
+            elif event.type == pygame.JOYHATMOTION:
+                if event.value == DPAD_UP: self.move_key(0, -1)
+                elif event.value == DPAD_DOWN: self.move_key(0, 1)
+                elif event.value == DPAD_LEFT: self.move_key(-1, 0)
+                elif event.value == DPAD_RIGHT: self.move_key(1, 0)
+        if action == 'open' and not self.results:
+            return None
+        return action
+
+    def draw(self, surface):
+        self.mark_drawn()
+        surface.fill(self.theme_bg, self.rect)
+        max_text_width = self.rect.width - 10
+
+        # Query line
+        query_text = f"Search: {self.query}_"
+        query_surf = render_text(self.font, query_text, self.theme_text, max_width=max_text_width)
+        surface.blit(query_surf, query_surf.get_rect(left=self.rect.left + 5, centery=self.rect.top + self.row_height // 2))
+        line_y = self.rect.top + self.row_height - 1
+        pygame.draw.line(surface, GRAY, (self.rect.left, line_y), (self.rect.right, line_y))
+
+        # Results
+        results_top = self.rect.top + self.row_height
+        if not self.results:
+            if not self.search_index.ready:
+                hint = f"Indexing... {len(self.search_index)} songs"
+            else:
+                hint = "No matches." if self.query else "Type to search your music."
+            hint_surf = render_text(self.font, hint, GRAY, max_width=max_text_width)
+            surface.blit(hint_surf, hint_surf.get_rect(left=self.rect.left + 5, centery=results_top + self.row_height // 2))
+        for row in range(self.RESULT_ROWS):
+            index = self.scroll_offset + row
+            if index >= len(self.results): break
+            y = results_top + row * self.row_height
+            is_selected = index == self.selected_index
+            if is_selected:
+                pygame.draw.rect(surface, self.theme_highlight, (self.rect.left, y, self.rect.width, self.row_height))
+            label_surf = render_text(self.font, self.results[index][1], self.theme_bg if is_selected else self.theme_text,
+                                     max_width=max_text_width)
+            surface.blit(label_surf, label_surf.get_rect(left=self.rect.left + 5, centery=y + self.row_height // 2))
+
+        # On-screen keyboard
+        keys_top = results_top + self.RESULT_ROWS * self.row_height
+        for index, char in enumerate(self.KEYS):
+            row, col = divmod(index, self.KEY_COLUMNS)
+            key_rect = pygame.Rect(self.rect.left + col * self.key_width, keys_top + row * self.key_height,
+                                   self.key_width, self.key_height)
+            if index == self.key_index:
+                pygame.draw.rect(surface, self.theme_highlight, key_rect)
+            label = {" ": "_", "<": "Del"}.get(char, char)
+            key_surf = render_text(self.font, label, self.theme_bg if index == self.key_index else self.theme_text)
+            surface.blit(key_surf, key_surf.get_rect(center=key_rect.center))
+
+
+# --- Frame Pacing ---
+
+class FrameScheduler:
+    """Adaptive frame pacing for the main loop.
+
+    Runs at FPS while the user is interacting, at PLAYBACK_FPS when only a progress bar
+    moves, and blocks in pygame.event.wait when nothing changes. With the screen off the
+    loop only wakes for input and track bookkeeping. Per-mode CPU time is recorded so the
+    savings can be reported on exit."""
+    ACTIVE = "active"
+    PLAYBACK = "playback"
+    IDLE = "idle"
+    SCREEN_OFF = "screen off"
+    MODES = (ACTIVE, PLAYBACK, IDLE, SCREEN_OFF)
+
+    def __init__(self):
+        self.clock = pygame.time.Clock()
+        self.last_activity = time.monotonic()
+        self.stats = {mode: {"iterations": 0, "frames": 0, "wall": 0.0, "cpu": 0.0} for mode in self.MODES}
+        self._started = time.monotonic()
+        self._iteration_start = (time.monotonic(), time.process_time())
+
+    def note_activity(self):
+        self.last_activity = time.monotonic()
+
+    @property
+    def seconds_since_activity(self):
+        return time.monotonic() - self.last_activity
+
+    def end_frame(self, mode, rendered, wait_ms=None):
+        """Records the finished iteration and sleeps/blocks according to mode.
+           In PLAYBACK mode, wait_ms (time until the player's display next changes) replaces
+           the fixed PLAYBACK_FPS tick with a blocking wait that input can cut short.
+           Returns any event that woke the loop from a blocking wait."""
+        wall_start, cpu_start = self._iteration_start
+        stats = self.stats[mode]
+        stats["iterations"] += 1
+        stats["frames"] += 1 if rendered else 0
+        stats["cpu"] += time.process_time() - cpu_start
+        woken_by = None
+        if mode == self.ACTIVE:
+            self.clock.tick(FPS)
+        elif mode == self.PLAYBACK and wait_ms is None:
+            self.clock.tick(PLAYBACK_FPS)
+        else:
+            if mode == self.PLAYBACK:
+                timeout = min(wait_ms, IDLE_WAIT_MS)
+            else:
+                timeout = IDLE_WAIT_MS if mode == self.IDLE else SCREEN_OFF_WAIT_MS
+            event = pygame.event.wait(timeout)
+            if event.type != pygame.NOEVENT:
+                woken_by = event
+            self.clock.tick() # Keep the clock from reporting one huge frame afterwards
+        now = time.monotonic()
+        stats["wall"] += now - wall_start
+        self._iteration_start = (now, time.process_time())
+        return woken_by
+
+    def report(self):
+        """Prints per-mode frame and CPU statistics, plus an estimate of the fixed-60fps cost."""
+        total_wall = time.monotonic() - self._started
+        total_cpu = sum(stats["cpu"] for stats in self.stats.values())
+        total_frames = sum(stats["frames"] for stats in self.stats.values())
+        print(f"Frame pacing: {total_frames} frames rendered in {total_wall:.1f}s, CPU {total_cpu:.2f}s "
+              f"({total_cpu / total_wall if total_wall else 0:.1%} of one core)")
+        for mode, stats in self.stats.items():
+            if stats["iterations"]:
+                print(f"  {mode:<10}: {stats['wall']:7.1f}s wall, {stats['iterations']:6d} loops, "
+                      f"{stats['frames']:6d} frames, CPU {stats['cpu']:.2f}s")
+        active = self.stats[self.ACTIVE]
+        if active["iterations"]:
+            # What the old loop would have spent running every iteration at full rate
+            fixed_rate_cpu = active["cpu"] / active["iterations"] * FPS * total_wall
+            saved = 1 - total_cpu / fixed_rate_cpu if fixed_rate_cpu else 0
+            print(f"  estimated CPU at a fixed {FPS} fps: {fixed_rate_cpu:.2f}s ({saved:.0%} saved)")
+
+
+class StartupProfile:
+    """Time spent in each start-up phase, from STARTED_AT to the first frame on screen.
+       Printed with --profile-startup; the phases are marked as they finish."""
+    TARGET_MS = 300
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = [("import pygame", PYGAME_IMPORTED_AT - STARTED_AT)] # (name, seconds)
+        self._last = PYGAME_IMPORTED_AT
+        self.total = None # Seconds to the first frame, once it is shown
+
+    def mark(self, name):
+        """Ends the phase called name, which began at the previous mark."""
+        if self.total is not None: return
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def first_frame(self):
+        if self.total is not None: return
+        self.mark("first frame")
+        self.total = sum(seconds for _, seconds in self.phases)
+        if self.enabled:
+            print("Start-up profile:")
+            for name, seconds in self.phases:
+                print(f"  {name:<20} {seconds * 1000:7.1f} ms")
+            verdict = "within" if self.total * 1000 <= self.TARGET_MS else "over"
+            print(f"  {'total':<20} {self.total * 1000:7.1f} ms ({verdict} the {self.TARGET_MS} ms target)")
+
+    def lazy(self, name, seconds):
+        """Reports a component created on first use, after start-up."""
+        if self.enabled:
+            print(f"Start-up profile: {name} created on first use in {seconds * 1000:.1f} ms")
+
 # --- Main Application Class ---
 
 class PerfectPineapplePlayer:
@@ -1377,17 +4219,24 @@ class PerfectPineapplePlayer:
         ("$25", "https://paypal.me/BannedPenta01/25"),
     ]
 
-    def __init__(self):
-        pygame.init()
+    def __init__(self, profile_startup=False):
+        self.startup = StartupProfile(profile_startup)
+        self.startup.mark("other imports")
+        # Only what the menu needs; the mixer is started by the first player that plays sound
+        pygame.display.init()
+        pygame.font.init()
         pygame.joystick.init()
         self.joysticks = [pygame.joystick.Joystick(i) for i in range(pygame.joystick.get_count())]
         if self.joysticks: print(f"Detected Gamepad: {self.joysticks[0].get_name()}")
         else: print("No Gamepad Detected.")
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED | pygame.FULLSCREEN)
         pygame.display.set_caption("Perfect Pineapple Player")
-        self.clock = pygame.time.Clock()
+        self.scheduler = FrameScheduler() # Adaptive frame pacing (replaces a fixed clock.tick)
+        self.pending_events = [] # Events that woke the loop from FrameScheduler's blocking wait
+        self.screen_off = False
         self.font = pygame.font.SysFont(None, 24)
         self.small_font = pygame.font.SysFont(None, 18)
+        self.startup.mark("display and fonts")
 
         print(f"Settings file path: {SETTINGS_FILE}")
 
@@ -1396,21 +4245,17 @@ class PerfectPineapplePlayer:
         autodetected_ffmpeg = False
         autodetect_path = None
         # Check script directory
-        ffprobe_path = os.path.join(script_dir, "ffprobe.exe")
-        ffplay_path = os.path.join(script_dir, "ffplay.exe")
-        if os.path.isfile(ffprobe_path) and os.path.isfile(ffplay_path):
+        if validate_ffmpeg_path(script_dir):
             autodetected_ffmpeg = True
             autodetect_path = script_dir
-            print(f"Auto-detected ffprobe.exe and ffplay.exe in: {script_dir}")
+            print(f"Auto-detected ffprobe.exe and ffmpeg.exe in: {script_dir}")
         else:
             # Check bin subfolder
             bin_dir = os.path.join(script_dir, "bin")
-            ffprobe_path_bin = os.path.join(bin_dir, "ffprobe.exe")
-            ffplay_path_bin = os.path.join(bin_dir, "ffplay.exe")
-            if os.path.isfile(ffprobe_path_bin) and os.path.isfile(ffplay_path_bin):
+            if validate_ffmpeg_path(bin_dir):
                 autodetected_ffmpeg = True
                 autodetect_path = bin_dir
-                print(f"Auto-detected ffprobe.exe and ffplay.exe in: {bin_dir}")
+                print(f"Auto-detected ffprobe.exe and ffmpeg.exe in: {bin_dir}")
 
         self.settings = load_settings()
         # If autodetected and not already set, update settings
@@ -1420,26 +4265,42 @@ class PerfectPineapplePlayer:
             print(f"Set ffmpeg_path in settings to: {autodetect_path}")
 
         self.current_theme_name = self.settings.get("theme", DEFAULT_THEME)
+        self.startup.mark("settings")
+
+        # Media library index (persistent, avoids rescanning folders on every menu open)
+        self.library = LibraryIndex()
+        self.probe_cache = ProbeCache(self.library) # ffprobe results keyed by (path, size, mtime)
+        self.probe_pool = MetadataProbePool(library=self.library) # Probes playlists off the main thread
+        self.album_art = AlbumArtCache(library=self.library) # Side panel covers, loaded off the main thread
+        self._art_path = None # Track whose album cover the side panel shows
+        self.search_index = SearchIndex() # Music search, built in the background and kept current
+        self.search_index.build(self.library)
+        self.startup.mark("library and caches")
 
         # UI Components
         self.status_bar = StatusBar(self.small_font, self.current_theme_name)
         self.side_panel = SidePanel(self.current_theme_name)
 
-        # Media Players (Pass settings to VideoPlayer)
-        # Pass ffprobe path to MusicPlayer
-        ffmpeg_path = self.settings.get("ffmpeg_path")
-        ffprobe_exec = os.path.join(ffmpeg_path, "ffprobe.exe") if ffmpeg_path else None
-        self.music_player = MusicPlayer(self.font, self.current_theme_name, ffprobe_exec=ffprobe_exec)
-        self.video_player = VideoPlayer(self.font, self.current_theme_name, self.settings) # PASS SETTINGS
-        self.image_viewer = ImageViewer(self.font, self.current_theme_name)
+        # Media Players are created on first use (see the music_player/video_player/image_viewer
+        # properties): the mixer, the ffmpeg path prompt and the photo caches wait until needed
+        self._music_player = None
+        self._video_player = None
+        self._image_viewer = None
+        self.thumbnail_store = ThumbnailStore() # Persistent thumbnails for the photo grid
+        self.thumbnails = ImagePrefetcher((THUMB_SIZE, THUMB_SIZE), cache_mb=THUMB_CACHE_MB,
+                                          decode=self.thumbnail_store.load_or_create)
 
         # Menu Navigation State
         self.menu_stack = [] # Stack to handle submenu navigation
         self.active_menu = None
         self.active_player = None # Points to the currently active player object
         self.active_screen = None # NEW: To hold AboutScreen or DonateScreen instance
+        self.player_return_screen = None # Screen to go back to when the player closes (photo grid, search)
+        self.library_scan = None # Background LibraryScan feeding the open media menu
+        self.library_scan_target = None # (menu, player) receiving scan results
         self.running = True
-        self.was_fullscreen_before_video = False # ADDED: Track fullscreen state for video
+        self.full_redraw = True # Repaint everything on the next frame (e.g. after window exposure)
+        self._drawn_layout = None # (screen, player, menu, side panel) shown in the last frame
 
         # Gamepad state tracking
         self.dpad_pressed = {'up': False, 'down': False, 'left': False, 'right': False}
@@ -1450,12 +4311,52 @@ class PerfectPineapplePlayer:
         self.input_delay = 0.05 # Seconds delay for repeated input (Reduced from 0.15)
 
         self.build_main_menu()
+        self.startup.mark("menus")
+
+    def _create_player(self, name, create):
+        started = time.perf_counter()
+        player = create()
+        self.startup.lazy(name, time.perf_counter() - started)
+        return player
+
+    @property
+    def music_player(self):
+        if self._music_player is None:
+            ffmpeg_path = self.settings.get("ffmpeg_path")
+            ffprobe_exec = os.path.join(ffmpeg_path, "ffprobe.exe") if ffmpeg_path else None # Duration detection
+            ffmpeg_exec = os.path.join(ffmpeg_path, "ffmpeg.exe") if ffmpeg_path else None # For waveform overviews
+            self._music_player = self._create_player("music player", lambda: MusicPlayer(
+                self.font, self.current_theme_name, ffprobe_exec=ffprobe_exec, probe_cache=self.probe_cache,
+                probe_pool=self.probe_pool, gapless=self.settings.get("gapless_playback", True), ffmpeg_exec=ffmpeg_exec))
+        return self._music_player
+
+    @property
+    def video_player(self):
+        if self._video_player is None: # May ask for the FFmpeg folder
+            self._video_player = self._create_player("video player", lambda: VideoPlayer(
+                self.font, self.current_theme_name, self.settings, probe_cache=self.probe_cache, probe_pool=self.probe_pool))
+        return self._video_player
+
+    @property
+    def image_viewer(self):
+        if self._image_viewer is None:
+            self._image_viewer = self._create_player("image viewer", lambda: ImageViewer(
+                self.font, self.current_theme_name,
+                prefetch_depth=self.settings.get("photo_prefetch_depth", PHOTO_PREFETCH_DEPTH),
+                cache_mb=self.settings.get("photo_cache_mb", PHOTO_CACHE_MB)))
+        return self._image_viewer
+
+    @property
+    def players(self):
+        """The players created so far."""
+        return [player for player in (self._music_player, self._video_player, self._image_viewer) if player]
 
     def build_main_menu(self):
         items = [
             ("Music", "music"),
             ("Videos", "videos"),
             ("Photos", "photos"),
+            ("Search", "search"),
             ("Games", "games"), # Inserted before Settings
             ("Settings", "settings"),
             ("Quit", "quit") # Added Quit button
@@ -1490,59 +4391,152 @@ class PerfectPineapplePlayer:
         menu.update_theme(self.current_theme_name)
         return menu
 
+    def build_music_menu(self):
+        """Music submenu: browse by artist, album or genre, or list every song."""
+        items = [
+            ("All Songs", "music_songs"),
+            ("Artists", "music_artists"),
+            ("Albums", "music_albums"),
+            ("Genres", "music_genres"),
+            ("Back", "back"),
+        ]
+        menu = Menu(items, self.font)
+        menu.update_theme(self.current_theme_name)
+        # Keep the index and its groupings current while the user browses
+        self.start_library_scan("music", menu, None)
+        return menu
+
+    def build_group_menu(self, kind, parent=""):
+        menu = Menu(GroupMenuItems(self.library, kind, parent), self.font)
+        menu.update_theme(self.current_theme_name)
+        return menu
+
+    def build_album_menu(self, album, artist=None):
+        """Lists an album's songs in track order, by title."""
+        tracks = self.library.get_album_tracks(album, artist)
+        items = PlaylistMenuItems("music", [path for path, _ in tracks], labels=[title for _, title in tracks])
+        menu = Menu(items, self.font)
+        menu.update_theme(self.current_theme_name)
+        return menu
+
+    def open_group(self, items, index):
+        """Descends one level of the music hierarchy from a GroupMenuItems row."""
+        name = items.name_at(index)
+        if name is None: return
+        if items.kind == "artist":
+            menu = self.build_group_menu("artist_album", name)
+        elif items.kind == "genre":
+            menu = self.build_group_menu("genre_artist", name)
+        elif items.kind == "genre_artist":
+            menu = self.build_group_menu("artist_album", name)
+        elif items.kind == "artist_album":
+            menu = self.build_album_menu(name, artist=items.parent)
+        else: # Albums across all artists
+            menu = self.build_album_menu(name)
+        self.menu_stack.append(menu)
+        self.active_menu = menu
+
     def build_media_menu(self, media_type):
         """Builds menu listing files for music, videos, or photos."""
         extensions = ()
+        directories = []
         files = []
         player = None
-        action_prefix = ""
 
         if media_type == "music":
-            extensions = ('.mp3', '.ogg', '.wav', '.flac') # Add more as supported by mixer/moviepy
-            files = get_media_files(self.settings["music_dirs"], extensions)
+            extensions = MUSIC_EXTENSIONS
+            directories = self.settings["music_dirs"]
             player = self.music_player
-            action_prefix = "play_music_"
         elif media_type == "videos":
-             extensions = ('.mp4', '.avi', '.mov', '.mkv') # Add more as supported by moviepy/ffmpeg
-             files = get_media_files(self.settings["video_dirs"], extensions)
+             extensions = VIDEO_EXTENSIONS
+             directories = self.settings["video_dirs"]
              player = self.video_player
-             action_prefix = "play_video_"
         elif media_type == "photos":
-             extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
-             files = get_media_files(self.settings["image_dirs"], extensions)
+             extensions = PHOTO_EXTENSIONS
+             directories = self.settings["image_dirs"]
              player = self.image_viewer
-             action_prefix = "view_photo_"
-
-        if not files:
-            items = [("No media found.", None), ("(Import in Settings)", None), ("Back", "back")]
-        else:
-            # Create (display name, action) tuples
-            items = [(os.path.basename(f), f"{action_prefix}{i}") for i, f in enumerate(files)]
-            items.append(("Back", "back"))
 
-        menu = Menu(items, self.font)
-        menu.update_theme(self.current_theme_name)
+        if extensions:
+            # Serve what the index already knows immediately
+            files = self.library.get_paths(media_type)
 
-        # Load playlist into the respective player when menu is built
+        # Hand the playlist to the respective player; a track is only loaded once one is picked
         if player:
              player.load_playlist(files)
+             files = player.playlist # The menu reads the player's list, no second copy
+
+        header = [("Grid View", "photo_grid")] if media_type == "photos" else []
+        menu = Menu(PlaylistMenuItems(media_type, files, header), self.font)
+        menu.update_theme(self.current_theme_name)
 
+        # Refresh the index in the background; new files stream into the open menu
+        self.start_library_scan(media_type, menu, player)
         return menu
 
+    def start_library_scan(self, media_type, menu, player):
+        """Starts a background LibraryScan feeding menu/player (player None: index only)."""
+        self.cancel_library_scan()
+        directories = self.settings[{"music": "music_dirs", "videos": "video_dirs", "photos": "image_dirs"}[media_type]]
+        if not directories: return
+        extensions = {"music": MUSIC_EXTENSIONS, "videos": VIDEO_EXTENSIONS, "photos": PHOTO_EXTENSIONS}[media_type]
+        tag_reader = read_audio_metadata if media_type == "music" and mutagen is not None else None
+        self.library_scan = LibraryScan(self.library, media_type, directories, extensions, tag_reader=tag_reader)
+        self.library_scan_target = (menu, player)
+        menu.footer_text = self.library_scan.progress_text
+
+    def cancel_library_scan(self, wait=False):
+        if self.library_scan:
+            self.library_scan.cancel(wait)
+            menu, _ = self.library_scan_target
+            menu.footer_text = None
+        self.library_scan = None
+        self.library_scan_target = None
+
+    def update_library_scan(self):
+        """Streams newly scanned files into the open media menu (called once per frame)."""
+        scan = self.library_scan
+        if not scan: return
+        menu, player = self.library_scan_target
+        # The menu's PlaylistMenuItems shares player.playlist, so appending is enough
+        new_paths = scan.poll_new_paths()
+        if player:
+            player.playlist.extend(new_paths)
+        if scan.media_type == "music":
+            for path in new_paths:
+                self.search_index.add(path, replace=False)
+        menu.footer_text = scan.progress_text
+        if scan.done and scan.new_paths.empty():
+            if scan.tags_read:
+                self.search_index.build(self.library, replace=True) # Titles/artists for the new tags
+            if scan.media_type == "music" and (scan.changed or scan.tags_read):
+                # The scan rebuilt the artist/album/genre groupings; open group menus re-read them
+                for group_menu in set(self.menu_stack + [self.active_menu]):
+                    if group_menu and isinstance(group_menu.items, GroupMenuItems):
+                        group_menu.items.reload()
+                        group_menu.navigate(0)
+                        group_menu.mark_dirty()
+            if scan.changed and player:
+                # Re-read the sorted listing so removals and ordering are reconciled
+                files = self.library.get_paths(scan.media_type)
+                player.replace_playlist(files)
+                if scan.media_type == "music":
+                    self.search_index.retain(files)
+                menu.navigate(0) # Clamp selection and scroll to the new length
+                menu.mark_dirty() # Same length can still mean different rows
+            menu.footer_text = None
+            self.library_scan = None
+            self.library_scan_target = None
+
     def build_games_menu(self):
         """Builds menu listing imported games (.ipg files)."""
         games = self.settings.get("games", [])
-        if not games:
-            items = [("No games imported.", None), ("(Import in Settings)", None), ("Back", "back")]
-        else:
-            items = [(os.path.basename(f), f"play_game_{i}") for i, f in enumerate(games)]
-            items.append(("Back", "back"))
-        menu = Menu(items, self.font)
+        menu = Menu(PlaylistMenuItems("games", games, empty_text="No games imported."), self.font)
         menu.update_theme(self.current_theme_name)
         return menu
 
     def update_theme(self, new_theme_name):
         if new_theme_name in THEMES:
+            TEXT_CACHE.clear() # Cached surfaces carry the old theme colours
             self.current_theme_name = new_theme_name
             self.settings["theme"] = new_theme_name
             save_settings(self.settings)
@@ -1550,7 +4544,8 @@ class PerfectPineapplePlayer:
             self.status_bar.update_theme(new_theme_name)
             self.side_panel.update_theme(new_theme_name)
             if self.active_menu: self.active_menu.update_theme(new_theme_name)
-            if self.active_player: self.active_player.update_theme(new_theme_name)
+            for player in self.players: # Idle players keep their place but must match the theme
+                player.update_theme(new_theme_name)
             if self.active_screen: self.active_screen.update_theme(new_theme_name) # Update active screen theme
             for menu in self.menu_stack:
                  menu.update_theme(new_theme_name)
@@ -1559,12 +4554,37 @@ class PerfectPineapplePlayer:
 
     def handle_input(self):
         # --- Primary Input Handling Order: Screen > Player > Menu ---
-        events = pygame.event.get() # Get all events once per frame
+        events = self.pending_events + pygame.event.get() # Get all events once per frame
+        self.pending_events = []
+        if any(event.type == MUSIC_END_EVENT for event in events):
+            # Not user input: advance the playlist without waking the screen
+            if self._music_player: self._music_player.on_track_end()
+            events = [event for event in events if event.type != MUSIC_END_EVENT]
+        if any(event.type == PROCESS_EXIT_EVENT for event in events):
+            for event in events:
+                if event.type == PROCESS_EXIT_EVENT and self._video_player:
+                    self._video_player.on_process_exit(event)
+            events = [event for event in events if event.type != PROCESS_EXIT_EVENT]
+        if any(event.type in WAKE_EVENT_TYPES and not (event.type == pygame.JOYHATMOTION and event.value == (0, 0))
+               for event in events): # A D-pad release is not input either
+            self.scheduler.note_activity()
+            if self.screen_off:
+                # Waking input is swallowed (quitting still works)
+                self.set_screen_off(False)
+                events = [event for event in events if event.type == pygame.QUIT]
+        elif self.screen_off:
+            # Releases and stick drift must not drive the hidden UI
+            events = [event for event in events if event.type not in (pygame.KEYUP, pygame.JOYBUTTONUP,
+                                                                      pygame.JOYAXISMOTION, pygame.JOYHATMOTION)]
 
         # Always define joystick and keys at the start
         joystick = self.joysticks[0] if self.joysticks else None
         keys = pygame.key.get_pressed()
 
+        for event in events:
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.full_redraw = True # Window contents were lost, repaint everything
+
         # 1. Handle Active Screen (About/Donate) Input
         if self.active_screen:
             action = self.active_screen.handle_input(events)
@@ -1575,12 +4595,20 @@ class PerfectPineapplePlayer:
                 else: # Should not happen, but fallback to main menu
                     self.build_main_menu()
             elif action == 'github':
-                 webbrowser.open_new_tab("https://github.com/BannedPenta01")
+                 open_link("https://github.com/BannedPenta01")
             elif action and action.startswith('donate_'): # Any donate action opens the single link
-                 webbrowser.open_new_tab(DonateScreen._single_donate_url)
+                 open_link(DonateScreen._single_donate_url)
                  self.active_screen = None # Close after opening link
                  if self.menu_stack: self.active_menu = self.menu_stack[-1]
                  else: self.build_main_menu()
+            elif action == 'open' and isinstance(self.active_screen, PhotoGrid): # Grid opened a photo
+                 self.player_return_screen = self.active_screen
+                 self.active_screen = None
+                 self.open_media("photos", self.player_return_screen.selected_index)
+            elif action == 'open' and isinstance(self.active_screen, SearchScreen): # Play a search result
+                 self.player_return_screen = self.active_screen
+                 self.active_screen = None
+                 self.play_music_path(self.player_return_screen.selected_path)
             return # Active screen handled input, stop processing
 
         # 2. Handle Player Input (if no active screen)
@@ -1590,6 +4618,7 @@ class PerfectPineapplePlayer:
         action_back = False
         action_seek_forward = False
         action_seek_backward = False
+        action_seek_release = False # LB/RB let go: a held video seek preview lands
         action_toggle_fullscreen = False
         direction = 0 # For menu navigation
 
@@ -1598,6 +4627,9 @@ class PerfectPineapplePlayer:
              if event.type == pygame.QUIT:
                  self.running = False
                  return
+             if event.type == pygame.KEYDOWN and event.key == SCREEN_OFF_KEY:
+                 self.set_screen_off(True)
+                 return
 
              # Fullscreen toggle is global
              if event.type == pygame.JOYBUTTONDOWN:
@@ -1611,9 +4643,6 @@ class PerfectPineapplePlayer:
                      action_toggle_fullscreen = True
                      self.button_pressed[START_BUTTON] = True
                      self.last_input_time = current_time + 0.1
-                     # Only Start triggers ffplay focus
-                     if self.active_player and isinstance(self.active_player, VideoPlayer) and self.active_player.is_playing:
-                         threading.Thread(target=self.active_player.focus_ffplay_window, daemon=True).start()
                  elif joystick and not joystick.get_button(START_BUTTON): self.button_pressed[START_BUTTON] = False # Reset on release
 
              # Player / Menu specific input
@@ -1625,6 +4654,8 @@ class PerfectPineapplePlayer:
                           elif keys[pygame.K_BACKSPACE] or keys[pygame.K_ESCAPE]: action_back = True; self.last_input_time = current_time + 0.1
                           elif keys[pygame.K_RIGHTBRACKET]: action_seek_forward = True; self.last_input_time = current_time + 0.05
                           elif keys[pygame.K_LEFTBRACKET]: action_seek_backward = True; self.last_input_time = current_time + 0.05
+                 elif event.type == pygame.KEYUP:
+                      if event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET): action_seek_release = True
                  elif event.type == pygame.JOYBUTTONDOWN:
                       if process_input and joystick:
                            if event.button == A_BUTTON and not self.button_pressed[A_BUTTON]: action_select = True; self.button_pressed[A_BUTTON] = True; self.last_input_time = current_time + 0.1
@@ -1633,6 +4664,7 @@ class PerfectPineapplePlayer:
                            elif event.button == LB_BUTTON and not self.button_pressed[LB_BUTTON]: action_seek_backward = True; self.button_pressed[LB_BUTTON] = True; self.last_input_time = current_time + 0.05
                  elif event.type == pygame.JOYBUTTONUP: # Reset button state on release
                      if event.button in self.button_pressed: self.button_pressed[event.button] = False
+                     if event.button in (LB_BUTTON, RB_BUTTON): action_seek_release = True
 
              elif self.active_menu:
                  # Handle Menu specific inputs (Up/Down Nav, A=Select, B=Back)
@@ -1668,26 +4700,28 @@ class PerfectPineapplePlayer:
         if action_toggle_fullscreen:
             print("Toggling fullscreen...")
             pygame.display.toggle_fullscreen()
+            self.full_redraw = True
 
         if self.active_player:
             if action_select: self.active_player.play_pause()
             elif action_back:
-                # Store fullscreen state *before* stopping video
-                fullscreen_to_restore = self.was_fullscreen_before_video
                 self.active_player.stop()
                 self.active_player = None
                  # Restore menu
                 if not self.menu_stack: self.build_main_menu()
                 else: self.active_menu = self.menu_stack[-1]
-                # Restore fullscreen if needed *after* stopping player and showing menu
-                if fullscreen_to_restore:
-                    pygame.display.toggle_fullscreen()
-                    self.was_fullscreen_before_video = False # Reset flag
-                else:
-                    # Ensure flag is reset even if wasn't fullscreen
-                    self.was_fullscreen_before_video = False
-            elif action_seek_forward: self.active_player.seek(10)
-            elif action_seek_backward: self.active_player.seek(-10)
+                if self.player_return_screen: # Back to the photo grid (on the photo last viewed) or search
+                    self.active_screen = self.player_return_screen
+                    if isinstance(self.active_screen, PhotoGrid):
+                        self.active_screen.select(self.image_viewer.current_index)
+                    self.active_menu = None
+                    self.player_return_screen = None
+            elif action_seek_forward or action_seek_backward:
+                seek_direction = 1 if action_seek_forward else -1
+                if isinstance(self.active_player, VideoPlayer): self.active_player.begin_scrub(seek_direction) # Preview until release
+                else: self.active_player.seek(10 * seek_direction)
+            if action_seek_release and isinstance(self.active_player, VideoPlayer):
+                self.active_player.end_scrub()
 
         elif self.active_menu:
             if direction != 0: self.active_menu.navigate(direction)
@@ -1702,6 +4736,8 @@ class PerfectPineapplePlayer:
               if self.menu_stack: self.active_menu = self.menu_stack[-1]
               else: self.build_main_menu()
          elif len(self.menu_stack) > 1: # Otherwise, go back in menu stack
+             if self.library_scan and self.library_scan_target[0] is self.menu_stack[-1]:
+                 self.cancel_library_scan() # Leaving the menu being scanned
              self.menu_stack.pop()
              self.active_menu = self.menu_stack[-1]
          # else: Do nothing if already at main menu and no screen active
@@ -1711,6 +4747,13 @@ class PerfectPineapplePlayer:
         if not self.active_menu: return
         action = self.active_menu.get_selected_action()
         if action is None: return
+        if isinstance(action, int): # Playlist rows carry their index; the menu knows the media type
+            items = self.active_menu.items
+            if isinstance(items, GroupMenuItems):
+                self.open_group(items, action)
+            else:
+                self.open_media(items.media_type, action, items.paths)
+            return
         print(f"Menu Action: {action}")
 
         # Handle non-screen actions first
@@ -1768,7 +4811,7 @@ class PerfectPineapplePlayer:
         elif action == "cancel_reset_imported_paths":
             self.go_back_menu()
             return
-        elif action == "github": webbrowser.open_new_tab("https://github.com/BannedPenta01")
+        elif action == "github": open_link("https://github.com/BannedPenta01")
         elif action == "quit": self.running = False
 
         # Handle screen activation
@@ -1781,9 +4824,17 @@ class PerfectPineapplePlayer:
 
         # Handle media selection (THESE WERE MISSING)
         elif action == "music":
-              music_menu = self.build_media_menu("music")
+              music_menu = self.build_music_menu()
               self.menu_stack.append(music_menu)
               self.active_menu = music_menu
+        elif action == "music_songs":
+              songs_menu = self.build_media_menu("music")
+              self.menu_stack.append(songs_menu)
+              self.active_menu = songs_menu
+        elif action in ("music_artists", "music_albums", "music_genres"):
+              group_menu = self.build_group_menu(action[len("music_"):-1]) # "artists" -> "artist"
+              self.menu_stack.append(group_menu)
+              self.active_menu = group_menu
         elif action == "videos":
               video_menu = self.build_media_menu("videos")
               self.menu_stack.append(video_menu)
@@ -1792,51 +4843,19 @@ class PerfectPineapplePlayer:
               photo_menu = self.build_media_menu("photos")
               self.menu_stack.append(photo_menu)
               self.active_menu = photo_menu
-        elif action.startswith("play_music_"):
-              index = int(action.split("play_music_")[1])
-              self.active_player = self.music_player
-              # Complete the logic:
-              if 0 <= index < len(self.active_player.playlist):
-                   self.active_player.current_index = index
-                   self.active_player._load_current_track()
-                   self.active_player.play_pause()
-                   self.active_menu = None # Hide menu when playing
-        # --- ADD MISSING BLOCKS --- Start
-        elif action.startswith("play_video_"):
-              index = int(action.split("play_video_")[1])
-              self.active_player = self.video_player
-              if 0 <= index < len(self.active_player.playlist):
-                  # --- Fullscreen Handling --- Start
-                  self.was_fullscreen_before_video = pygame.display.is_fullscreen()
-                  if self.was_fullscreen_before_video:
-                      print("Video started: Turning off fullscreen for main window...")
-                      pygame.display.toggle_fullscreen()
-                  # --- Fullscreen Handling --- End
-                  self.active_player.current_index = index
-                  self.active_player._load_current_track() # Prepares duration etc.
-                  self.active_player.play_pause() # This now calls _launch_ffplay without -nodisp
-                  self.active_menu = None # Hide menu when playing
-        elif action.startswith("view_photo_"):
-              index = int(action.split("view_photo_")[1])
-              self.active_player = self.image_viewer
-              if 0 <= index < len(self.active_player.playlist):
-                  self.active_player.current_index = index
-                  self.active_player._load_current_track()
-                  # No play_pause for images, just load and hide menu
-                  self.active_menu = None # Hide menu when viewing
-        # --- ADD MISSING BLOCKS --- End
-        elif action.startswith("play_game_"):
-            index = int(action.split("play_game_")[1])
-            games = self.settings.get("games", [])
-            if 0 <= index < len(games):
-                self.active_screen = GamePlaceholderScreen(self.font, self.current_theme_name, os.path.basename(games[index]))
-                self.active_menu = None
+        elif action == "search":
+              self.active_screen = SearchScreen(self.font, self.current_theme_name, self.search_index)
+              self.active_menu = None # Hide menu
+        elif action == "photo_grid":
+              self.active_screen = PhotoGrid(self.font, self.current_theme_name, self.image_viewer, self.thumbnails)
+              self.active_menu = None # Hide menu
         elif action == "games":
             games_menu = self.build_games_menu()
             self.menu_stack.append(games_menu)
             self.active_menu = games_menu
         elif action == "import_games":
             # Use file dialog to select one or more .ipg files
+            from tkinter import Tk, filedialog
             root = Tk()
             root.withdraw()
             root.attributes('-topmost', True)
@@ -1855,63 +4874,224 @@ class PerfectPineapplePlayer:
                 else:
                     print("No new games to import (all already imported)")
 
+    def play_music_path(self, path):
+        """Plays a song picked outside the Music menu (search), within the full library playlist."""
+        playlist = self.music_player.playlist
+        if path not in playlist:
+            self.music_player.load_playlist(self.library.get_paths("music"))
+            playlist = self.music_player.playlist
+        if path in playlist:
+            self.open_media("music", playlist.index(path))
+
+    def open_media(self, media_type, index, playlist=None):
+        """Opens playlist entry index of a media menu (music, videos, photos or games).
+           playlist, if given, is the menu's list (e.g. an album), loaded into the player first."""
+        print(f"Open {media_type} #{index}")
+        if media_type == "music":
+              self.active_player = self.music_player
+              if playlist is not None and self.music_player.playlist is not playlist:
+                   self.music_player.load_playlist(playlist)
+              # Complete the logic:
+              if 0 <= index < len(self.active_player.playlist):
+                   self.active_player.current_index = index
+                   self.active_player._load_current_track()
+                   self.active_player.play_pause()
+                   self.active_menu = None # Hide menu when playing
+        elif media_type == "videos":
+              self.active_player = self.video_player
+              if 0 <= index < len(self.active_player.playlist):
+                  self.active_player.current_index = index
+                  self.active_player._load_current_track() # Prepares duration etc.
+                  self.active_player.play_pause() # Starts decoding into the window
+                  self.active_menu = None # Hide menu when playing
+        elif media_type == "photos":
+              self.active_player = self.image_viewer
+              if 0 <= index < len(self.active_player.playlist):
+                  self.active_player.current_index = index
+                  self.active_player._load_current_track()
+                  # No play_pause for images, just load and hide menu
+                  self.active_menu = None # Hide menu when viewing
+        elif media_type == "games":
+            games = self.settings.get("games", [])
+            if 0 <= index < len(games):
+                self.active_screen = GamePlaceholderScreen(self.font, self.current_theme_name, os.path.basename(games[index]))
+                self.active_menu = None
+
     def update(self):
         """Update game state."""
+        self.update_library_scan()
+        # Hand finished background probes to their players (duration, tags)
+        for owner, path, info in self.probe_pool.drain():
+            owner.on_probe_result(path, info)
+            if owner.media_type == "music":
+                self.search_index.add(path, info) # Tags arrived; re-indexed only if they changed
         if self.active_player:
             self.active_player.update()
+        if isinstance(self.active_screen, (PhotoGrid, SearchScreen)):
+            self.active_screen.update()
+        self.update_album_art()
 
-    def draw(self):
-        self.screen.fill(BLACK)
+    def update_album_art(self):
+        """Shows the cover of the highlighted Music menu item in the side panel."""
+        path = None
+        if self.active_menu and not self.active_screen and not self.active_player:
+            action = self.active_menu.get_selected_action()
+            items = self.active_menu.items
+            if isinstance(action, int) and isinstance(items, PlaylistMenuItems) and items.media_type == "music":
+                if action < len(items.paths):
+                    path = items.paths[action]
+        finished = self.album_art.collect()
+        if path == self._art_path and path not in finished:
+            return # Nothing new to show
+        self._art_path = path
+        art = None
+        if path:
+            found, art = self.album_art.get(path)
+            if not found:
+                self.album_art.request(path) # Keep the previous cover until this one lands
+                return
+        self.side_panel.set_art(art)
 
-        # --- Draw Active Component: Screen > Player > Menu ---
-        if self.active_screen:
-            self.active_screen.draw(self.screen)
-        elif self.active_player:
-            self.active_player.draw(self.screen)
-        elif self.active_menu:
-            self.active_menu.draw(self.screen)
-        else: # Fallback if nothing is active
-            fallback_surf = self.font.render("Perfect Pineapple Player", True, WHITE)
+    def draw(self):
+        """Redraws only widgets whose content changed and pushes just those rects to the display.
+           Idle frames touch neither the back buffer nor the display."""
+        # --- Active Component: Screen > Player > Menu ---
+        component = self.active_screen or self.active_player or self.active_menu
+        # Draw side panel only if a menu is active (not player or screen)
+        show_side_panel = bool(self.active_menu and not self.active_screen and not self.active_player)
+        layout = (self.active_screen, self.active_player, self.active_menu, show_side_panel)
+        full_redraw = self.full_redraw or layout != self._drawn_layout
+        if full_redraw:
+            self.screen.fill(BLACK)
+            for widget in (component, self.side_panel, self.status_bar):
+                if widget: widget.mark_dirty()
+            self._drawn_layout = layout
+            self.full_redraw = False
+
+        dirty_rects = []
+        if component:
+            if component.needs_redraw():
+                component.draw(self.screen)
+                dirty_rects.append(component.dirty_rect)
+                if component.dirty_rect.colliderect(self.status_bar.rect):
+                    self.status_bar.mark_dirty() # Status bar always on top
+        elif full_redraw: # Fallback if nothing is active
+            fallback_surf = render_text(self.font, "Perfect Pineapple Player", WHITE)
             fallback_rect = fallback_surf.get_rect(centerx=SCREEN_WIDTH // 2, centery=SCREEN_HEIGHT // 2)
             self.screen.blit(fallback_surf, fallback_rect)
 
         # --- Draw Persistent UI Elements ---
-        # Draw side panel only if a menu is active (not player or screen)
-        if self.active_menu and not self.active_screen and not self.active_player:
-             if not (self.active_player and isinstance(self.active_player, (ImageViewer, MusicPlayer))): # Keep hide logic? Maybe redundant now.
-                  self.side_panel.draw(self.screen)
-
-        self.status_bar.draw(self.screen) # Status bar always on top
-
-        pygame.display.flip()
+        if show_side_panel and self.side_panel.needs_redraw():
+            self.side_panel.draw(self.screen)
+            dirty_rects.append(self.side_panel.dirty_rect)
+        if self.status_bar.needs_redraw():
+            self.status_bar.draw(self.screen)
+            dirty_rects.append(self.status_bar.dirty_rect)
+
+        if full_redraw:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        return full_redraw or bool(dirty_rects)
+
+
+    def frame_mode(self):
+        """Picks how fast the next loop iteration should come (see FrameScheduler)."""
+        if self.screen_off:
+            return FrameScheduler.SCREEN_OFF
+        if self.full_redraw or self.scheduler.seconds_since_activity < ACTIVE_HOLD_SECONDS:
+            return FrameScheduler.ACTIVE
+        if isinstance(self.active_player, VideoPlayer) and self.active_player.scrubbing:
+            return FrameScheduler.ACTIVE # LB/RB held: the preview steps on its own
+        if (self.active_player and self.active_player.is_loading) or self.album_art.is_loading or \
+                (isinstance(self.active_screen, PhotoGrid) and self.active_screen.is_loading) or \
+                (isinstance(self.active_screen, SearchScreen) and not self.search_index.ready):
+            return FrameScheduler.ACTIVE # Show the result as soon as it lands
+        if (self.active_player and self.active_player.is_playing) or self.library_scan:
+            return FrameScheduler.PLAYBACK
+        return FrameScheduler.IDLE
+
+    def set_screen_off(self, off):
+        """Stops rendering entirely (audio keeps playing) or wakes the screen again."""
+        if off == self.screen_off: return
+        self.screen_off = off
+        if off:
+            print("Screen off")
+            self.screen.fill(BLACK)
+            pygame.display.flip()
+        else:
+            print("Screen on")
+            self.full_redraw = True
 
+    def _check_screen_off_timeout(self):
+        timeout = self.settings.get("screen_off_timeout", 0)
+        if (timeout and not self.screen_off and self.active_player and self.active_player.is_playing
+                and self.scheduler.seconds_since_activity > timeout):
+            self.set_screen_off(True)
 
     def run(self):
         """Main game loop."""
         while self.running:
             self.handle_input()
-            # --- Detect ffplay window close (X) ---
-            if self.active_player and isinstance(self.active_player, VideoPlayer):
-                if self.active_player._ffplay_process and self.active_player._ffplay_process.poll() is not None:
-                    # ffplay process exited (user closed window)
-                    self.active_player.stop()
-                    self.active_player = None
-                    if not self.menu_stack: self.build_main_menu()
-                    else: self.active_menu = self.menu_stack[-1]
-                    # Restore fullscreen if needed
-                    if self.was_fullscreen_before_video:
-                        pygame.display.toggle_fullscreen()
-                        self.was_fullscreen_before_video = False
             # --- ADD MISSING UPDATE CALL --- #
             self.update()
             # --- END ADD --- #
-            self.draw()
-            self.clock.tick(60)
+            self._check_screen_off_timeout()
+            rendered = self.draw() if not self.screen_off else False
+            if rendered:
+                self.startup.first_frame() # Prints the --profile-startup breakdown once
+            mode = self.frame_mode()
+            wait_ms = None
+            if mode == FrameScheduler.PLAYBACK:
+                if self.active_player:
+                    wait_ms = self.active_player.next_change_ms()
+                if self.library_scan: # Still pick up scan results at the playback rate
+                    scan_ms = 1000 // PLAYBACK_FPS
+                    wait_ms = scan_ms if wait_ms is None else min(wait_ms, scan_ms)
+            woken_by = self.scheduler.end_frame(mode, rendered, wait_ms)
+            if woken_by:
+                self.pending_events.append(woken_by)
 
         # Cleanup before exit
+        self.scheduler.report()
         if self.active_player:
-            # Ensure player resources are released (includes stopping ffplay)
+            # Ensure player resources are released (includes stopping ffmpeg)
             self.active_player.stop()
+        probe_stats = self.probe_cache.stats()
+        print(f"Probe cache: {probe_stats['hits']} hits, {probe_stats['misses']} misses ({probe_stats['hit_rate']:.0%} hit rate)")
+        workers = [self.probe_pool, self.thumbnails, self.album_art] # Background work that uses the library
+        if self._image_viewer: # Players that were never opened have nothing to report
+            photo_stats = self._image_viewer.prefetcher.stats()
+            print(f"Photo cache: {photo_stats['hits']} hits, {photo_stats['misses']} misses, "
+                  f"{photo_stats['entries']} photos in {photo_stats['bytes'] / (1024 * 1024):.1f} MB")
+            workers.append(self._image_viewer.prefetcher)
+        print(f"Thumbnails: {self.thumbnail_store.hits} from disk, {self.thumbnail_store.misses} generated")
+        if self._video_player:
+            video_stats = self._video_player.stats()
+            if video_stats["frames_shown"]:
+                print(f"Video: {video_stats['frames_shown']} frames shown, {video_stats['frames_dropped']} dropped, "
+                      f"decode {video_stats['decode_ms_avg']:.1f} ms avg ({video_stats['decode_ms_max']:.1f} ms max), "
+                      f"{video_stats['seeks']} seeks at {video_stats['seek_ms_avg']:.0f} ms to first frame")
+            workers.append(self._video_player)
+        if self._music_player:
+            workers.append(self._music_player)
+        art_stats = self.album_art.stats()
+        print(f"Album art: {art_stats['hits']} hits, {art_stats['misses']} misses, {art_stats['entries']} albums in memory")
+        # Drop queued work, kill the children running tasks wait on, then wait for those tasks
+        scan = self.library_scan
+        self.cancel_library_scan()
+        for worker in workers:
+            worker.shutdown()
+        PROCESSES.kill_all()
+        if scan:
+            scan.cancel(wait=True)
+        for worker in workers:
+            worker.shutdown(wait=True)
+        for name, child_stats in PROCESSES.stats().items():
+            print(f"Processes ({name}): {child_stats['spawned']} started at {child_stats['spawn_ms_avg']:.1f} ms avg "
+                  f"({child_stats['spawn_ms_max']:.1f} ms max), lived {child_stats['lifetime_ms_avg']:.0f} ms avg, "
+                  f"{child_stats['killed']} stopped, {child_stats['failed']} failed")
+        self.library.close() # Last: closes the probe cache too, which shares its connection
         pygame.quit()
         sys.exit()
 
@@ -1921,7 +5101,7 @@ if __name__ == '__main__':
     try:
         RED = (255, 0, 0)
         # No need for Tkinter root setup here anymore
-        player = PerfectPineapplePlayer()
+        player = PerfectPineapplePlayer(profile_startup="--profile-startup" in sys.argv[1:])
         player.run()
     except Exception as e:
         print("\n--- UNHANDLED EXCEPTION ---")